@@ -0,0 +1,162 @@
+import math
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.db import transaction
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from api.services.ops_tiles import invalidate_ops_extent
+from api.services.zone_membership import refresh_memberships
+from api.signals import publish_record_event
+
+# Rows per INSERT statement and external ids per lookup query
+BATCH_SIZE = 1000
+
+
+def parse_point(geometry):
+    """
+    Read a GeoJSON Point geometry
+    Returns: Point in SRID 4326; raises ValueError if malformed
+    """
+    if not isinstance(geometry, dict) or geometry.get('type') != 'Point':
+        raise ValueError("geometry must be a GeoJSON Point")
+    coords = geometry.get('coordinates')
+    if (
+        not isinstance(coords, (list, tuple)) or len(coords) != 2 or
+        not all(isinstance(c, (int, float)) and not isinstance(c, bool) and math.isfinite(c) for c in coords)
+    ):
+        raise ValueError("Point coordinates must be [lon, lat]")
+    lon, lat = coords
+    if not (-180 <= lon <= 180 and -90 <= lat <= 90):
+        raise ValueError("Point coordinates are out of range")
+    return Point(lon, lat, srid=4326)
+
+
+class BulkUpsertMixin:
+    """
+    Adds a bulk import to a ModelViewSet:
+
+        POST /api/waypoints/bulk/   body: GeoJSON FeatureCollection of Points
+
+    Feature properties are validated with `bulk_serializer_class`. Valid
+    features are written with bulk_create in one transaction; a feature
+    whose properties carry an external_id that already exists replaces
+    that row (INSERT ... ON CONFLICT (external_id) DO UPDATE). Invalid
+    features are skipped and reported by index.
+
+    bulk_create bypasses the model signals, so the ops tile cache, the hazard
+    zone memberships and the event stream are updated here.
+    """
+
+    bulk_serializer_class = None
+
+    def bulk_upsert(self, request):
+        data = request.data
+        if not isinstance(data, dict) or data.get('type') != 'FeatureCollection' or not isinstance(data.get('features'), list):
+            return Response({'error': 'Expected a GeoJSON FeatureCollection'}, status=status.HTTP_400_BAD_REQUEST)
+        features = data['features']
+        if len(features) > settings.BULK_UPSERT_MAX_FEATURES:
+            return Response(
+                {'error': f'At most {settings.BULK_UPSERT_MAX_FEATURES} features per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        model = self.get_queryset().model
+        objects, indexes, errors = self._validate_features(model, features)
+        if not objects:
+            return Response({'created': 0, 'updated': 0, 'features': [], 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        keyed = [obj for obj in objects if obj.external_id]
+        unkeyed = [obj for obj in objects if not obj.external_id]
+        # Replace every imported column, but keep created_at of existing rows
+        update_fields = [
+            name for name in self.bulk_serializer_class.Meta.fields if name != 'external_id'
+        ] + ['location', 'updated_at']
+
+        with transaction.atomic():
+            previous = {}
+            external_ids = [obj.external_id for obj in keyed]
+            for start in range(0, len(external_ids), BATCH_SIZE):
+                rows = model.objects.filter(external_id__in=external_ids[start:start + BATCH_SIZE])
+                for external_id, location in rows.values_list('external_id', 'location'):
+                    previous[external_id] = location
+            if keyed:
+                model.objects.bulk_create(
+                    keyed,
+                    batch_size=BATCH_SIZE,
+                    update_conflicts=True,
+                    unique_fields=['external_id'],
+                    update_fields=update_fields,
+                )
+            if unkeyed:
+                model.objects.bulk_create(unkeyed, batch_size=BATCH_SIZE)
+            refresh_memberships(model, [obj.pk for obj in objects])
+
+            results = []
+            for index, obj in zip(indexes, objects):
+                updated = bool(obj.external_id) and obj.external_id in previous
+                previous_location = previous.get(obj.external_id) if updated else None
+                publish_record_event('updated' if updated else 'created', model, obj, previous_location)
+                results.append({'index': index, 'id': obj.pk, 'status': 'updated' if updated else 'created'})
+
+        # One invalidation for the extent of every old and new location
+        extents = [
+            geometry.extent
+            for geometry in [obj.location for obj in objects] + list(previous.values())
+            if geometry is not None and not geometry.empty
+        ]
+        if extents:
+            invalidate_ops_extent((
+                min(extent[0] for extent in extents), min(extent[1] for extent in extents),
+                max(extent[2] for extent in extents), max(extent[3] for extent in extents),
+            ))
+
+        updated_count = sum(1 for result in results if result['status'] == 'updated')
+        return Response({
+            'created': len(results) - updated_count,
+            'updated': updated_count,
+            'features': results,
+            'errors': errors,
+        })
+
+    def _validate_features(self, model, features):
+        """
+        Validate every feature in one pass with a single serializer instance
+        Returns: tuple (unsaved model instances, their feature indexes, errors)
+        """
+        serializer = self.bulk_serializer_class()
+        objects = []
+        indexes = []
+        errors = []
+        seen = {}
+        for index, feature in enumerate(features):
+            if not isinstance(feature, dict) or feature.get('type') != 'Feature':
+                errors.append({'index': index, 'errors': {'feature': ['Expected a GeoJSON Feature']}})
+                continue
+            feature_errors = {}
+            properties = {}
+            try:
+                properties = serializer.run_validation(feature.get('properties') or {})
+            except ValidationError as e:
+                feature_errors.update(e.detail)
+            try:
+                location = parse_point(feature.get('geometry'))
+            except ValueError as e:
+                feature_errors['geometry'] = [str(e)]
+
+            external_id = properties.get('external_id')
+            if not external_id and 'external_id' in properties:
+                # Blank ids would collide on the unique index; store NULL
+                properties['external_id'] = None
+            if not feature_errors and external_id:
+                # One statement cannot upsert the same key twice
+                if external_id in seen:
+                    feature_errors['external_id'] = [f'Duplicate of feature {seen[external_id]}']
+                else:
+                    seen[external_id] = index
+            if feature_errors:
+                errors.append({'index': index, 'errors': feature_errors})
+                continue
+            objects.append(model(location=location, **properties))
+            indexes.append(index)
+        return objects, indexes, errors
@@ -0,0 +1,120 @@
+import base64
+from collections import namedtuple
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from api.models import Tombstone
+
+# ?since= value that asks for every current row, used to bootstrap a client
+SINCE_BEGINNING = '0'
+
+# Oldest transaction still in flight: every transaction with a lower id has
+# committed or aborted, so no row can appear below it any more
+COMMIT_WATERMARK_SQL = "SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint"
+
+# Feed position: the (change_xid, id) of the last row reported, and when the
+# cursor was issued (for expiry against the tombstone retention)
+Cursor = namedtuple('Cursor', ['xid', 'id', 'issued_at'])
+
+
+def commit_watermark():
+    with connection.cursor() as cursor:
+        cursor.execute(COMMIT_WATERMARK_SQL)
+        return cursor.fetchone()[0]
+
+
+def encode_cursor(cursor):
+    value = f"{cursor.xid}.{cursor.id}.{cursor.issued_at.isoformat()}"
+    return base64.urlsafe_b64encode(value.encode('ascii')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Returns: the Cursor a ?since= value stands for, or None for SINCE_BEGINNING"""
+    if cursor == SINCE_BEGINNING:
+        return None
+    try:
+        xid, pk, issued_at = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('ascii').split('.', 2)
+        decoded = Cursor(int(xid), int(pk), datetime.fromisoformat(issued_at))
+    except (ValueError, UnicodeError):
+        raise ValidationError({'since': 'Invalid cursor'})
+    if timezone.is_naive(decoded.issued_at):
+        raise ValidationError({'since': 'Invalid cursor'})
+    return decoded
+
+
+class ChangeFeedMixin:
+    """
+    Adds an incremental change feed to a ModelViewSet's list endpoint:
+
+        GET /api/incidents/?since=0          every row, plus a cursor
+        GET /api/incidents/?since=<cursor>   rows created/updated and ids
+                                             deleted after the cursor
+
+    Response: {"changes": [...], "deleted": [ids], "cursor": "...",
+    "has_more": bool}. Pass the returned cursor on the next poll; when
+    has_more is true, poll again straight away. The ?bbox= / ?near=
+    filters apply to changes and deletions alike.
+
+    Rows are ordered by the transaction that wrote them (change_xid, set
+    by a trigger) and only reported once every transaction before it has
+    finished: the commit watermark holds the cursor below any transaction
+    still in flight, so a long transaction committing late is reported on
+    the next poll instead of being skipped.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if 'since' in request.query_params:
+            return self.change_feed(request)
+        return super().list(request, *args, **kwargs)
+
+    def change_feed(self, request):
+        since = decode_cursor(request.query_params['since'])
+        now = timezone.now()
+        if since is not None and since.issued_at < now - timedelta(days=settings.TOMBSTONE_RETENTION_DAYS):
+            # Tombstones this old have been pruned; the client must resync
+            return Response(
+                {'error': 'Cursor expired, resync with ?since=0'},
+                status=status.HTTP_410_GONE
+            )
+        watermark = commit_watermark()
+
+        queryset = self.filter_queryset(self.get_queryset()).filter(change_xid__lt=watermark)
+        if since is not None:
+            queryset = queryset.filter(
+                Q(change_xid__gt=since.xid) | Q(change_xid=since.xid, id__gt=since.id)
+            )
+        limit = settings.CHANGE_FEED_MAX_ROWS
+        rows = list(queryset.order_by('change_xid', 'id')[:limit + 1])
+
+        has_more = len(rows) > limit
+        if has_more:
+            rows = rows[:limit]
+            cursor = Cursor(rows[-1].change_xid, rows[-1].id, now)
+        else:
+            # Everything below the watermark has been reported
+            cursor = Cursor(watermark, 0, now)
+
+        deleted = []
+        if since is not None:
+            # Tombstones up to the transaction the page ends in; the rest
+            # come with the next page, which starts in that transaction
+            tombstones = Tombstone.objects.filter(
+                model=self.get_queryset().model._meta.model_name,
+                change_xid__gte=since.xid,
+                change_xid__lt=cursor.xid,
+            )
+            for backend in self.filter_backends:
+                tombstones = backend().filter_queryset(request, tombstones, self)
+            deleted = list(tombstones.order_by('change_xid', 'id').values_list('object_id', flat=True))
+
+        return Response({
+            'changes': self.get_serializer(rows, many=True).data,
+            'deleted': deleted,
+            'cursor': encode_cursor(cursor),
+            'has_more': has_more,
+        })
@@ -0,0 +1,50 @@
+from rest_framework.response import Response
+from api.serializers import IncidentSerializer, HazardZoneSerializer
+from api.services.zone_membership import (
+    incidents_in_zone, zones_covering_incident, zone_incident_ids,
+)
+
+
+def wants_live(request):
+    # ?live=true skips the stored memberships and runs the spatial join
+    return request.query_params.get('live') == 'true'
+
+
+class ZoneContainmentMixin:
+    """
+    Adds incident containment to the hazard zone viewset:
+
+        GET /api/hazard-zones/<id>/incidents/   incidents inside one zone
+        GET /api/hazard-zones/containment/      [{"hazard_zone": id, "incidents": [ids]}]
+
+    The containment listing takes the ?bbox= / ?near= filters for the
+    zones. Answers come from the ZoneMembership table, which the model
+    signals keep current, unless HAZARD_ZONE_MEMBERSHIP_MATERIALIZED is off
+    or ?live=true is passed.
+    """
+
+    def contained_incidents(self, request, pk=None):
+        zone = self.get_object()
+        incidents = incidents_in_zone(zone, live=wants_live(request)).order_by('id')
+        return Response(IncidentSerializer(incidents, many=True).data)
+
+    def containment(self, request):
+        zone_ids = self.filter_queryset(self.get_queryset()).order_by('id').values_list('id', flat=True)
+        memberships = zone_incident_ids(zone_ids, live=wants_live(request))
+        return Response([
+            {'hazard_zone': zone_id, 'incidents': incident_ids}
+            for zone_id, incident_ids in memberships.items()
+        ])
+
+
+class IncidentZonesMixin:
+    """
+    Adds the reverse lookup to the incident viewset:
+
+        GET /api/incidents/<id>/hazard-zones/   hazard zones covering one incident
+    """
+
+    def covering_zones(self, request, pk=None):
+        incident = self.get_object()
+        zones = zones_covering_incident(incident, live=wants_live(request)).order_by('id')
+        return Response(HazardZoneSerializer(zones, many=True).data)
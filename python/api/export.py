@@ -0,0 +1,119 @@
+import csv
+import io
+import zlib
+from datetime import datetime
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from api.geojson import CHUNK_SIZE, GEOJSON_CONTENT_TYPE, streaming_content
+
+EXPORT_CONTENT_TYPES = {
+    'geojson': GEOJSON_CONTENT_TYPE,
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def _iter_geojson(layout, rows):
+    return layout.iter_feature_collection(rows)
+
+
+def _iter_ndjson(layout, rows):
+    # One GeoJSON Feature per line
+    for row in rows:
+        yield (layout.encode_feature(row) + '\n').encode('utf-8')
+
+
+def _iter_csv(layout, rows):
+    columns = ['id', *layout.properties, layout.geometry_field, *layout.geometry_properties]
+    keys = ['id', *layout.properties, 'geometry', *[f'geometry_{name}' for name in layout.geometry_properties]]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in (row[key] for key in keys)
+        ])
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+
+
+EXPORT_WRITERS = {
+    'geojson': _iter_geojson,
+    'ndjson': _iter_ndjson,
+    'csv': _iter_csv,
+}
+
+
+def iter_batched(chunks, size=64 * 1024):
+    """
+    Join small chunks into blocks of about `size` bytes; the first chunk
+    goes out on its own so the client sees bytes before the first block fills
+    """
+    chunks = iter(chunks)
+    first = next(chunks, None)
+    if first is not None:
+        yield first
+    batch = []
+    length = 0
+    for chunk in chunks:
+        batch.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield b''.join(batch)
+            batch = []
+            length = 0
+    if batch:
+        yield b''.join(batch)
+
+
+def iter_gzip(blocks, level=6):
+    """Gzip a stream of blocks as they come, flushing after each block"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for block in blocks:
+        # Sync flush keeps what the client has received decodable
+        yield compressor.compress(block) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+class ExportMixin:
+    """
+    Adds a streaming full export to a GeoJSONListMixin viewset:
+
+        GET /api/incidents/export.geojson   FeatureCollection
+        GET /api/incidents/export.ndjson    one GeoJSON Feature per line
+        GET /api/incidents/export.csv       geometries as WKT
+
+    Rows come from a server-side cursor (.iterator(chunk_size=...)) and
+    are encoded and, when the client accepts it, gzipped as they arrive,
+    so worker memory stays flat however large the table and the first
+    bytes go out straight away, under WSGI and ASGI alike (see
+    streaming_content). The ?bbox= / ?near= filters apply.
+    """
+
+    def perform_content_negotiation(self, request, force=False):
+        # The export format comes from the URL, not the Accept header
+        return super().perform_content_negotiation(request, force=force or self.action == 'export')
+
+    def export(self, request, export_format):
+        if export_format not in EXPORT_WRITERS:
+            return HttpResponse(f"Unknown export format, expected any of {sorted(EXPORT_WRITERS)}", status=404)
+
+        layout = self.get_feature_layout()
+        queryset = self.filter_queryset(self.get_queryset()).order_by('id')
+        rows = layout.values(queryset, wkt=export_format == 'csv').iterator(chunk_size=CHUNK_SIZE)
+        stream = iter_batched(EXPORT_WRITERS[export_format](layout, rows))
+
+        gzipped = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+        response = StreamingHttpResponse(
+            streaming_content(request, iter_gzip(stream) if gzipped else stream),
+            content_type=EXPORT_CONTENT_TYPES[export_format],
+        )
+        if gzipped:
+            response['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        model_name = queryset.model._meta.model_name
+        response['Content-Disposition'] = f'attachment; filename="{model_name}-export.{export_format}"'
+        response['X-Accel-Buffering'] = 'no'  # Disable nginx response buffering
+        return response
@@ -0,0 +1,87 @@
+import math
+from django.contrib.gis.geos import Point, Polygon
+from django.contrib.gis.measure import D
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+from api.services.tile_math import parse_bbox
+
+# Metres per degree of latitude (and of longitude at the equator)
+METERS_PER_DEGREE = 111320.0
+# Largest ?radius= accepted, in metres
+MAX_NEAR_RADIUS = 100000
+
+
+def parse_lonlat(value):
+    """
+    Parse "lon,lat"
+    Returns: Point in SRID 4326; raises ValueError if malformed
+    """
+    parts = [float(part) for part in value.split(',')]
+    if len(parts) != 2:
+        raise ValueError("expected lon,lat")
+    if not (-180 <= parts[0] <= 180 and -90 <= parts[1] <= 90):
+        raise ValueError("lon,lat out of range")
+    return Point(parts[0], parts[1], srid=4326)
+
+
+def metres_to_degrees(point, metres):
+    """
+    Degree distance that covers at least `metres` around point in every
+    direction, for index-backed dwithin prefilters on SRID 4326 columns
+    """
+    # Longitude degrees shrink towards the poles: widen for the poleward edge
+    edge_lat = min(abs(point.y) + metres / METERS_PER_DEGREE, 89.0)
+    lat_scale = max(math.cos(math.radians(edge_lat)), 0.01)
+    return metres / (METERS_PER_DEGREE * lat_scale)
+
+
+def parse_near(value, radius):
+    """
+    Parse ?near=lon,lat and ?radius=metres
+    Returns: tuple (Point, radius in metres); raises ValueError if malformed
+    """
+    point = parse_lonlat(value)
+    if radius is None:
+        raise ValueError("near requires radius (metres)")
+    radius = float(radius)
+    if not 0 < radius <= MAX_NEAR_RADIUS:
+        raise ValueError(f"radius must be between 0 and {MAX_NEAR_RADIUS} metres")
+    return point, radius
+
+
+class SpatialFilterBackend(BaseFilterBackend):
+    """
+    Restrict a geographic queryset to the client's viewport:
+      ?bbox=minlon,minlat,maxlon,maxlat   bounding boxes overlap (&&)
+      ?near=lon,lat&radius=metres         within radius metres of a point
+
+    Both conditions are answered from the GiST index on the view's
+    `spatial_field` (default 'location').
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        field = getattr(view, 'spatial_field', 'location')
+        params = request.query_params
+
+        if params.get('bbox'):
+            try:
+                bbox = parse_bbox(params['bbox'])
+            except ValueError as e:
+                raise ValidationError({'bbox': str(e)})
+            envelope = Polygon.from_bbox(bbox)
+            envelope.srid = 4326
+            queryset = queryset.filter(**{f'{field}__bboverlaps': envelope})
+
+        if params.get('near'):
+            try:
+                point, radius = parse_near(params['near'], params.get('radius'))
+            except ValueError as e:
+                raise ValidationError({'near': str(e)})
+            # The columns are stored in degrees, so dwithin takes a degree
+            # distance: widen the radius for the latitude so this indexed
+            # prefilter never drops a match, then apply the exact metre check
+            degrees = metres_to_degrees(point, radius)
+            queryset = queryset.filter(**{f'{field}__dwithin': (point, degrees)})
+            queryset = queryset.filter(**{f'{field}__distance_lte': (point, D(m=radius))})
+
+        return queryset
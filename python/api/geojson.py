@@ -0,0 +1,152 @@
+from asgiref.sync import sync_to_async
+from django.contrib.gis.db.models import GeometryField
+from django.contrib.gis.db.models.functions import AsGeoJSON, AsWKT
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+# Rows fetched per round trip by the server-side cursor of streamed output
+CHUNK_SIZE = 2000
+# Decimal places of ST_AsGeoJSON coordinates, about 1 mm
+GEOJSON_PRECISION = 8
+
+GEOJSON_CONTENT_TYPE = 'application/geo+json'
+
+# Encodes datetimes exactly like the DRF JSON renderer does
+_encode = JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+
+async def _aiter_sync(chunks):
+    chunks = iter(chunks)
+    # Thread-sensitive: the server-side cursor stays on the request's thread
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    while True:
+        chunk = await next_chunk(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def streaming_content(request, chunks):
+    """
+    Content for a StreamingHttpResponse of byte chunks. Under ASGI Django
+    collects a sync iterator into a list before sending it, so there the
+    chunks are pulled one at a time through an async iterator instead.
+    """
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        return _aiter_sync(chunks)
+    return chunks
+
+
+class GeoJSONRenderer(JSONRenderer):
+    """
+    Lets ?format=geojson and `Accept: application/geo+json` through content
+    negotiation; GeoJSONListMixin writes list responses itself, anything
+    else is rendered as plain JSON.
+    """
+    media_type = GEOJSON_CONTENT_TYPE
+    format = 'geojson'
+
+
+class FeatureLayout:
+    """
+    How the rows of one model map onto GeoJSON features: `geometry_field`
+    becomes the feature geometry, other geometry fields become GeoJSON
+    objects in the properties, everything else is copied as is.
+    """
+
+    def __init__(self, model, fields, geometry_field='location'):
+        self.geometry_field = geometry_field
+        self.properties = []
+        self.geometry_properties = []
+        for name in fields:
+            if name in ('id', geometry_field):
+                continue
+            if isinstance(model._meta.get_field(name), GeometryField):
+                self.geometry_properties.append(name)
+            else:
+                self.properties.append(name)
+
+    def values(self, queryset, wkt=False):
+        """
+        Returns: a .values() queryset with each geometry already rendered by
+        PostGIS (ST_AsGeoJSON, or ST_AsText with wkt=True), so no GEOS
+        objects or model instances are built
+        """
+        def render(name):
+            return AsWKT(name) if wkt else AsGeoJSON(name, precision=GEOJSON_PRECISION)
+
+        annotations = {'geometry': render(self.geometry_field)}
+        for name in self.geometry_properties:
+            annotations[f'geometry_{name}'] = render(name)
+        return queryset.values('id', *self.properties, **annotations)
+
+    def encode_feature(self, row):
+        properties = _encode({name: row[name] for name in self.properties})
+        if self.geometry_properties:
+            # The geometries are JSON text already; splice them in
+            extra = ','.join(
+                f'"{name}":{row[f"geometry_{name}"] or "null"}' for name in self.geometry_properties
+            )
+            properties = f'{properties[:-1]},{extra}}}' if len(properties) > 2 else f'{{{extra}}}'
+        return (
+            f'{{"type":"Feature","id":{row["id"]},'
+            f'"geometry":{row["geometry"] or "null"},"properties":{properties}}}'
+        )
+
+    def iter_feature_collection(self, rows, members=None):
+        """
+        Yield a FeatureCollection as UTF-8 chunks, one per feature
+        members: extra top-level members, e.g. the "next" link of a page
+        """
+        head = '{"type":"FeatureCollection",'
+        if members:
+            head += _encode(members)[1:-1] + ','
+        yield (head + '"features":[').encode('utf-8')
+        separator = ''
+        for row in rows:
+            yield (separator + self.encode_feature(row)).encode('utf-8')
+            separator = ','
+        yield b']}'
+
+
+class GeoJSONListMixin:
+    """
+    Adds a GeoJSON FeatureCollection output mode to a ModelViewSet's list:
+
+        GET /api/hazard-zones/?format=geojson
+        GET /api/hazard-zones/   Accept: application/geo+json
+
+    Rows are read with .values() and ST_AsGeoJSON, skipping model instances
+    and serializer fields; the properties are the serializer's fields. The
+    whole list is streamed from a server-side cursor. The ?bbox= / ?near=
+    filters apply, and ?cursor= / ?page_size= return one page with a
+    "next" member.
+    """
+
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, GeoJSONRenderer]
+    geojson_geometry_field = 'location'
+
+    def get_feature_layout(self):
+        return FeatureLayout(
+            self.get_queryset().model,
+            self.get_serializer_class().Meta.fields,
+            self.geojson_geometry_field,
+        )
+
+    def list(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != GeoJSONRenderer.format:
+            return super().list(request, *args, **kwargs)
+
+        layout = self.get_feature_layout()
+        rows = layout.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            body = b''.join(layout.iter_feature_collection(page, {'next': self.paginator.get_next_link()}))
+            return HttpResponse(body, content_type=GEOJSON_CONTENT_TYPE)
+        return StreamingHttpResponse(
+            streaming_content(request, layout.iter_feature_collection(rows.iterator(chunk_size=CHUNK_SIZE))),
+            content_type=GEOJSON_CONTENT_TYPE,
+        )
@@ -0,0 +1,87 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from api.models import Incident, Hazard_Zone
+from api.services.zone_membership import (
+    incidents_in_zone, rebuild_memberships, refresh_memberships, zone_incident_ids, zones_covering_incident,
+)
+from .bench_geojson import make_hazard_zone, make_incident
+from .loadtest_tiles import percentile
+import random
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark incident-in-hazard-zone queries: live ST_Intersects joins vs the stored '
+        'ZoneMembership table, plus the cost of keeping the table current. Synthetic rows '
+        'are inserted in a transaction that is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--zones', type=int, default=1000, help='Synthetic hazard zones')
+        parser.add_argument('--incidents', type=int, default=100000, help='Synthetic incidents')
+        parser.add_argument('--vertices', type=int, default=64, help='Vertices per hazard zone ring')
+        parser.add_argument('--lookups', type=int, default=200, help='Single zone / incident lookups to time')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if options['zones'] < 1 or options['incidents'] < 1 or options['lookups'] < 1:
+            raise CommandError('--zones, --incidents and --lookups must be positive')
+        rng = random.Random(options['seed'])
+
+        with transaction.atomic():
+            self.stdout.write(f'Inserting {options["zones"]} zones and {options["incidents"]} incidents...')
+            Hazard_Zone.objects.bulk_create(
+                [make_hazard_zone(rng, i, options['vertices']) for i in range(options['zones'])], batch_size=1000
+            )
+            Incident.objects.bulk_create(
+                [make_incident(rng, i) for i in range(options['incidents'])], batch_size=1000
+            )
+
+            start = time.perf_counter()
+            count = rebuild_memberships()
+            self.stdout.write(f'Full rebuild:                 {time.perf_counter() - start:8.2f}s ({count} memberships)')
+            self.stdout.write('-' * 60)
+
+            zone_ids = list(Hazard_Zone.objects.values_list('id', flat=True))
+            for live in (True, False):
+                start = time.perf_counter()
+                zone_incident_ids(zone_ids, live=live)
+                label = 'live join' if live else 'stored'
+                self.stdout.write(f'All zones, {label + ":":<19} {(time.perf_counter() - start) * 1000:8.1f}ms')
+
+            zones = list(Hazard_Zone.objects.order_by('?')[:options['lookups']])
+            incidents = list(Incident.objects.order_by('?')[:options['lookups']])
+            for live in (True, False):
+                label = 'live' if live else 'stored'
+                zone_times = self._time(lambda zone: list(incidents_in_zone(zone, live).values_list('id')), zones)
+                incident_times = self._time(
+                    lambda incident: list(zones_covering_incident(incident, live).values_list('id')), incidents
+                )
+                self.stdout.write(
+                    f'One zone, {label}:  p50 {percentile(zone_times, 50) * 1000:6.2f}ms '
+                    f'p99 {percentile(zone_times, 99) * 1000:6.2f}ms'
+                )
+                self.stdout.write(
+                    f'One incident, {label}:  p50 {percentile(incident_times, 50) * 1000:6.2f}ms '
+                    f'p99 {percentile(incident_times, 99) * 1000:6.2f}ms'
+                )
+
+            self.stdout.write('-' * 60)
+            created = Incident.objects.bulk_create([make_incident(rng, i) for i in range(options['lookups'])])
+            times = self._time(lambda incident: refresh_memberships(Incident, [incident.pk]), created)
+            self.stdout.write(f'Maintain on incident save: p50 {percentile(times, 50) * 1000:6.2f}ms')
+            times = self._time(lambda zone: refresh_memberships(Hazard_Zone, [zone.pk]), zones)
+            self.stdout.write(f'Maintain on zone save:     p50 {percentile(times, 50) * 1000:6.2f}ms')
+
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def _time(operation, items):
+        times = []
+        for item in items:
+            start = time.perf_counter()
+            operation(item)
+            times.append(time.perf_counter() - start)
+        times.sort()
+        return times
@@ -0,0 +1,99 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.gis.geos import Point, Polygon
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from api.geojson import CHUNK_SIZE, FeatureLayout
+from api.models import Incident, Hazard_Zone
+from api.serializers import IncidentSerializer, HazardZoneSerializer
+import math
+import random
+import time
+
+# Berlin, where the synthetic rows are placed
+AREA = (13.0882, 52.3382, 13.7606, 52.6755)
+
+MODELS = {
+    'incident': (Incident, IncidentSerializer),
+    'hazard_zone': (Hazard_Zone, HazardZoneSerializer),
+}
+
+
+def make_incident(rng, i):
+    lon, lat = rng.uniform(AREA[0], AREA[2]), rng.uniform(AREA[1], AREA[3])
+    return Incident(name=f'bench {i}', location=Point(lon, lat, srid=4326), severity='medium')
+
+
+def make_hazard_zone(rng, i, vertices):
+    lon, lat = rng.uniform(AREA[0], AREA[2]), rng.uniform(AREA[1], AREA[3])
+    radius = rng.uniform(0.002, 0.02)
+    ring = [
+        (lon + radius * math.cos(2 * math.pi * k / vertices), lat + radius * math.sin(2 * math.pi * k / vertices))
+        for k in range(vertices)
+    ]
+    ring.append(ring[0])
+    return Hazard_Zone(
+        name=f'bench {i}', location=Polygon(ring, srid=4326), center=Point(lon, lat, srid=4326), severity='high'
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark list serialization: ModelSerializer + JSONRenderer vs the ST_AsGeoJSON '
+        'FeatureCollection path (?format=geojson). Synthetic rows are inserted in a '
+        'transaction that is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', default='1000,10000,100000', help='Comma separated row counts')
+        parser.add_argument('--models', default='incident,hazard_zone', help=f'Any of {",".join(MODELS)}')
+        parser.add_argument('--vertices', type=int, default=64, help='Vertices per synthetic hazard zone ring')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted(int(n) for n in options['rows'].split(','))
+        except ValueError:
+            raise CommandError('--rows must be comma separated integers')
+        names = options['models'].split(',')
+        if not set(names) <= set(MODELS):
+            raise CommandError(f'--models must be any of {",".join(MODELS)}')
+        rng = random.Random(options['seed'])
+
+        with transaction.atomic():
+            for name in names:
+                self._bench(name, sizes, rng, options)
+            transaction.set_rollback(True)
+
+    def _bench(self, name, sizes, rng, options):
+        model, serializer_class = MODELS[name]
+        existing = model.objects.count()
+        missing = sizes[-1] - existing
+        if missing > 0:
+            self.stdout.write(f'Inserting {missing} synthetic {name} rows...')
+            if model is Hazard_Zone:
+                rows = [make_hazard_zone(rng, i, options['vertices']) for i in range(missing)]
+            else:
+                rows = [make_incident(rng, i) for i in range(missing)]
+            model.objects.bulk_create(rows, batch_size=CHUNK_SIZE)
+
+        layout = FeatureLayout(model, serializer_class.Meta.fields)
+        queryset = model.objects.order_by('-created_at', '-id')
+        self.stdout.write(f'{name}')
+        self.stdout.write(f'{"rows":>8} {"serializer":>12} {"geojson":>12} {"speedup":>8} {"bytes":>12}')
+        self.stdout.write('-' * 56)
+        for size in sizes:
+            start = time.perf_counter()
+            JSONRenderer().render(serializer_class(queryset[:size], many=True).data)
+            baseline = time.perf_counter() - start
+
+            start = time.perf_counter()
+            body = b''.join(layout.iter_feature_collection(
+                layout.values(queryset[:size]).iterator(chunk_size=CHUNK_SIZE)
+            ))
+            fast = time.perf_counter() - start
+
+            self.stdout.write(
+                f'{size:>8} {baseline * 1000:>10.0f}ms {fast * 1000:>10.0f}ms '
+                f'{baseline / fast:>7.1f}x {len(body):>12}'
+            )
+        self.stdout.write('')
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.services.mbtiles_service import MBTilesService, TILE_QUERY
+import os
+import random
+import sqlite3
+import time
+
+
+def read_tile_per_connection(mbtiles_path, z, x, y):
+    """Baseline: open a new connection for every tile, as the service used to"""
+    y_tms = (2 ** z) - 1 - y
+    with sqlite3.connect(mbtiles_path) as conn:
+        row = conn.execute(TILE_QUERY, (z, x, y_tms)).fetchone()
+        return row[0] if row else None
+
+
+class Command(BaseCommand):
+    help = 'Benchmark tile reads per second: connection-per-request vs pooled MBTilesService'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mbtiles',
+            default=os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), 'berlin.mbtiles'),
+            help='Path to the MBTiles file (default: berlin.mbtiles)',
+        )
+        parser.add_argument('--tiles', type=int, default=2000, help='Number of tile reads per run')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed for the tile sample')
+
+    def handle(self, *args, **options):
+        mbtiles_path = options['mbtiles']
+        if not os.path.exists(mbtiles_path):
+            raise CommandError(f'MBTiles file not found: {mbtiles_path}')
+
+        # Sample real tile coordinates so every read is a hit
+        with sqlite3.connect(mbtiles_path) as conn:
+            rows = conn.execute('SELECT zoom_level, tile_column, tile_row FROM tiles').fetchall()
+        if not rows:
+            raise CommandError('MBTiles file contains no tiles')
+        rng = random.Random(options['seed'])
+        sample = [(z, x, (2 ** z) - 1 - y_tms) for z, x, y_tms in rng.choices(rows, k=options['tiles'])]
+
+        self.stdout.write(f'Reading {len(sample)} tiles from {mbtiles_path}')
+        self.stdout.write('-' * 50)
+
+        start = time.perf_counter()
+        for z, x, y in sample:
+            read_tile_per_connection(mbtiles_path, z, x, y)
+        baseline = len(sample) / (time.perf_counter() - start)
+        self.stdout.write(f'Connection per request: {baseline:10.0f} tiles/sec')
+
+        service = MBTilesService(mbtiles_path)
+        start = time.perf_counter()
+        for z, x, y in sample:
+            service.get_tile(z, x, y)
+        pooled = len(sample) / (time.perf_counter() - start)
+        service.close()
+        self.stdout.write(f'Pooled connection:      {pooled:10.0f} tiles/sec')
+
+        self.stdout.write('-' * 50)
+        self.stdout.write(self.style.SUCCESS(f'Speedup: {pooled / baseline:.1f}x'))
@@ -0,0 +1,103 @@
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from api.services.glyph_store import glyph_store
+from api.services.tile_math import lonlat_to_tile
+from api.views.tile_views import tile_source
+from io import BytesIO
+import time
+
+FAST_PATH_MIDDLEWARE = 'api.middleware.MapFastPathMiddleware'
+
+
+def make_environ(path, host):
+    return {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': host,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': host,
+        'HTTP_ACCEPT_ENCODING': 'gzip, deflate, br',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': BytesIO(),
+        'wsgi.multithread': False,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure single-worker requests/sec of tile, glyph and style requests through '
+        'the WSGI handler with the full MIDDLEWARE stack and with MapFastPathMiddleware '
+        'in front of it. Runs in-process, so the figures are the Django overhead per '
+        'request without network or server costs.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000, help='Requests per path and stack')
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Path to request, may be given several times (default: one tile, glyph range and style)'
+        )
+        parser.add_argument('--host', default='localhost')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or self._default_paths()
+        full_stack = [name for name in settings.MIDDLEWARE if name != FAST_PATH_MIDDLEWARE]
+        stacks = [
+            ('full', full_stack),
+            ('fast path', [FAST_PATH_MIDDLEWARE] + full_stack),
+        ]
+
+        self.stdout.write(f'{options["requests"]} requests per path, one worker')
+        self.stdout.write('-' * 72)
+        self.stdout.write(f'{"path":<44} {"stack":<10} {"req/s":>8} {"us/req":>8}')
+        for path in paths:
+            rates = []
+            for name, middleware in stacks:
+                with override_settings(MIDDLEWARE=middleware):
+                    handler = WSGIHandler()
+                status = self._request(handler, path, options['host'])
+                if not status.startswith(('200', '304')):
+                    raise CommandError(f'{path} answered {status} with the {name} stack')
+                elapsed = self._run(handler, path, options['host'], options['requests'])
+                rate = options['requests'] / elapsed
+                rates.append(rate)
+                self.stdout.write(f'{path[:44]:<44} {name:<10} {rate:>8.0f} {elapsed / options["requests"] * 1e6:>8.1f}')
+            self.stdout.write(f'{"":<44} {"speedup":<10} {rates[1] / rates[0]:>7.2f}x')
+
+    def _default_paths(self):
+        paths = ['/api/styles/osm-bright-local.json']
+        fonts = glyph_store.fonts()
+        if fonts and fonts[0]['ranges']:
+            paths.append(f'/api/fonts/{fonts[0]["name"]}/{fonts[0]["ranges"][0]}.pbf')
+        center = tile_source.get_center()
+        if center:
+            z = int(center[2])
+            x, y = lonlat_to_tile(center[0], center[1], z)
+            paths.append(f'/api/tiles/{z}/{x}/{y}.mvt')
+        return paths
+
+    def _request(self, handler, path, host):
+        result = {}
+
+        def start_response(status, headers, exc_info=None):
+            result['status'] = status
+
+        response = handler(make_environ(path, host), start_response)
+        for _ in response:
+            pass
+        response.close()
+        return result['status']
+
+    def _run(self, handler, path, host, count):
+        start = time.perf_counter()
+        for _ in range(count):
+            self._request(handler, path, host)
+        return time.perf_counter() - start
@@ -0,0 +1,93 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.services.mbtiles_service import MBTilesService
+from api.services.pmtiles_service import PMTilesService
+from .loadtest_tiles import percentile
+import os
+import random
+import resource
+import sqlite3
+import time
+
+
+def current_rss_bytes():
+    """Resident set size of this process (Linux /proc, falls back to the peak RSS)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare tile lookup latency and memory of the MBTiles and PMTiles backends. '
+        'Create the PMTiles file first with `manage.py convert_to_pmtiles`. RSS deltas '
+        'include the file pages each backend maps; use --only for an isolated figure.'
+    )
+
+    def add_arguments(self, parser):
+        default_mbtiles = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), 'berlin.mbtiles'
+        )
+        parser.add_argument('--mbtiles', default=default_mbtiles, help='MBTiles file (default: berlin.mbtiles)')
+        parser.add_argument('--pmtiles', help='PMTiles file (default: the MBTiles path with .pmtiles)')
+        parser.add_argument('--tiles', type=int, default=20000, help='Number of tile lookups per backend')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed for the tile sample')
+        parser.add_argument('--only', choices=['mbtiles', 'pmtiles'], help='Benchmark a single backend')
+
+    def handle(self, *args, **options):
+        mbtiles_path = options['mbtiles']
+        pmtiles_path = options['pmtiles'] or os.path.splitext(mbtiles_path)[0] + '.pmtiles'
+        for path in (mbtiles_path, pmtiles_path):
+            if not os.path.exists(path):
+                raise CommandError(f'File not found: {path}')
+
+        # Sample real tile coordinates so every lookup is a hit
+        with sqlite3.connect(mbtiles_path) as conn:
+            rows = conn.execute('SELECT zoom_level, tile_column, tile_row FROM tiles').fetchall()
+        if not rows:
+            raise CommandError('MBTiles file contains no tiles')
+        rng = random.Random(options['seed'])
+        sample = [(z, x, (2 ** z) - 1 - y_tms) for z, x, y_tms in rng.choices(rows, k=options['tiles'])]
+
+        backends = [('mbtiles', MBTilesService, mbtiles_path), ('pmtiles', PMTilesService, pmtiles_path)]
+        if options['only']:
+            backends = [backend for backend in backends if backend[0] == options['only']]
+
+        self.stdout.write(f'{len(sample)} lookups per backend, no tile cache')
+        self.stdout.write('-' * 72)
+        self.stdout.write(
+            f'{"backend":<10} {"tiles/s":>10} {"p50 us":>10} {"p99 us":>10} {"open ms":>10} {"RSS +MB":>10}'
+        )
+        for name, service_class, path in backends:
+            rss_before = current_rss_bytes()
+            start = time.perf_counter()
+            service = service_class(path)
+            # Include the first metadata/directory read in the open time
+            service.get_zoom_range()
+            open_time = time.perf_counter() - start
+
+            latencies = []
+            missing = 0
+            total_start = time.perf_counter()
+            for z, x, y in sample:
+                start = time.perf_counter()
+                tile_data = service.get_tile(z, x, y)
+                # Touch the bytes so lazily mapped data is really read
+                if tile_data is None or len(bytes(tile_data)) == 0:
+                    missing += 1
+                latencies.append(time.perf_counter() - start)
+            elapsed = time.perf_counter() - total_start
+            rss_delta = current_rss_bytes() - rss_before
+            service.close()
+
+            latencies.sort()
+            self.stdout.write(
+                f'{name:<10} {len(sample) / elapsed:>10.0f} '
+                f'{percentile(latencies, 50) * 1e6:>10.1f} '
+                f'{percentile(latencies, 99) * 1e6:>10.1f} '
+                f'{open_time * 1000:>10.2f} '
+                f'{rss_delta / (1024 * 1024):>10.1f}'
+            )
+            if missing:
+                self.stdout.write(self.style.WARNING(f'{name}: {missing} lookups returned no tile'))
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.core.management.base import BaseCommand
 import requests
 import os
@@ -12,14 +13,17 @@ class Command(BaseCommand):
         
         # Check if Vite dev server is running
         try:
-            response = requests.get('http://localhost:5173', timeout=2)
+            response = requests.get(settings.VITE_DEV_SERVER_URL, timeout=2)
             if response.status_code == 200:
-                self.stdout.write(self.style.SUCCESS('✓ Vite dev server is running on port 5173'))
-                self.stdout.write(self.style.SUCCESS('  Frontend will use HMR (Hot Module Replacement)'))
+                self.stdout.write(self.style.SUCCESS(f'✓ Vite dev server is running at {settings.VITE_DEV_SERVER_URL}'))
+                if settings.FRONTEND_MODE == 'dev':
+                    self.stdout.write(self.style.SUCCESS('  Frontend will use HMR (Hot Module Replacement)'))
+                else:
+                    self.stdout.write(self.style.WARNING('  FRONTEND_MODE is prod: / serves the built files'))
             else:
                 self.stdout.write(self.style.WARNING('! Vite dev server responded with status: {}'.format(response.status_code)))
         except requests.exceptions.ConnectionError:
-            self.stdout.write(self.style.WARNING('✗ Vite dev server is not running on port 5173'))
+            self.stdout.write(self.style.WARNING(f'✗ Vite dev server is not running at {settings.VITE_DEV_SERVER_URL}'))
             self.stdout.write('  To start dev server: cd js && pnpm run dev')
         except Exception as e:
             self.stdout.write(self.style.ERROR('Error checking Vite dev server: {}'.format(str(e))))
@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from api.services.asset_manifest import COMPRESSIBLE_EXTENSIONS, PRECOMPRESSED_SUFFIXES
+from api.services.encodings import available_encodings, compress
+import os
+
+
+class Command(BaseCommand):
+    help = (
+        'Write .br and .gz copies of the compressible files of the built frontend, which '
+        'SERVE_FRONTEND_ASSETS sends to clients accepting them. Run after `pnpm run build`.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dist', default=str(settings.FRONTEND_DIST_DIR), help='Frontend build directory')
+        parser.add_argument(
+            '--min-size', type=int, default=1024,
+            help='Skip files smaller than this many bytes'
+        )
+
+    def handle(self, *args, **options):
+        dist_dir = options['dist']
+        if not os.path.isdir(dist_dir):
+            raise CommandError(f'{dist_dir} does not exist; build the frontend first')
+        encodings = available_encodings()
+        if 'br' not in encodings:
+            self.stdout.write(self.style.WARNING('brotli is not installed, writing .gz copies only'))
+
+        written = 0
+        original_bytes = 0
+        compressed_bytes = {encoding: 0 for encoding in encodings}
+        for root, _, files in os.walk(dist_dir):
+            for name in files:
+                if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+                    continue
+                path = os.path.join(root, name)
+                with open(path, 'rb') as f:
+                    data = f.read()
+                if len(data) < options['min_size']:
+                    continue
+                original_bytes += len(data)
+                for encoding in encodings:
+                    target = path + PRECOMPRESSED_SUFFIXES[encoding]
+                    compressed = compress(data, encoding)
+                    if len(compressed) >= len(data):
+                        # Not worth sending; drop a stale copy from an earlier build
+                        if os.path.exists(target):
+                            os.remove(target)
+                        continue
+                    with open(target, 'wb') as f:
+                        f.write(compressed)
+                    # Same mtime as the original, so stale copies are recognisable
+                    st = os.stat(path)
+                    os.utime(target, ns=(st.st_atime_ns, st.st_mtime_ns))
+                    compressed_bytes[encoding] += len(compressed)
+                    written += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} precompressed files in {dist_dir}'))
+        for encoding, size in compressed_bytes.items():
+            self.stdout.write(f'  {encoding}: {original_bytes} -> {size} bytes')
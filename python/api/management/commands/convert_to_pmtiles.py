@@ -0,0 +1,141 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.services import pmtiles_format
+from api.services.mbtiles_service import MBTilesService
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+
+
+def _e7(value):
+    return int(round(float(value) * 1e7))
+
+
+class Command(BaseCommand):
+    help = (
+        'Convert an MBTiles file to a PMTiles v3 archive. Tiles are written in '
+        'tile id (Hilbert) order, identical blobs are stored once and runs of '
+        'identical consecutive tiles share one directory entry.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mbtiles',
+            default=os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), 'berlin.mbtiles'),
+            help='Source MBTiles file (default: berlin.mbtiles)',
+        )
+        parser.add_argument('--output', help='PMTiles file to write (default: next to the source, .pmtiles)')
+
+    def handle(self, *args, **options):
+        mbtiles_path = options['mbtiles']
+        if not os.path.exists(mbtiles_path):
+            raise CommandError(f'MBTiles file not found: {mbtiles_path}')
+        output = options['output'] or os.path.splitext(mbtiles_path)[0] + '.pmtiles'
+
+        service = MBTilesService(mbtiles_path)
+        metadata = service.get_metadata()
+        minzoom, maxzoom = service.get_zoom_range()
+        bounds = service.get_bounds() or [-180.0, -85.0, 180.0, 85.0]
+        center = service.get_center() or [(bounds[0] + bounds[2]) / 2, (bounds[1] + bounds[3]) / 2, minzoom]
+
+        # First pass: the coordinates of every tile, sorted by tile id
+        with sqlite3.connect(mbtiles_path) as conn:
+            coords = conn.execute('SELECT zoom_level, tile_column, tile_row FROM tiles').fetchall()
+        order = sorted(
+            (pmtiles_format.zxy_to_tileid(z, x, (2 ** z) - 1 - y_tms), z, x, (2 ** z) - 1 - y_tms)
+            for z, x, y_tms in coords
+        )
+
+        # Second pass: append blobs to a scratch file in tile id order
+        entries = []
+        offsets_by_hash = {}
+        data_length = 0
+        with tempfile.TemporaryFile() as tile_data:
+            for tile_id, z, x, y in order:
+                blob = service.get_tile(z, x, y)
+                if blob is None:
+                    continue
+                digest = hashlib.md5(blob).digest()
+                known = offsets_by_hash.get(digest)
+                if known is None:
+                    known = (data_length, len(blob))
+                    offsets_by_hash[digest] = known
+                    tile_data.write(blob)
+                    data_length += len(blob)
+                offset, length = known
+                if entries:
+                    last_id, last_offset, last_length, run_length = entries[-1]
+                    if last_offset == offset and last_id + run_length == tile_id:
+                        entries[-1] = (last_id, last_offset, last_length, run_length + 1)
+                        continue
+                entries.append((tile_id, offset, length, 1))
+            service.close()
+            if not entries:
+                raise CommandError('MBTiles file contains no tiles')
+
+            compression = pmtiles_format.COMPRESSION_GZIP
+            root, leaves = pmtiles_format.build_directories(entries, compression)
+
+            document = {key: value for key, value in metadata.items() if key != 'json'}
+            if metadata.get('json'):
+                try:
+                    document.update(json.loads(metadata['json']))
+                except ValueError:
+                    self.stderr.write('Ignoring invalid json metadata')
+            metadata_bytes = pmtiles_format.compress(json.dumps(document).encode('utf-8'), compression)
+
+            root_offset = pmtiles_format.HEADER_SIZE
+            metadata_offset = root_offset + len(root)
+            leaf_offset = metadata_offset + len(metadata_bytes)
+            data_offset = leaf_offset + len(leaves)
+            header = {
+                'magic': pmtiles_format.MAGIC,
+                'version': pmtiles_format.SPEC_VERSION,
+                'root_offset': root_offset,
+                'root_length': len(root),
+                'metadata_offset': metadata_offset,
+                'metadata_length': len(metadata_bytes),
+                'leaf_directory_offset': leaf_offset,
+                'leaf_directory_length': len(leaves),
+                'tile_data_offset': data_offset,
+                'tile_data_length': data_length,
+                'addressed_tiles_count': sum(entry[3] for entry in entries),
+                'tile_entries_count': len(entries),
+                'tile_contents_count': len(offsets_by_hash),
+                'clustered': 1,
+                'internal_compression': compression,
+                # MBTiles vector tiles are stored gzipped
+                'tile_compression': pmtiles_format.COMPRESSION_GZIP,
+                'tile_type': pmtiles_format.TILE_TYPE_MVT,
+                'min_zoom': minzoom,
+                'max_zoom': maxzoom,
+                'min_lon_e7': _e7(bounds[0]),
+                'min_lat_e7': _e7(bounds[1]),
+                'max_lon_e7': _e7(bounds[2]),
+                'max_lat_e7': _e7(bounds[3]),
+                'center_zoom': int(center[2]) if len(center) > 2 else minzoom,
+                'center_lon_e7': _e7(center[0]),
+                'center_lat_e7': _e7(center[1]),
+            }
+
+            # Write next to the destination and rename, so a running server
+            # never maps a half-written archive
+            partial = output + '.partial'
+            with open(partial, 'wb') as out:
+                out.write(pmtiles_format.serialize_header(header))
+                out.write(root)
+                out.write(metadata_bytes)
+                out.write(leaves)
+                tile_data.seek(0)
+                shutil.copyfileobj(tile_data, out)
+            os.replace(partial, output)
+
+        size_mb = os.path.getsize(output) / (1024 * 1024)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Wrote {header["addressed_tiles_count"]} tiles ({len(offsets_by_hash)} distinct, '
+                f'{len(entries)} directory entries) to {output} ({size_mb:.1f} MB)'
+            )
+        )
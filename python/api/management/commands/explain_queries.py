@@ -0,0 +1,171 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from api.change_feed import Cursor, commit_watermark, encode_cursor
+from api.models import Incident, Waypoint, Hazard_Zone, Tombstone, ZoneMembership
+from api.services.simplify import resimplify_hazard_zones
+from api.services.tile_math import lonlat_to_tile
+from api.services.zone_membership import rebuild_memberships
+import json
+
+# Berlin, where the generated rows are placed, and a point in its centre
+AREA = (13.0882, 52.3382, 13.7606, 52.6755)
+CENTER = (13.4050, 52.5200)
+
+SEVERITIES = "ARRAY['low', 'medium', 'high', 'critical']"
+WAYPOINT_TYPES = (
+    "ARRAY['policestation', 'firestation', 'hospital', 'critical infrastructure', "
+    "'medical facility', 'supply center', 'other']"
+)
+
+RANDOM_POINT = (
+    f"ST_SetSRID(ST_MakePoint({AREA[0]} + random() * {AREA[2] - AREA[0]}, "
+    f"{AREA[1]} + random() * {AREA[3] - AREA[1]}), 4326)"
+)
+# Generated rows spread their timestamps over the last 30 days
+SPREAD_TIME = "now() - (g::float / %(rows)s) * interval '30 days'"
+
+INSERT_INCIDENTS_SQL = f"""
+INSERT INTO {Incident._meta.db_table} (kind, name, location, severity, created_at, updated_at)
+SELECT 'incident', 'explain ' || g, {RANDOM_POINT},
+       ({SEVERITIES})[1 + floor(random() * 4)::int], {SPREAD_TIME}, {SPREAD_TIME}
+FROM generate_series(1, %(rows)s) g
+"""
+
+INSERT_WAYPOINTS_SQL = f"""
+INSERT INTO {Waypoint._meta.db_table} (kind, name, location, type, is_available, created_at, updated_at)
+SELECT 'waypoint', 'explain ' || g, {RANDOM_POINT},
+       ({WAYPOINT_TYPES})[1 + floor(random() * 7)::int], random() < 0.8, {SPREAD_TIME}, {SPREAD_TIME}
+FROM generate_series(1, %(rows)s) g
+"""
+
+# The lateral subquery references g so its random point is drawn per row
+INSERT_HAZARD_ZONES_SQL = f"""
+INSERT INTO {Hazard_Zone._meta.db_table} (kind, name, location, center, severity, created_at, updated_at)
+SELECT 'hazardZone', 'explain ' || g, ST_Buffer(center, 0.002 + random() * 0.01, 16), center,
+       ({SEVERITIES})[1 + floor(random() * 4)::int], {SPREAD_TIME}, {SPREAD_TIME}
+FROM generate_series(1, %(rows)s) g, LATERAL (SELECT {RANDOM_POINT} AS center WHERE g > 0) c
+"""
+
+INSERT_TOMBSTONES_SQL = f"""
+INSERT INTO {Tombstone._meta.db_table} (model, object_id, location, deleted_at)
+SELECT 'incident', -g, {RANDOM_POINT}, now() - (g::float / %(rows)s) * interval '7 days'
+FROM generate_series(1, %(rows)s) g
+"""
+
+
+def iter_plan_nodes(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from iter_plan_nodes(child)
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a large dataset in a rolled-back transaction, issue the API requests the '
+        'viewsets serve, run EXPLAIN ANALYZE on every query they make and fail if any reads '
+        'a big table with a sequential scan.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--incidents', type=int, default=1000000)
+        parser.add_argument('--waypoints', type=int, default=100000)
+        parser.add_argument('--zones', type=int, default=1000)
+        parser.add_argument('--tombstones', type=int, default=100000)
+        parser.add_argument(
+            '--max-seq-rows', type=int, default=10000,
+            help='Fail on sequential scans reading more rows than this'
+        )
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._generate(options)
+            failures = self._explain_requests(options)
+            transaction.set_rollback(True)
+
+        self.stdout.write('-' * 60)
+        if failures:
+            for url, sql, relation, rows in failures:
+                self.stderr.write(f'{url}\n  Seq Scan on {relation} ({rows} rows): {sql[:300]}')
+            raise CommandError(f'{len(failures)} queries use sequential scans')
+        self.stdout.write(self.style.SUCCESS('No sequential scans on large tables'))
+
+    def _generate(self, options):
+        self.stdout.write('Generating data...')
+        with connection.cursor() as cursor:
+            for sql, rows in (
+                (INSERT_INCIDENTS_SQL, options['incidents']),
+                (INSERT_WAYPOINTS_SQL, options['waypoints']),
+                (INSERT_HAZARD_ZONES_SQL, options['zones']),
+                (INSERT_TOMBSTONES_SQL, options['tombstones']),
+            ):
+                cursor.execute(sql, {'rows': rows})
+        resimplify_hazard_zones()
+        rebuild_memberships()
+        with connection.cursor() as cursor:
+            for model in (Incident, Waypoint, Hazard_Zone, Tombstone, ZoneMembership):
+                cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+    def _urls(self, client):
+        lon, lat = CENTER
+        bbox = f'{lon - 0.01},{lat - 0.01},{lon + 0.01},{lat + 0.01}'
+        since = encode_cursor(Cursor(commit_watermark(), 0, timezone.now()))
+        first_page = client.get('/api/incidents/?page_size=200').json()
+        incident_id = Incident.objects.order_by('-id').values_list('id', flat=True).first()
+        zone_id = Hazard_Zone.objects.order_by('-id').values_list('id', flat=True).first()
+        x, y = lonlat_to_tile(lon, lat, 14)
+        urls = [
+            first_page['next'],
+            f'/api/incidents/?bbox={bbox}&page_size=200',
+            f'/api/incidents/?near={lon},{lat}&radius=500&page_size=200',
+            f'/api/incidents/?since={since}',
+            f'/api/incidents/?format=geojson&page_size=200',
+            f'/api/incidents/{incident_id}/hazard-zones/',
+            f'/api/waypoints/?page_size=200',
+            f'/api/waypoints/?bbox={bbox}&page_size=200',
+            f'/api/waypoints/?since={since}',
+            f'/api/waypoints/nearest/?point={lon},{lat}&k=5',
+            f'/api/waypoints/nearest/?point={lon},{lat}&k=5&type=hospital&distance=true',
+            f'/api/hazard-zones/?page_size=200&zoom=8',
+            f'/api/hazard-zones/?bbox={bbox}&page_size=200',
+            f'/api/hazard-zones/?since={since}',
+            f'/api/hazard-zones/{zone_id}/incidents/',
+            f'/api/hazard-zones/containment/?bbox={bbox}',
+            f'/api/clusters/?bbox={bbox}&zoom=14',
+            f'/api/ops-tiles/14/{x}/{y}.mvt',
+        ]
+        # The next link is absolute
+        return ['/api/incidents/?page_size=200'] + [url.replace('http://localhost', '') for url in urls]
+
+    def _explain_requests(self, options):
+        client = Client(HTTP_HOST='localhost')
+        failures = []
+        for url in self._urls(client):
+            with CaptureQueriesContext(connection) as captured:
+                response = client.get(url)
+            if response.status_code >= 400:
+                raise CommandError(f'{url} answered {response.status_code}')
+            self.stdout.write(f'{url}')
+            for query in captured.captured_queries:
+                sql = query['sql']
+                if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+                    continue
+                with connection.cursor() as cursor:
+                    cursor.execute(f'EXPLAIN (ANALYZE, FORMAT JSON) {sql}')
+                    plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                root = plan[0]['Plan']
+                self.stdout.write(f'  {plan[0]["Execution Time"]:8.2f}ms  {root["Node Type"]}')
+                if options['verbose_plans']:
+                    self.stdout.write(json.dumps(root, indent=2))
+                for node in iter_plan_nodes(root):
+                    if node['Node Type'] != 'Seq Scan':
+                        continue
+                    rows = (node['Actual Rows'] + node.get('Rows Removed by Filter', 0)) * node['Actual Loops']
+                    if rows > options['max_seq_rows']:
+                        failures.append((url, sql, node['Relation Name'], rows))
+        return failures
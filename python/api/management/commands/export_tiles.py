@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.services.mbtiles_service import MBTilesService
+from api.services.mbtiles_export import export_mbtiles
+from api.services.tile_math import parse_bbox
+import os
+
+
+class Command(BaseCommand):
+    help = 'Export the tiles inside a bounding box and zoom range to a new MBTiles file for offline use'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Path of the MBTiles file to write')
+        parser.add_argument(
+            '--bbox',
+            required=True,
+            help='Bounding box as minlon,minlat,maxlon,maxlat',
+        )
+        parser.add_argument('--minzoom', type=int, default=0)
+        parser.add_argument('--maxzoom', type=int, default=14)
+        parser.add_argument(
+            '--mbtiles',
+            default=os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), 'berlin.mbtiles'),
+            help='Source MBTiles file (default: berlin.mbtiles)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            bbox = parse_bbox(options['bbox'])
+        except ValueError as e:
+            raise CommandError(f'Invalid --bbox: {str(e)}')
+        if not 0 <= options['minzoom'] <= options['maxzoom']:
+            raise CommandError('Invalid zoom range')
+
+        service = MBTilesService(options['mbtiles'])
+        result = export_mbtiles(service, options['output'], bbox, options['minzoom'], options['maxzoom'])
+        service.close()
+
+        size_mb = os.path.getsize(options['output']) / (1024 * 1024)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Exported {result['tiles']} tiles ({result['images']} distinct) "
+                f"to {options['output']} ({size_mb:.1f} MB)"
+            )
+        )
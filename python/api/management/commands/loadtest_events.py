@@ -0,0 +1,166 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.services.event_broker import EventBroker
+from .loadtest_tiles import percentile
+from urllib.parse import urlsplit
+import asyncio
+import http.client
+import json
+import random
+import threading
+import time
+
+# Berlin, where simulated events and subscriber viewports are placed
+AREA = (13.0882, 52.3382, 13.7606, 52.6755)
+
+
+def random_bbox(rng, size):
+    lon = rng.uniform(AREA[0], AREA[2] - size)
+    lat = rng.uniform(AREA[1], AREA[3] - size)
+    return lon, lat, lon + size, lat + size
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure event fan-out latency with many simulated subscribers. By default the '
+        'EventBroker is driven in-process; with --url, SSE clients connect to a running '
+        'ASGI server (uvicorn config.asgi:application) and incidents are created and '
+        'deleted through the API to trigger events.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=500, help='Simulated subscribers')
+        parser.add_argument('--events', type=int, default=200, help='Events to publish')
+        parser.add_argument('--rate', type=float, default=50.0, help='Events per second')
+        parser.add_argument(
+            '--viewport', type=float, default=0.2,
+            help='Subscriber bbox size in degrees; 0 subscribes without a bbox'
+        )
+        parser.add_argument('--url', help='Base URL of a running ASGI server instead of the in-process broker')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if options['subscribers'] < 1 or options['events'] < 1:
+            raise CommandError('--subscribers and --events must be positive')
+        rng = random.Random(options['seed'])
+        if options['url']:
+            latencies, expected, elapsed = asyncio.run(self._run_http(rng, options))
+        else:
+            latencies, expected, elapsed = asyncio.run(self._run_in_process(rng, options))
+
+        latencies.sort()
+        self.stdout.write(f'{options["subscribers"]} subscribers, {options["events"]} events in {elapsed:.1f}s')
+        self.stdout.write('-' * 60)
+        self.stdout.write(f'Deliveries:   {len(latencies)} of {expected} expected')
+        self.stdout.write(f'Throughput:   {len(latencies) / elapsed:.0f} deliveries/s')
+        self.stdout.write(f'Latency p50:  {percentile(latencies, 50) * 1000:.2f} ms')
+        self.stdout.write(f'Latency p99:  {percentile(latencies, 99) * 1000:.2f} ms')
+        self.stdout.write(f'Latency max:  {(latencies[-1] if latencies else 0) * 1000:.2f} ms')
+
+    def _viewports(self, rng, options):
+        if options['viewport'] <= 0:
+            return [None] * options['subscribers']
+        return [random_bbox(rng, options['viewport']) for _ in range(options['subscribers'])]
+
+    @staticmethod
+    def _expected(viewports, points):
+        return sum(
+            1 for lon, lat in points for bbox in viewports
+            if bbox is None or (bbox[0] <= lon <= bbox[2] and bbox[1] <= lat <= bbox[3])
+        )
+
+    async def _run_in_process(self, rng, options):
+        broker = EventBroker()
+        viewports = self._viewports(rng, options)
+        subscriptions = [broker.subscribe(bbox=bbox, max_queue=options['events'] + 1) for bbox in viewports]
+        points = [(rng.uniform(AREA[0], AREA[2]), rng.uniform(AREA[1], AREA[3])) for _ in range(options['events'])]
+        expected = self._expected(viewports, points)
+        latencies = []
+
+        async def consume(subscription):
+            while True:
+                payload = await subscription.queue.get()
+                received = time.time()
+                body = json.loads(payload.decode('utf-8').split('data: ', 1)[1])
+                latencies.append(received - body['ts'])
+
+        def publish():
+            # Publish from a worker thread, like the model signals do
+            interval = 1.0 / options['rate']
+            for i, (lon, lat) in enumerate(points):
+                broker.publish('created', 'incident', {'id': i, 'location': f'POINT ({lon} {lat})'},
+                               [(lon, lat, lon, lat)])
+                time.sleep(interval)
+
+        consumers = [asyncio.create_task(consume(s)) for s in subscriptions]
+        start = time.perf_counter()
+        await asyncio.to_thread(publish)
+        while len(latencies) < expected and time.perf_counter() - start < options['events'] / options['rate'] + 10:
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - start
+        for task in consumers:
+            task.cancel()
+        return latencies, expected, elapsed
+
+    async def _run_http(self, rng, options):
+        parts = urlsplit(options['url'].rstrip('/'))
+        host, port = parts.hostname, parts.port or 80
+        viewports = self._viewports(rng, options)
+        latencies = []
+        connected = 0
+
+        async def subscribe(bbox):
+            nonlocal connected
+            reader, writer = await asyncio.open_connection(host, port)
+            path = '/api/events/?models=incident'
+            if bbox is not None:
+                path += '&bbox=' + ','.join(f'{v:.6f}' for v in bbox)
+            writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept: text/event-stream\r\n\r\n'.encode())
+            await writer.drain()
+            await reader.readuntil(b'\r\n\r\n')
+            connected += 1
+            try:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    # Chunked framing lines are skipped, only data lines matter
+                    if line.startswith(b'data: '):
+                        body = json.loads(line[6:])
+                        if body.get('type') == 'created':
+                            latencies.append(time.time() - body['ts'])
+            finally:
+                writer.close()
+
+        tasks = [asyncio.create_task(subscribe(bbox)) for bbox in viewports]
+        while connected < len(viewports):
+            await asyncio.sleep(0.05)
+            if any(task.done() for task in tasks):
+                raise CommandError('A subscriber connection failed; is the ASGI server running?')
+
+        points = [(rng.uniform(AREA[0], AREA[2]), rng.uniform(AREA[1], AREA[3])) for _ in range(options['events'])]
+        expected = self._expected(viewports, points)
+
+        def trigger():
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            interval = 1.0 / options['rate']
+            for i, (lon, lat) in enumerate(points):
+                body = json.dumps({
+                    'name': f'loadtest {i}',
+                    'location': {'type': 'Point', 'coordinates': [lon, lat]},
+                    'severity': 'low',
+                })
+                conn.request('POST', '/api/incidents/', body, {'Content-Type': 'application/json'})
+                created = json.loads(conn.getresponse().read())
+                conn.request('DELETE', f'/api/incidents/{created["id"]}/')
+                conn.getresponse().read()
+                time.sleep(interval)
+            conn.close()
+
+        start = time.perf_counter()
+        await asyncio.to_thread(trigger)
+        while len(latencies) < expected and time.perf_counter() - start < options['events'] / options['rate'] + 10:
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - start
+        for task in tasks:
+            task.cancel()
+        return latencies, expected, elapsed
@@ -0,0 +1,133 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.services.tile_math import bbox_tile_range
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import http.client
+import json
+import random
+import threading
+import time
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test /api/tiles/ concurrently against one or more running servers and '
+        'report p50/p99 latency and throughput. Start the servers first, e.g.\n'
+        '  python manage.py runserver 8080                      (WSGI)\n'
+        '  uvicorn config.asgi:application --port 8001          (ASGI)\n'
+        'then: python manage.py loadtest_tiles --target wsgi=http://localhost:8080 '
+        '--target asgi=http://localhost:8001'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target',
+            action='append',
+            required=True,
+            help='NAME=BASE_URL of a running server, may be given several times',
+        )
+        parser.add_argument('--requests', type=int, default=2000, help='Tile requests per target')
+        parser.add_argument('--concurrency', type=int, default=64, help='Concurrent client connections')
+        parser.add_argument('--minzoom', type=int, default=10)
+        parser.add_argument('--maxzoom', type=int, default=14)
+        parser.add_argument('--seed', type=int, default=1, help='Random seed for the tile sample')
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options['target']:
+            name, sep, url = target.partition('=')
+            if not sep:
+                raise CommandError(f'Expected NAME=BASE_URL, got: {target}')
+            targets.append((name, url.rstrip('/')))
+
+        paths = self._sample_tile_paths(targets[0][1], options)
+        self.stdout.write(
+            f'{len(paths)} requests per target, concurrency {options["concurrency"]}, '
+            f'zoom {options["minzoom"]}-{options["maxzoom"]}'
+        )
+        self.stdout.write('-' * 72)
+        self.stdout.write(f'{"target":<10} {"req/s":>10} {"p50 ms":>10} {"p99 ms":>10} {"max ms":>10} {"errors":>8}')
+
+        for name, base_url in targets:
+            latencies, errors, elapsed = self._run(base_url, paths, options['concurrency'])
+            latencies.sort()
+            self.stdout.write(
+                f'{name:<10} {len(paths) / elapsed:>10.0f} '
+                f'{percentile(latencies, 50) * 1000:>10.2f} '
+                f'{percentile(latencies, 99) * 1000:>10.2f} '
+                f'{(latencies[-1] if latencies else 0) * 1000:>10.2f} '
+                f'{errors:>8}'
+            )
+
+    def _sample_tile_paths(self, base_url, options):
+        """Pick random tiles inside the tileset bounds reported by TileJSON"""
+        status, body = self._get(base_url, '/api/tiles/metadata.json')
+        if status != 200:
+            raise CommandError(f'Could not fetch TileJSON from {base_url} (status {status})')
+        bounds = json.loads(body)['bounds']
+
+        rng = random.Random(options['seed'])
+        paths = []
+        for _ in range(options['requests']):
+            z = rng.randint(options['minzoom'], options['maxzoom'])
+            min_x, max_x, min_y, max_y = bbox_tile_range(bounds, z)
+            paths.append(f'/api/tiles/{z}/{rng.randint(min_x, max_x)}/{rng.randint(min_y, max_y)}.mvt')
+        return paths
+
+    def _get(self, base_url, path, conn=None):
+        parts = urlsplit(base_url)
+        own_conn = conn is None
+        if own_conn:
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+        try:
+            conn.request('GET', path, headers={'Accept-Encoding': 'gzip'})
+            response = conn.getresponse()
+            return response.status, response.read()
+        finally:
+            if own_conn:
+                conn.close()
+
+    def _run(self, base_url, paths, concurrency):
+        """Drive all paths through `concurrency` keep-alive connections"""
+        parts = urlsplit(base_url)
+        queue = iter(paths)
+        queue_lock = threading.Lock()
+        latencies = []
+        errors = [0]
+
+        def worker():
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+            local_latencies = []
+            local_errors = 0
+            while True:
+                with queue_lock:
+                    path = next(queue, None)
+                if path is None:
+                    break
+                start = time.perf_counter()
+                try:
+                    status, _ = self._get(base_url, path, conn)
+                    if status not in (200, 204, 404):
+                        local_errors += 1
+                except (OSError, http.client.HTTPException):
+                    local_errors += 1
+                    conn.close()
+                    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+                local_latencies.append(time.perf_counter() - start)
+            conn.close()
+            with queue_lock:
+                latencies.extend(local_latencies)
+                errors[0] += local_errors
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for _ in range(concurrency):
+                pool.submit(worker)
+        return latencies, errors[0], time.perf_counter() - start
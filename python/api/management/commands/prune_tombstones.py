@@ -0,0 +1,22 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from api.models import Tombstone
+
+
+class Command(BaseCommand):
+    help = 'Delete change feed tombstones older than TOMBSTONE_RETENTION_DAYS (run daily, e.g. from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.TOMBSTONE_RETENTION_DAYS,
+            help='Keep tombstones from the last N days (default: TOMBSTONE_RETENTION_DAYS)',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} tombstones older than {options["days"]} days'))
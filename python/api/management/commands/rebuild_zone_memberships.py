@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from api.services.zone_membership import rebuild_memberships
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored incident-in-hazard-zone memberships from scratch'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = rebuild_memberships()
+        self.stdout.write(self.style.SUCCESS(f'Stored {count} hazard zone memberships'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from api.services.simplify import resimplify_hazard_zones
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored simplified hazard zone polygons (after changing SIMPLIFIED_ZOOMS tolerances)'
+
+    def handle(self, *args, **options):
+        count = resimplify_hazard_zones()
+        self.stdout.write(self.style.SUCCESS(f'Simplified {count} hazard zones'))
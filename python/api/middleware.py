@@ -0,0 +1,84 @@
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+
+# CORS headers of the anonymous map endpoints, set here instead of per view
+MAP_CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type',
+}
+
+
+class MapFastPathMiddleware:
+    """
+    Short-circuit the middleware stack for tiles, ops tiles, glyphs and styles.
+
+    Requests under MAP_FAST_PATH_PREFIXES are stateless, anonymous and
+    csrf_exempt, so sessions, CSRF, authentication, messages and the other
+    middleware after this one add nothing but per-request work. They are
+    resolved and dispatched straight to the view, CORS preflights are
+    answered here, and the CORS headers are set once on the way out. Must
+    be first in MIDDLEWARE; every other request passes through untouched.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefixes = tuple(settings.MAP_FAST_PATH_PREFIXES)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def _match(self, request):
+        if not request.path_info.startswith(self.prefixes):
+            return None
+        # CommonMiddleware is skipped, so reject a Host outside ALLOWED_HOSTS
+        # here; DisallowedHost is answered with a 400 by the handler
+        request.get_host()
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            # Let the full stack produce the 404 (or APPEND_SLASH redirect)
+            return None
+        request.resolver_match = match
+        return match
+
+    @staticmethod
+    def _finish(response):
+        for header, value in MAP_CORS_HEADERS.items():
+            response[header] = value
+        return response
+
+    @staticmethod
+    def _preflight():
+        response = HttpResponse()
+        response['Access-Control-Max-Age'] = '86400'
+        return response
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        match = self._match(request)
+        if match is None:
+            return self.get_response(request)
+        if request.method == 'OPTIONS':
+            return self._finish(self._preflight())
+        view = match.func
+        if iscoroutinefunction(view):
+            view = async_to_sync(view)
+        return self._finish(view(request, *match.args, **match.kwargs))
+
+    async def __acall__(self, request):
+        match = self._match(request)
+        if match is None:
+            return await self.get_response(request)
+        if request.method == 'OPTIONS':
+            return self._finish(self._preflight())
+        view = match.func
+        if not iscoroutinefunction(view):
+            view = sync_to_async(view)
+        return self._finish(await view(request, *match.args, **match.kwargs))
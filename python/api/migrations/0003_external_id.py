@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 12:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_change_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='incident',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='waypoint',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+    ]
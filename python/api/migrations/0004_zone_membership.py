@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-18 12:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_external_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ZoneMembership',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('hazard_zone', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='api.hazard_zone')),
+                ('incident', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='zone_memberships', to='api.incident')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('hazard_zone', 'incident'), name='api_zonemembership_unique')],
+            },
+        ),
+        # Fill the table for the zones and incidents that already exist
+        migrations.RunSQL(
+            """
+            INSERT INTO api_zonemembership (hazard_zone_id, incident_id)
+            SELECT z.id, i.id
+            FROM api_hazard_zone z JOIN api_incident i ON ST_Intersects(z.location, i.location)
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-18 12:58
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_zone_membership'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hazard_zone',
+            name='location_z12',
+            field=django.contrib.gis.db.models.fields.PolygonField(blank=True, null=True, spatial_index=False, srid=4326),
+        ),
+        migrations.AddField(
+            model_name='hazard_zone',
+            name='location_z6',
+            field=django.contrib.gis.db.models.fields.PolygonField(blank=True, null=True, spatial_index=False, srid=4326),
+        ),
+        migrations.AddField(
+            model_name='hazard_zone',
+            name='location_z9',
+            field=django.contrib.gis.db.models.fields.PolygonField(blank=True, null=True, spatial_index=False, srid=4326),
+        ),
+        # Simplify the existing zones by half a pixel at each zoom
+        migrations.RunSQL(
+            """
+            UPDATE api_hazard_zone SET
+                location_z6 = ST_SimplifyPreserveTopology(location, 0.010986328125),
+                location_z9 = ST_SimplifyPreserveTopology(location, 0.001373291015625),
+                location_z12 = ST_SimplifyPreserveTopology(location, 0.000171661376953125)
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
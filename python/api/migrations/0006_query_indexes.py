@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-18 13:00
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_simplified_hazard_zones'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='hazard_zone',
+            index=models.Index(fields=['-created_at', '-id'], name='api_hazard_zone_created_id'),
+        ),
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(fields=['-created_at', '-id'], name='api_incident_created_id'),
+        ),
+        migrations.AddIndex(
+            model_name='waypoint',
+            index=models.Index(fields=['-created_at', '-id'], name='api_waypoint_created_id'),
+        ),
+        migrations.AddIndex(
+            model_name='waypoint',
+            index=django.contrib.postgres.indexes.GistIndex(condition=models.Q(('is_available', True)), fields=['location'], name='api_waypoint_available_gist'),
+        ),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 5.2 on 2026-10-18 13:21
+
+from django.db import migrations, models
+
+TABLES = ('api_incident', 'api_waypoint', 'api_hazard_zone', 'api_tombstone')
+
+# Stamp every written row with the id of its transaction (PostgreSQL 13+).
+# Fires for ORM saves, queryset updates, ON CONFLICT upserts and raw SQL alike.
+CREATE_TRIGGERS_SQL = [
+    """
+    CREATE FUNCTION api_set_change_xid() RETURNS trigger AS $$
+    BEGIN
+        NEW.change_xid := pg_current_xact_id()::text::bigint;
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+] + [
+    f"""
+    CREATE TRIGGER {table}_change_xid BEFORE INSERT OR UPDATE ON {table}
+    FOR EACH ROW EXECUTE FUNCTION api_set_change_xid()
+    """
+    for table in TABLES
+]
+DROP_TRIGGERS_SQL = [
+    f"DROP TRIGGER {table}_change_xid ON {table}" for table in TABLES
+] + ["DROP FUNCTION api_set_change_xid()"]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hazard_zone',
+            name='change_xid',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='incident',
+            name='change_xid',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='change_xid',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='waypoint',
+            name='change_xid',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='hazard_zone',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='incident',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='waypoint',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='hazard_zone',
+            index=models.Index(fields=['change_xid', 'id'], name='api_hazard_zone_change_xid'),
+        ),
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(fields=['change_xid', 'id'], name='api_incident_change_xid'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['model', 'change_xid'], name='api_tombstone_model_xid'),
+        ),
+        migrations.AddIndex(
+            model_name='waypoint',
+            index=models.Index(fields=['change_xid', 'id'], name='api_waypoint_change_xid'),
+        ),
+        # Rows written before the triggers existed sort before every later change
+        migrations.RunSQL(
+            [f"UPDATE {table} SET change_xid = 0" for table in TABLES],
+            migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS_SQL, DROP_TRIGGERS_SQL),
+    ]
@@ -1,4 +1,5 @@
 from django.contrib.gis.db import models
+from django.contrib.postgres.indexes import GistIndex
 
 
 class Incident(models.Model):
@@ -6,6 +7,8 @@ class Incident(models.Model):
     id = models.AutoField(primary_key=True)
     kind = models.CharField(max_length=10, default='incident')
     name = models.CharField(max_length=50)
+    # Id in the partner system / facility list, the key of bulk upserts
+    external_id = models.CharField(max_length=100, unique=True, null=True, blank=True)
     location = models.PointField()
     description = models.TextField(null=True, blank=True, max_length=250)
     severity = models.CharField(max_length=50, choices=[
@@ -16,12 +19,20 @@ class Incident(models.Model):
     ], default='medium')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Transaction that last wrote the row, set by a database trigger; the
+    # ?since= change feed pages by it (see api/change_feed.py)
+    change_xid = models.BigIntegerField(null=True, editable=False)
 
     def __str__(self):
         return self.name
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Newest-first listing and keyset pagination
+            models.Index(fields=['-created_at', '-id'], name='api_incident_created_id'),
+            models.Index(fields=['change_xid', 'id'], name='api_incident_change_xid'),
+        ]
 
 
 class Waypoint(models.Model):
@@ -29,6 +40,8 @@ class Waypoint(models.Model):
     id = models.AutoField(primary_key=True)
     kind = models.CharField(max_length=10, default='waypoint')
     name = models.CharField(max_length=50)
+    # Id in the partner system / facility list, the key of bulk upserts
+    external_id = models.CharField(max_length=100, unique=True, null=True, blank=True)
     location = models.PointField()
     description = models.TextField(null=True, blank=True, max_length= 250)
     type = models.CharField(max_length=50, choices=[
@@ -44,10 +57,21 @@ class Waypoint(models.Model):
     is_available = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Transaction that last wrote the row, set by a database trigger; the
+    # ?since= change feed pages by it (see api/change_feed.py)
+    change_xid = models.BigIntegerField(null=True, editable=False)
 
     def __str__(self):
         return self.name
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='api_waypoint_created_id'),
+            models.Index(fields=['change_xid', 'id'], name='api_waypoint_change_xid'),
+            # k-nearest queries default to available waypoints
+            GistIndex(fields=['location'], condition=models.Q(is_available=True), name='api_waypoint_available_gist'),
+        ]
+
 
 class Hazard_Zone(models.Model):
     """A model to store hazard zones with geographic data"""
@@ -55,6 +79,11 @@ class Hazard_Zone(models.Model):
     kind = models.CharField(max_length=10, default='hazardZone')
     name = models.CharField(max_length=50)
     location = models.PolygonField()
+    # location simplified for overview zooms, filled on save (see
+    # api/services/simplify.py); served by the list with ?zoom= / ?tolerance=
+    location_z6 = models.PolygonField(null=True, blank=True, spatial_index=False)
+    location_z9 = models.PolygonField(null=True, blank=True, spatial_index=False)
+    location_z12 = models.PolygonField(null=True, blank=True, spatial_index=False)
     center = models.PointField()
     description = models.TextField(null=True, blank=True, max_length=250)
     severity = models.CharField(max_length=50, choices=[
@@ -65,9 +94,52 @@ class Hazard_Zone(models.Model):
     ], default='medium')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Transaction that last wrote the row, set by a database trigger; the
+    # ?since= change feed pages by it (see api/change_feed.py)
+    change_xid = models.BigIntegerField(null=True, editable=False)
 
     def __str__(self):
         return self.name
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='api_hazard_zone_created_id'),
+            models.Index(fields=['change_xid', 'id'], name='api_hazard_zone_change_xid'),
+        ]
+
+
+class Tombstone(models.Model):
+    """Records a deleted incident, waypoint or hazard zone for the change feed"""
+    id = models.AutoField(primary_key=True)
+    model = models.CharField(max_length=50)  # model_name of the deleted record
+    object_id = models.IntegerField()
+    location = models.GeometryField(null=True, blank=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+    # Transaction that deleted the record, set by a database trigger
+    change_xid = models.BigIntegerField(null=True, editable=False)
+
+    def __str__(self):
+        return f"{self.model} {self.object_id}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['model', 'deleted_at'], name='api_tombstone_model_deleted'),
+            models.Index(fields=['model', 'change_xid'], name='api_tombstone_model_xid'),
+        ]
+
+
+class ZoneMembership(models.Model):
+    """An incident lying in a hazard zone, materialized from ST_Intersects"""
+    id = models.AutoField(primary_key=True)
+    # The unique constraint's index serves lookups by zone
+    hazard_zone = models.ForeignKey(Hazard_Zone, on_delete=models.CASCADE, related_name='memberships', db_index=False)
+    incident = models.ForeignKey(Incident, on_delete=models.CASCADE, related_name='zone_memberships')
+
+    def __str__(self):
+        return f"{self.incident_id} in {self.hazard_zone_id}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['hazard_zone', 'incident'], name='api_zonemembership_unique'),
+        ]
@@ -0,0 +1,104 @@
+from django.contrib.gis.db.models.functions import Distance, GeoFunc
+from django.db.models import FloatField
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+from api.filters import metres_to_degrees, parse_lonlat
+from api.models import Incident
+
+# Default and largest ?k=
+DEFAULT_K = 5
+MAX_K = 100
+
+
+class KNNDistance(GeoFunc):
+    """
+    The PostGIS `<->` operator. Ordering by it with a LIMIT is answered by
+    walking the GiST index nearest-first instead of computing every distance.
+    The distance is planar, in degrees for SRID 4326 columns.
+    """
+    arg_joiner = ' <-> '
+    template = '%(expressions)s'
+    output_field = FloatField()
+    # Both operands are geometries, so a GEOS origin is sent as a geometry value
+    geom_param_pos = (0, 1)
+
+
+class NearestMixin:
+    """
+    Adds a k-nearest query to the waypoint viewset:
+
+        GET /api/waypoints/nearest/?incident=12&type=hospital&k=3
+        GET /api/waypoints/nearest/?point=13.40,52.52&type=hospital,firestation&distance=true
+
+    ?type= takes any of the waypoint types, ?available=true (default),
+    false or any filters on is_available. ?distance=true adds the geodesic
+    distance in metres. Results are nearest first.
+
+    `<->` ranks by degrees, which stretch with latitude, so the k index
+    nearest rows only bound the search: the k geodesically nearest rows are
+    then picked from the index-backed dwithin circle that bound spans.
+    """
+
+    def nearest(self, request):
+        params = request.query_params
+        origin = self._nearest_origin(params)
+        try:
+            k = int(params.get('k', DEFAULT_K))
+        except ValueError:
+            raise ValidationError({'k': 'Must be an integer'})
+        if not 1 <= k <= MAX_K:
+            raise ValidationError({'k': f'Must be between 1 and {MAX_K}'})
+
+        queryset = self.get_queryset().order_by()
+        if params.get('type'):
+            types = params['type'].split(',')
+            valid = {choice for choice, _ in queryset.model._meta.get_field('type').choices}
+            if not set(types) <= valid:
+                raise ValidationError({'type': f'Expected any of {sorted(valid)}'})
+            queryset = queryset.filter(type__in=types)
+        available = params.get('available', 'true')
+        if available not in ('true', 'false', 'any'):
+            raise ValidationError({'available': 'Must be true, false or any'})
+        if available != 'any':
+            queryset = queryset.filter(is_available=available == 'true')
+
+        distance = Distance('location', origin, spheroid=True)
+        bounds = list(
+            queryset.order_by(KNNDistance('location', origin))
+            .annotate(distance=distance)
+            .values_list('distance', flat=True)[:k]
+        )
+        if not bounds:
+            return Response([])
+        # Every row geodesically nearer than the k-th index candidate lies
+        # within this many degrees; the circle holds about k rows
+        reach = metres_to_degrees(origin, max(bound.m for bound in bounds))
+        rows = list(
+            queryset.filter(location__dwithin=(origin, reach))
+            .annotate(distance=distance)
+            .order_by('distance', 'id')[:k]
+        )
+
+        data = self.get_serializer(rows, many=True).data
+        if params.get('distance') == 'true':
+            for item, row in zip(data, rows):
+                item['distance'] = round(row.distance.m, 1)
+        return Response(data)
+
+    @staticmethod
+    def _nearest_origin(params):
+        if params.get('incident'):
+            try:
+                incident_id = int(params['incident'])
+            except ValueError:
+                raise ValidationError({'incident': 'Must be an integer'})
+            location = Incident.objects.filter(pk=incident_id).values_list('location', flat=True).first()
+            if location is None:
+                raise NotFound('Incident not found')
+            return location
+        if params.get('point'):
+            try:
+                return parse_lonlat(params['point'])
+            except ValueError as e:
+                raise ValidationError({'point': str(e)})
+        raise ValidationError({'incident': 'Pass ?incident=<id> or ?point=lon,lat'})
@@ -0,0 +1,101 @@
+import base64
+from datetime import datetime
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination on (created_at, id), newest first.
+
+    Each page continues strictly after the last row of the previous one, so
+    deep pages cost the same as the first and rows created meanwhile do not
+    shift the window. Pagination only applies when the client sends
+    ?cursor= or ?page_size=; plain list requests still get a bare JSON array.
+    """
+
+    page_size = 200
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering = ('-created_at', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        position = self.decode_cursor(params.get(self.cursor_query_param))
+        if position is not None:
+            created_at, pk = position
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            )
+
+        # Fetch one extra row to learn whether a next page exists
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        self.next_cursor = self.encode_cursor(rows[-1]) if self.has_next else None
+        return rows
+
+    def get_page_size(self, request):
+        value = request.query_params.get(self.page_size_query_param)
+        if value is None:
+            return self.page_size
+        try:
+            page_size = int(value)
+        except ValueError:
+            raise ValidationError({self.page_size_query_param: 'Must be an integer'})
+        if page_size < 1:
+            raise ValidationError({self.page_size_query_param: 'Must be positive'})
+        return min(page_size, self.max_page_size)
+
+    def encode_cursor(self, row):
+        # Rows are model instances, or dicts for .values() querysets
+        if isinstance(row, dict):
+            created_at, pk = row['created_at'], row['id']
+        else:
+            created_at, pk = row.created_at, row.pk
+        raw = f"{created_at.isoformat()}|{pk}"
+        return base64.urlsafe_b64encode(raw.encode('ascii')).decode('ascii')
+
+    def decode_cursor(self, cursor):
+        """Returns: tuple (created_at, id) or None for the first page"""
+        if not cursor:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('ascii')
+            created_at, pk = raw.rsplit('|', 1)
+            return datetime.fromisoformat(created_at), int(pk)
+        except (ValueError, UnicodeError):
+            raise NotFound('Invalid cursor')
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
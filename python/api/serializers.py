@@ -16,6 +16,7 @@ class IncidentSerializer(serializers.ModelSerializer):
         model = Incident
         fields = [
             "id",
+            "external_id",
             "kind",
             "name",
             "location",
@@ -39,6 +40,7 @@ class WaypointSerializer(serializers.ModelSerializer):
         model = Waypoint
         fields = [
             "id",
+            "external_id",
             "kind",
             "name",
             "location",
@@ -78,4 +80,32 @@ class HazardZoneSerializer(serializers.ModelSerializer):
             "severity",
             "created_at",
             "updated_at",
-        ]
\ No newline at end of file
+        ]
+
+
+class IncidentFeatureSerializer(serializers.ModelSerializer):
+    """Validates the properties of one GeoJSON feature of a bulk incident import"""
+
+    class Meta:
+        model = Incident
+        fields = ["external_id", "name", "description", "severity"]
+        # Uniqueness is what the upsert resolves, so skip the per-row query
+        extra_kwargs = {"external_id": {"validators": []}}
+
+
+class WaypointFeatureSerializer(serializers.ModelSerializer):
+    """Validates the properties of one GeoJSON feature of a bulk waypoint import"""
+
+    class Meta:
+        model = Waypoint
+        fields = ["external_id", "name", "description", "type", "telephone", "is_available"]
+        extra_kwargs = {"external_id": {"validators": []}}
+
+
+class SimplifiedHazardZoneSerializer(HazardZoneSerializer):
+    """HazardZoneSerializer serving a stored simplified location (list ?zoom= / ?tolerance=)"""
+    location = serializers.SerializerMethodField()
+
+    def get_location(self, obj):
+        geometry = getattr(obj, self.context['geometry_column'])
+        return str(geometry) if geometry is not None else None
@@ -0,0 +1,148 @@
+from collections import namedtuple
+from django.conf import settings
+from django.template.loader import render_to_string
+from api.services.encodings import encode_body
+import logging
+import mimetypes
+import os
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Vite names bundled files <name>-<content hash>.<ext>
+HASHED_NAME = re.compile(r'-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$')
+# Suffix of the precompressed copy of a file per content encoding
+PRECOMPRESSED_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+# Extensions worth precompressing (see `manage.py compress_assets`)
+COMPRESSIBLE_EXTENSIONS = ('.js', '.mjs', '.css', '.html', '.svg', '.json', '.map', '.txt', '.xml', '.wasm')
+
+# A servable file: path relative to the dist directory, its content type
+# and ETag, whether its name carries a content hash, and the paths of its
+# precompressed copies by encoding
+Asset = namedtuple('Asset', ['path', 'content_type', 'etag', 'immutable', 'variants'])
+
+
+class AssetManifest:
+    """
+    In-memory index of the built frontend.
+
+    The dist directory is scanned once, and again only when it or its assets
+    directory changes (re-checked at most every recheck_interval seconds), so
+    resolving a file, its precompressed copies and the app shell needs no
+    filesystem access. The app shell (index.html template) is rendered and
+    compressed once per scan.
+    """
+
+    recheck_interval = 2.0
+
+    def __init__(self, dist_dir):
+        self.dist_dir = str(dist_dir)
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked = 0.0
+        self._assets = {}
+        self._shell = None
+        self.css_files = []
+        self.js_files = []
+        self.reload()
+
+    def _dist_version(self):
+        """Returns: mtimes of the dist and assets directories, None if not built"""
+        version = []
+        for path in (self.dist_dir, os.path.join(self.dist_dir, 'assets')):
+            try:
+                st = os.stat(path)
+            except OSError:
+                version.append(None)
+            else:
+                version.append((st.st_ino, st.st_mtime_ns))
+        return None if version[0] is None else tuple(version)
+
+    def reload(self):
+        """Scan the dist directory again"""
+        version = self._dist_version()
+        assets = {}
+        if version is not None:
+            for root, _, files in os.walk(self.dist_dir):
+                names = set(files)
+                for name in files:
+                    if any(name.endswith(suffix) and name[:-len(suffix)] in names
+                           for suffix in PRECOMPRESSED_SUFFIXES.values()):
+                        continue
+                    full_path = os.path.join(root, name)
+                    path = os.path.relpath(full_path, self.dist_dir).replace(os.sep, '/')
+                    st = os.stat(full_path)
+                    content_type, _ = mimetypes.guess_type(name)
+                    assets[path] = Asset(
+                        path=path,
+                        content_type=content_type or 'application/octet-stream',
+                        etag=f'{st.st_mtime_ns:x}-{st.st_size:x}',
+                        immutable=path.startswith('assets/') and HASHED_NAME.search(name) is not None,
+                        variants={
+                            encoding: full_path + suffix
+                            for encoding, suffix in PRECOMPRESSED_SUFFIXES.items()
+                            if name + suffix in names
+                            # Older than the file: left over from a previous build
+                            and os.stat(full_path + suffix).st_mtime_ns >= st.st_mtime_ns
+                        },
+                    )
+
+        # Stylesheets and scripts the app shell links, assets/ first
+        css_files, js_files = [], []
+        for path in sorted(assets, key=lambda path: (not path.startswith('assets/'), path)):
+            if path.rpartition('/')[0] not in ('', 'assets'):
+                continue
+            if path.endswith('.css'):
+                css_files.append(path)
+            elif path.endswith('.js'):
+                js_files.append(path)
+
+        with self._lock:
+            self._version = version
+            self._checked = time.monotonic()
+            self._assets = assets
+            self._shell = None
+            self.css_files = css_files
+            self.js_files = js_files
+        logger.info(f"Indexed {len(assets)} frontend files in {self.dist_dir}")
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._checked < self.recheck_interval:
+            return
+        self._checked = now
+        if self._dist_version() != self._version:
+            self.reload()
+
+    @property
+    def built(self):
+        """Whether the frontend has been built"""
+        self._refresh()
+        return self._version is not None
+
+    def get(self, path):
+        """Returns: the Asset at a path relative to the dist directory, or None"""
+        self._refresh()
+        return self._assets.get(path)
+
+    def shell(self):
+        """
+        The rendered app shell linking the built stylesheets and scripts
+        Returns: EncodedBody
+        """
+        self._refresh()
+        shell = self._shell
+        if shell is None:
+            html = render_to_string('index.html', {
+                'vite_dev_server': False,
+                'css_files': self.css_files,
+                'js_files': self.js_files,
+            })
+            shell = self._shell = encode_body(html.encode('utf-8'))
+        return shell
+
+
+# Process-wide manifest used by the frontend views
+asset_manifest = AssetManifest(settings.FRONTEND_DIST_DIR)
@@ -0,0 +1,94 @@
+import math
+from django.db import connection
+from api.models import Incident, Waypoint
+from api.services.ops_tiles import WORLD_WIDTH
+from api.services.tile_math import lonlat_to_mercator, mercator_to_lonlat
+
+# Pixels of a 256px tile grid at zoom 0 (MapLibre's zoom convention)
+TILE_SIZE = 256
+
+# Clustered models: table and the column whose values are broken down
+CLUSTER_MODELS = {
+    'incident': (Incident._meta.db_table, 'severity'),
+    'waypoint': (Waypoint._meta.db_table, 'type'),
+}
+
+# Points are bucketed into square Web Mercator grid cells (the ST_SnapToGrid
+# grid, floored instead of rounded) and counted per cell and category; the
+# GiST index answers the envelope test. Coordinates are summed so cells
+# can be merged across categories into an exact centroid.
+CLUSTER_SQL = """
+WITH points AS (
+    SELECT p.id, p.{category} AS category, ST_Transform(p.location, 3857) AS geom
+    FROM {table} p
+    WHERE p.location && ST_Transform(
+        ST_MakeEnvelope(%(minx)s, %(miny)s, %(maxx)s, %(maxy)s, 3857), 4326
+    )
+)
+SELECT floor(ST_X(geom) / %(cell)s)::bigint AS cx,
+       floor(ST_Y(geom) / %(cell)s)::bigint AS cy,
+       category, count(*), sum(ST_X(geom)), sum(ST_Y(geom)), min(id)
+FROM points
+GROUP BY cx, cy, category
+"""
+
+
+def cell_size(z, cell_px):
+    """Side of a cluster cell at zoom z, in Web Mercator metres"""
+    return WORLD_WIDTH / (2 ** z) / TILE_SIZE * cell_px
+
+
+def snap_bbox(bbox, cell):
+    """
+    Widen a lon/lat bbox to whole grid cells
+    Returns: tuple (minx, miny, maxx, maxy) in Web Mercator metres
+    """
+    minx, miny = lonlat_to_mercator(bbox[0], bbox[1])
+    maxx, maxy = lonlat_to_mercator(bbox[2], bbox[3])
+    return (
+        math.floor(minx / cell) * cell, math.floor(miny / cell) * cell,
+        math.ceil(maxx / cell) * cell, math.ceil(maxy / cell) * cell,
+    )
+
+
+def cluster_points(model_name, bbox, z, cell_px):
+    """
+    Cluster one model's points inside bbox at zoom z
+    Returns: list of dicts {model, lon, lat, count, breakdown} with the id
+    of the point for single point clusters
+    """
+    table, category = CLUSTER_MODELS[model_name]
+    cell = cell_size(z, cell_px)
+    minx, miny, maxx, maxy = snap_bbox(bbox, cell)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            CLUSTER_SQL.format(table=table, category=category),
+            {'minx': minx, 'miny': miny, 'maxx': maxx, 'maxy': maxy, 'cell': cell},
+        )
+        rows = cursor.fetchall()
+
+    cells = {}
+    for cx, cy, value, count, sum_x, sum_y, min_id in rows:
+        entry = cells.get((cx, cy))
+        if entry is None:
+            entry = cells[(cx, cy)] = {'count': 0, 'sum_x': 0.0, 'sum_y': 0.0, 'id': min_id, 'breakdown': {}}
+        entry['count'] += count
+        entry['sum_x'] += sum_x
+        entry['sum_y'] += sum_y
+        entry['id'] = min(entry['id'], min_id)
+        entry['breakdown'][value] = count
+
+    clusters = []
+    for entry in cells.values():
+        lon, lat = mercator_to_lonlat(entry['sum_x'] / entry['count'], entry['sum_y'] / entry['count'])
+        cluster = {
+            'model': model_name,
+            'lon': round(lon, 6),
+            'lat': round(lat, 6),
+            'count': entry['count'],
+            'breakdown': entry['breakdown'],
+        }
+        if entry['count'] == 1:
+            cluster['id'] = entry['id']
+        clusters.append(cluster)
+    return clusters
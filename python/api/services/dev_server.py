@@ -0,0 +1,61 @@
+from django.conf import settings
+import logging
+import threading
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class DevServerMonitor:
+    """
+    Health of the Vite dev server, probed on a background thread.
+
+    Requests only read the last probe result; the probe thread is started on
+    first use and re-checks every interval seconds, so a page load never
+    waits on the network. Until the first probe answers the server counts
+    as down.
+    """
+
+    def __init__(self, url, interval):
+        self.url = url
+        self.interval = interval
+        self.running = False
+        self._thread = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    def probe(self):
+        """Returns: whether the dev server answers right now (blocking)"""
+        try:
+            response = requests.get(self.url, timeout=1)
+            return response.status_code == 200
+        except requests.RequestException:
+            return False
+
+    def _run(self):
+        while not self._stopped.is_set():
+            running = self.probe()
+            if running != self.running:
+                logger.info(f"Vite dev server at {self.url} is {'up' if running else 'down'}")
+            self.running = running
+            self._stopped.wait(self.interval)
+
+    def start(self):
+        """Start the probe thread if it is not running yet"""
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='vite-probe', daemon=True)
+                    self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def is_running(self):
+        """Returns: the last probe result, without network I/O"""
+        self.start()
+        return self.running
+
+
+# Process-wide monitor, only started in FRONTEND_MODE 'dev'
+dev_server = DevServerMonitor(settings.VITE_DEV_SERVER_URL, settings.VITE_DEV_SERVER_PROBE_SECONDS)
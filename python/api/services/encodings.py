@@ -0,0 +1,68 @@
+from collections import namedtuple
+import gzip
+import hashlib
+
+try:
+    import brotli
+except ImportError:  # Optional: without it bodies are offered as gzip only
+    brotli = None
+
+# Content encodings in order of preference
+ENCODINGS = ('br', 'gzip', 'identity')
+
+# A body ready to send: bytes per content encoding and the identity body's hash
+EncodedBody = namedtuple('EncodedBody', ['bodies', 'etag'])
+
+
+def compress(data, encoding):
+    """Compress data at the highest level; only for bodies built once"""
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if encoding == 'br':
+        return brotli.compress(data, quality=11)
+    raise ValueError(f"Unsupported content encoding {encoding}")
+
+
+def available_encodings():
+    """Returns: the compressed encodings this process can produce"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def encode_body(data):
+    """
+    Pre-compress a body in every available encoding
+    Returns: EncodedBody
+    """
+    bodies = {'identity': data}
+    for encoding in available_encodings():
+        bodies[encoding] = compress(data, encoding)
+    return EncodedBody(bodies, hashlib.md5(data).hexdigest())
+
+
+def choose_encoding(accept_encoding, available):
+    """
+    Pick the preferred content encoding a client accepts
+    accept_encoding: the Accept-Encoding header
+    available: encodings the body exists in
+    Returns: one of ENCODINGS, 'identity' if no other is acceptable
+    """
+    accepted = {}
+    for part in accept_encoding.split(','):
+        token, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token.strip().lower()] = quality
+    for encoding in ENCODINGS[:-1]:
+        if encoding in available and accepted.get(encoding, accepted.get('*', 0.0)) > 0:
+            return encoding
+    return 'identity'
+
+
+def encoded_etag(etag, encoding):
+    """Each encoding is a different representation and needs its own ETag"""
+    return f'"{etag}"' if encoding == 'identity' else f'"{etag}-{encoding}"'
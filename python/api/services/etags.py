@@ -0,0 +1,29 @@
+import hashlib
+import os
+import threading
+
+# Content hashes of static files keyed by path, valid for one (mtime, size)
+_file_etags = {}
+_lock = threading.Lock()
+
+
+def file_etag(path):
+    """
+    Get a content-hash ETag for a file on disk
+    Returns: etag string or None if the file does not exist
+
+    The file is only hashed again when its mtime or size changes.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    version = (st.st_mtime_ns, st.st_size)
+    cached = _file_etags.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with open(path, 'rb') as f:
+        etag = hashlib.md5(f.read()).hexdigest()
+    with _lock:
+        _file_etags[path] = (version, etag)
+    return etag
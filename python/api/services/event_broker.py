@@ -0,0 +1,117 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def _overlaps(bbox, extent):
+    return not (
+        extent[0] > bbox[2] or extent[2] < bbox[0] or
+        extent[1] > bbox[3] or extent[3] < bbox[1]
+    )
+
+
+class Subscription:
+    """One connected client: a bounded queue on its event loop plus its filters"""
+
+    def __init__(self, loop, bbox=None, models=None, max_queue=256):
+        self.loop = loop
+        self.bbox = bbox
+        self.models = models
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.lagging = False
+
+    def wants(self, model, extents):
+        if self.models is not None and model not in self.models:
+            return False
+        if self.bbox is None:
+            return True
+        return any(_overlaps(self.bbox, extent) for extent in extents)
+
+    def deliver(self, payload):
+        """Runs on the subscription's loop"""
+        if self.lagging:
+            return
+        try:
+            self.queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            # A client that cannot keep up is told to resync instead of
+            # holding an ever growing backlog
+            self.lagging = True
+            self.queue.get_nowait()
+            self.queue.put_nowait(EventBroker.RESYNC)
+
+
+class EventBroker:
+    """
+    In-process fan-out of change events to streaming clients.
+
+    publish() may be called from any thread (signal handlers run in sync
+    worker threads). Each event is serialized once; subscribers are grouped
+    by event loop so an event costs one thread-safe wakeup per loop, after
+    which delivery to every subscriber of that loop is a queue put.
+    """
+
+    RESYNC = b'event: resync\ndata: {}\n\n'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # loop -> set of subscriptions, replaced on every change so publish
+        # can iterate a snapshot without holding the lock
+        self._by_loop = {}
+
+    def subscribe(self, bbox=None, models=None, max_queue=256):
+        """Register a subscriber on the running event loop"""
+        subscription = Subscription(asyncio.get_running_loop(), bbox, models, max_queue)
+        with self._lock:
+            by_loop = dict(self._by_loop)
+            by_loop[subscription.loop] = by_loop.get(subscription.loop, frozenset()) | {subscription}
+            self._by_loop = by_loop
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            by_loop = dict(self._by_loop)
+            remaining = by_loop.get(subscription.loop, frozenset()) - {subscription}
+            if remaining:
+                by_loop[subscription.loop] = remaining
+            else:
+                by_loop.pop(subscription.loop, None)
+            self._by_loop = by_loop
+
+    def subscriber_count(self):
+        return sum(len(subscriptions) for subscriptions in self._by_loop.values())
+
+    def publish(self, event_type, model, data, extents=()):
+        """
+        Send an event to every subscriber whose filters match
+        extents: (minx, miny, maxx, maxy) boxes the event touches, e.g. the
+        old and new location of a moved record
+        """
+        by_loop = self._by_loop
+        if not by_loop:
+            return
+        body = json.dumps({'type': event_type, 'model': model, 'data': data, 'ts': time.time()})
+        payload = f'event: {event_type}\ndata: {body}\n\n'.encode('utf-8')
+        extents = [extent for extent in extents if extent]
+        for loop, subscriptions in by_loop.items():
+            targets = [s for s in subscriptions if s.wants(model, extents)]
+            if not targets:
+                continue
+            try:
+                loop.call_soon_threadsafe(self._deliver, targets, payload)
+            except RuntimeError:
+                # The loop has been closed; its subscriptions are gone too
+                logger.debug("Dropping event for a closed event loop")
+
+    @staticmethod
+    def _deliver(targets, payload):
+        for subscription in targets:
+            subscription.deliver(payload)
+
+
+# Process-wide broker used by the model signals and the event stream view
+broker = EventBroker()
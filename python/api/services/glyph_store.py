@@ -0,0 +1,197 @@
+from collections import OrderedDict
+from django.conf import settings
+from api.services.varint import read_varint, write_varint
+import hashlib
+import logging
+import os
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+FONT_DIR = os.path.join(settings.BASE_DIR, 'static', 'font')
+# Glyph ranges are 256 code points, e.g. "0-255"
+RANGE_PATTERN = re.compile(r'^\d+-\d+$')
+
+# Protobuf wire types
+VARINT = 0
+FIXED64 = 1
+LENGTH_DELIMITED = 2
+FIXED32 = 5
+
+
+def _iter_fields(buf):
+    """Yield (field number, wire type, value) of a protobuf message; value is bytes for length-delimited fields"""
+    pos = 0
+    end = len(buf)
+    while pos < end:
+        key, pos = read_varint(buf, pos)
+        field, wire_type = key >> 3, key & 0x7
+        if wire_type == VARINT:
+            value, pos = read_varint(buf, pos)
+        elif wire_type == LENGTH_DELIMITED:
+            length, pos = read_varint(buf, pos)
+            value = buf[pos:pos + length]
+            pos += length
+        elif wire_type == FIXED64:
+            value = buf[pos:pos + 8]
+            pos += 8
+        elif wire_type == FIXED32:
+            value = buf[pos:pos + 4]
+            pos += 4
+        else:
+            raise ValueError(f"Unsupported protobuf wire type {wire_type}")
+        if pos > end:
+            raise ValueError(f"Truncated protobuf field {field}")
+        yield field, wire_type, value
+
+
+def _write_bytes_field(buf, field, data):
+    write_varint(buf, (field << 3) | LENGTH_DELIMITED)
+    write_varint(buf, len(data))
+    buf += data
+
+
+def parse_glyphs(data):
+    """
+    Read the glyphs of a glyph PBF (glyphs > fontstack > glyph messages)
+    Returns: dict glyph id -> encoded glyph message
+    Raises ValueError when data is not a well-formed protobuf message.
+    """
+    glyphs = {}
+    for field, wire_type, stack in _iter_fields(memoryview(data)):
+        if field != 1 or wire_type != LENGTH_DELIMITED:
+            continue
+        for stack_field, stack_wire_type, glyph in _iter_fields(stack):
+            if stack_field != 3 or stack_wire_type != LENGTH_DELIMITED:
+                continue
+            for glyph_field, _, value in _iter_fields(glyph):
+                if glyph_field == 1:
+                    glyphs.setdefault(value, bytes(glyph))
+                    break
+    return glyphs
+
+
+def composite_glyphs(pbfs, name, range_param):
+    """
+    Merge the glyph PBFs of a font stack: each code point comes from the
+    first font in the stack that has it. A PBF that cannot be parsed is
+    skipped; if none can, the first one is returned unchanged.
+    Returns: encoded glyph PBF
+    """
+    merged = {}
+    parsed = 0
+    for index, data in enumerate(pbfs):
+        try:
+            glyphs = parse_glyphs(data)
+        except ValueError as e:
+            logger.warning(f"Skipping unreadable glyph PBF {index + 1} of {name} {range_param}: {str(e)}")
+            continue
+        parsed += 1
+        for glyph_id, glyph in glyphs.items():
+            merged.setdefault(glyph_id, glyph)
+    if not parsed:
+        return pbfs[0]
+    stack = bytearray()
+    _write_bytes_field(stack, 1, name.encode('utf-8'))
+    _write_bytes_field(stack, 2, range_param.encode('ascii'))
+    for glyph_id in sorted(merged):
+        _write_bytes_field(stack, 3, merged[glyph_id])
+    out = bytearray()
+    _write_bytes_field(out, 1, stack)
+    return bytes(out)
+
+
+class GlyphStore:
+    """
+    Serves glyph PBFs from memory.
+
+    The font directory is indexed once; files are read on first use and the
+    result of every fontstack/range pair, composited when the stack names
+    several fonts, is kept in a size-bounded LRU so it is computed once. A
+    directory named after the whole stack (a pre-composited font) wins over
+    compositing.
+    """
+
+    def __init__(self, font_dir=FONT_DIR, max_bytes=16 * 1024 * 1024):
+        self.font_dir = font_dir
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.reload()
+
+    def reload(self):
+        """Index the font directory again and drop the cached glyphs"""
+        fonts = {}
+        if os.path.isdir(self.font_dir):
+            for entry in os.scandir(self.font_dir):
+                if entry.is_dir():
+                    fonts[entry.name] = {
+                        name[:-4] for name in os.listdir(entry.path) if name.endswith('.pbf')
+                    }
+        with self._lock:
+            self._fonts = fonts
+            self._entries.clear()
+            self.current_bytes = 0
+        logger.info(f"Indexed {len(fonts)} fonts in {self.font_dir}")
+
+    def fonts(self):
+        """Returns: list of {name, ranges} for every indexed font"""
+        return [{'name': name, 'ranges': sorted(ranges)} for name, ranges in sorted(self._fonts.items())]
+
+    def get_cached(self, fontstack, range_param):
+        """Returns: the cached (data, etag) pair, or None if not computed yet"""
+        key = (fontstack, range_param)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def get(self, fontstack, range_param):
+        """
+        Get the glyphs of a font stack for one range
+        Returns: tuple (data, etag), or None when no font of the stack has the range
+        """
+        entry = self.get_cached(fontstack, range_param)
+        if entry is not None:
+            return entry
+        if not RANGE_PATTERN.match(range_param):
+            return None
+
+        if range_param in self._fonts.get(fontstack, ()):
+            names = [fontstack]
+        else:
+            names = [
+                name for name in (part.strip() for part in fontstack.split(','))
+                if range_param in self._fonts.get(name, ())
+            ]
+        if not names:
+            return None
+        pbfs = []
+        for name in names:
+            with open(os.path.join(self.font_dir, name, f"{range_param}.pbf"), 'rb') as f:
+                pbfs.append(f.read())
+        data = pbfs[0] if len(pbfs) == 1 else composite_glyphs(pbfs, ', '.join(names), range_param)
+
+        entry = (data, hashlib.md5(data).hexdigest())
+        self._put((fontstack, range_param), entry)
+        return entry
+
+    def _put(self, key, entry):
+        size = len(entry[0])
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = entry
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+
+
+# Process-wide store used by the font views
+glyph_store = GlyphStore()
@@ -0,0 +1,29 @@
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.conf import settings
+import threading
+
+_executor = None
+_lock = threading.Lock()
+
+
+def get_io_executor():
+    """
+    Get the bounded thread pool used for blocking file and SQLite reads.
+    Each pool thread keeps its own pooled MBTiles connection, so the pool
+    size also bounds the number of open connections.
+    """
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.TILE_IO_MAX_WORKERS,
+                    thread_name_prefix='tile-io',
+                )
+    return _executor
+
+
+def run_in_io_pool(func):
+    """Wrap a blocking callable so it can be awaited on the I/O pool"""
+    return sync_to_async(func, thread_sensitive=False, executor=get_io_executor())
@@ -0,0 +1,86 @@
+import sqlite3
+import logging
+import os
+from api.services.tile_math import bbox_tile_range
+
+logger = logging.getLogger(__name__)
+
+# Deduplicated MBTiles layout: each distinct blob is stored once in
+# `images`, `map` points tile coordinates at it and `tiles` is a view.
+EXPORT_SCHEMA = """
+CREATE TABLE metadata (name TEXT, value TEXT);
+CREATE UNIQUE INDEX name ON metadata (name);
+CREATE TABLE map (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_id TEXT);
+CREATE UNIQUE INDEX map_index ON map (zoom_level, tile_column, tile_row);
+CREATE TABLE images (tile_data BLOB, tile_id TEXT);
+CREATE UNIQUE INDEX images_id ON images (tile_id);
+CREATE VIEW tiles AS
+    SELECT map.zoom_level AS zoom_level, map.tile_column AS tile_column,
+           map.tile_row AS tile_row, images.tile_data AS tile_data
+    FROM map JOIN images ON images.tile_id = map.tile_id;
+"""
+
+# Tiles written between commits; keeps the journal and page cache small
+COMMIT_EVERY = 5000
+
+
+def count_export_tiles(bbox, minzoom, maxzoom):
+    """Upper bound of the number of tiles an export of bbox/zoom range contains"""
+    total = 0
+    for z in range(minzoom, maxzoom + 1):
+        min_x, max_x, min_y, max_y = bbox_tile_range(bbox, z)
+        total += (max_x - min_x + 1) * (max_y - min_y + 1)
+    return total
+
+
+def export_mbtiles(service, output_path, bbox, minzoom, maxzoom):
+    """
+    Write the tiles of `service` inside bbox and the zoom range to a new,
+    deduplicated MBTiles file. Tiles are streamed from one range query per
+    zoom level straight into the output, so memory use does not grow with
+    the size of the export.
+    Returns: dict with the number of tiles and distinct blobs written
+    """
+    if os.path.exists(output_path):
+        os.remove(output_path)
+
+    out = sqlite3.connect(output_path)
+    try:
+        # The file is thrown away if the export fails, so skip the journal
+        out.execute("PRAGMA journal_mode = OFF")
+        out.execute("PRAGMA synchronous = OFF")
+        out.executescript(EXPORT_SCHEMA)
+
+        metadata = service.get_metadata()
+        metadata.update({
+            'bounds': ','.join(str(v) for v in bbox),
+            'center': f"{(bbox[0] + bbox[2]) / 2},{(bbox[1] + bbox[3]) / 2},{minzoom}",
+            'minzoom': str(minzoom),
+            'maxzoom': str(maxzoom),
+        })
+        out.executemany("INSERT INTO metadata (name, value) VALUES (?, ?)", metadata.items())
+
+        tiles = 0
+        for z in range(minzoom, maxzoom + 1):
+            max_row = (2 ** z) - 1
+            min_x, max_x, min_y, max_y = bbox_tile_range(bbox, z)
+            for x, y, tile_data, etag in service.iter_tile_range(z, min_x, max_x, min_y, max_y):
+                # The ETag is a content hash, so identical tiles share one blob
+                out.execute("INSERT OR IGNORE INTO images (tile_data, tile_id) VALUES (?, ?)", (tile_data, etag))
+                out.execute(
+                    "INSERT INTO map (zoom_level, tile_column, tile_row, tile_id) VALUES (?, ?, ?, ?)",
+                    (z, x, max_row - y, etag)
+                )
+                tiles += 1
+                if tiles % COMMIT_EVERY == 0:
+                    out.commit()
+            logger.info(f"Exported zoom {z}: {tiles} tiles so far")
+
+        out.commit()
+        images = out.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+    except Exception:
+        out.close()
+        os.remove(output_path)
+        raise
+    out.close()
+    return {'tiles': tiles, 'images': images}
@@ -1,97 +1,194 @@
 import sqlite3
+import hashlib
 import logging
 import os
+import threading
+from urllib.parse import quote
+from api.services.tile_source import TileSource, MetadataState
 
 logger = logging.getLogger(__name__)
 
+# Statements are kept as module constants so sqlite3's per-connection
+# statement cache always gets a hit and never re-prepares them.
+TILE_QUERY = "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?"
+METADATA_QUERY = "SELECT name, value FROM metadata"
+# Deduplicated MBTiles files store blobs once in `images` keyed by a content
+# hash (tile_id) and expose `tiles` as a view over `map` joined to `images`.
+DEDUPLICATION_QUERY = "SELECT COUNT(*) FROM sqlite_master WHERE name IN ('map', 'images')"
+DEDUPLICATED_TILE_QUERY = (
+    "SELECT images.tile_data, map.tile_id FROM map JOIN images ON images.tile_id = map.tile_id "
+    "WHERE map.zoom_level = ? AND map.tile_column = ? AND map.tile_row = ?"
+)
+TILE_ID_QUERY = "SELECT tile_id FROM map WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?"
+TILE_RANGE_QUERY = (
+    "SELECT tile_column, tile_row, tile_data FROM tiles "
+    "WHERE zoom_level = ? AND tile_column BETWEEN ? AND ? AND tile_row BETWEEN ? AND ?"
+)
+DEDUPLICATED_TILE_RANGE_QUERY = (
+    "SELECT map.tile_column, map.tile_row, images.tile_data, map.tile_id FROM map "
+    "JOIN images ON images.tile_id = map.tile_id "
+    "WHERE map.zoom_level = ? AND map.tile_column BETWEEN ? AND ? AND map.tile_row BETWEEN ? AND ?"
+)
+# A batch's misses at one zoom are read with one range query only when
+# their bounding box holds at most this many tiles per wanted tile; sparse
+# sets are read tile by tile so the range query never scans blobs nobody asked for
+RANGE_QUERY_MAX_AREA_RATIO = 4
 
-class MBTilesService:
+
+class MBTilesService(TileSource):
     """Service for serving vector tiles from MBTiles files"""
-    
-    def __init__(self, mbtiles_path):
-        self.mbtiles_path = mbtiles_path
+
+    # PRAGMA values applied to every pooled connection
+    mmap_size = 256 * 1024 * 1024
+    cache_size_kib = 64 * 1024
+
+    def __init__(self, mbtiles_path, cache=None):
         if not os.path.exists(mbtiles_path):
             raise FileNotFoundError(f"MBTiles file not found: {mbtiles_path}")
-    
-    def get_tile(self, z, x, y):
+        self._local = threading.local()
+        super().__init__(mbtiles_path, cache=cache)
+
+    @property
+    def mbtiles_path(self):
+        return self.path
+
+    def _open_connection(self):
         """
-        Get a vector tile from the MBTiles file
-        Returns: bytes of the tile data or None if not found
+        Open a read-only connection. immutable=1 tells SQLite the file never
+        changes underneath it, so it skips locking and change detection; file
+        swaps are handled by recycling the connection instead.
+        """
+        uri = f"file:{quote(os.path.abspath(self.mbtiles_path))}?mode=ro&immutable=1"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False, cached_statements=16)
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kib)}")
+        return conn
+
+    def _get_connection(self):
+        """Return this thread's pooled connection, reopening it if the file was swapped"""
+        version = self._current_file_version()
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.version == version:
+            return conn
+        if conn is not None:
+            conn.close()
+        conn = self._open_connection()
+        self._local.conn = conn
+        self._local.version = version
+        return conn
+
+    def close(self):
+        """Close the calling thread's pooled connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _read_tile(self, z, x, y):
+        """
+        Read a tile from SQLite
+        Returns: tuple (bytes, etag) or (None, None) if not found
         """
         try:
             # Convert XYZ coordinates to TMS coordinates
             # MBTiles uses TMS (y=0 at bottom), web maps use XYZ (y=0 at top)
             y_tms = (2 ** z) - 1 - y
-            
-            with sqlite3.connect(self.mbtiles_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
-                    (z, x, y_tms)
-                )
-                result = cursor.fetchone()
+
+            if self._get_metadata_state().deduplicated:
+                result = self._get_connection().execute(DEDUPLICATED_TILE_QUERY, (z, x, y_tms)).fetchone()
                 if result:
-                    logger.debug(f"Found tile {z}/{x}/{y} (TMS: {z}/{x}/{y_tms})")
-                    return result[0]
-                else:
-                    logger.debug(f"Tile not found: {z}/{x}/{y} (TMS: {z}/{x}/{y_tms})")
-                    return None
+                    result = (result[0], self._get_metadata_state().tile_id_etag(result[1]))
+            else:
+                result = self._get_connection().execute(TILE_QUERY, (z, x, y_tms)).fetchone()
+                if result:
+                    result = (result[0], hashlib.md5(result[0]).hexdigest())
+            if result:
+                logger.debug(f"Found tile {z}/{x}/{y} (TMS: {z}/{x}/{y_tms})")
+                return result
+            else:
+                logger.debug(f"Tile not found: {z}/{x}/{y} (TMS: {z}/{x}/{y_tms})")
+                return None, None
         except Exception as e:
             logger.error(f"Error reading tile {z}/{x}/{y} from MBTiles: {str(e)}")
-            return None
-    
-    def get_metadata(self):
+            self.close()
+            return None, None
+
+    def _read_tile_etag(self, z, x, y):
         """
-        Get metadata from the MBTiles file
-        Returns: dict of metadata
+        A deduplicated MBTiles file already stores a content hash (tile_id)
+        in its map table, so the blob does not have to be read
         """
         try:
-            with sqlite3.connect(self.mbtiles_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT name, value FROM metadata")
-                metadata = dict(cursor.fetchall())
-                return metadata
+            if self._get_metadata_state().deduplicated:
+                y_tms = (2 ** z) - 1 - y
+                result = self._get_connection().execute(TILE_ID_QUERY, (z, x, y_tms)).fetchone()
+                return self._get_metadata_state().tile_id_etag(result[0]) if result else None
         except Exception as e:
-            logger.error(f"Error reading metadata from MBTiles: {str(e)}")
-            return {}
-    
-    def get_bounds(self):
-        """
-        Get the bounds from metadata
-        Returns: list [minlon, minlat, maxlon, maxlat] or None
-        """
-        metadata = self.get_metadata()
-        bounds_str = metadata.get('bounds')
-        if bounds_str:
-            try:
-                return [float(x) for x in bounds_str.split(',')]
-            except:
-                pass
-        return None
-    
-    def get_center(self):
+            logger.error(f"Error reading tile id {z}/{x}/{y} from MBTiles: {str(e)}")
+            self.close()
+            return None
+        return self.get_tile_with_etag(z, x, y)[1]
+
+    def iter_tile_range(self, z, min_x, max_x, min_y, max_y):
         """
-        Get the center from metadata
-        Returns: list [lon, lat, zoom] or None
+        Read every tile of a rectangular XYZ range with a single query
+        Yields: tuples (x, y, bytes, etag) for the tiles that exist
         """
-        metadata = self.get_metadata()
-        center_str = metadata.get('center')
-        if center_str:
-            try:
-                return [float(x) for x in center_str.split(',')]
-            except:
-                pass
-        return None
-    
-    def get_zoom_range(self):
+        max_row = (2 ** z) - 1
+        # XYZ rows map to TMS rows in reverse order
+        params = (z, min_x, max_x, max_row - max_y, max_row - min_y)
+        state = self._get_metadata_state()
+        if state.deduplicated:
+            for x, y_tms, tile_data, tile_id in self._get_connection().execute(DEDUPLICATED_TILE_RANGE_QUERY, params):
+                yield x, max_row - y_tms, tile_data, state.tile_id_etag(tile_id)
+        else:
+            for x, y_tms, tile_data in self._get_connection().execute(TILE_RANGE_QUERY, params):
+                yield x, max_row - y_tms, tile_data, hashlib.md5(tile_data).hexdigest()
+
+    def get_tiles(self, coords):
         """
-        Get min/max zoom from metadata
-        Returns: tuple (minzoom, maxzoom)
+        Get many tiles at once. Cached tiles are served from memory; the rest
+        are read with one range query per zoom level covering the misses when
+        they are dense (see RANGE_QUERY_MAX_AREA_RATIO), one by one otherwise.
+        Returns: dict mapping (z, x, y) to (bytes, etag) for the tiles found
         """
-        metadata = self.get_metadata()
+        found = {}
+        misses = {}
+        for z, x, y in coords:
+            entry = self.get_cached_tile(z, x, y)
+            if entry is not None:
+                found[(z, x, y)] = entry
+            else:
+                misses.setdefault(z, set()).add((x, y))
+
         try:
-            minzoom = int(metadata.get('minzoom', 0))
-            maxzoom = int(metadata.get('maxzoom', 14))
-            return minzoom, maxzoom
-        except:
-            return 0, 14
+            for z, wanted in misses.items():
+                xs = [x for x, _ in wanted]
+                ys = [y for _, y in wanted]
+                area = (max(xs) - min(xs) + 1) * (max(ys) - min(ys) + 1)
+                if area <= RANGE_QUERY_MAX_AREA_RATIO * len(wanted):
+                    tiles = self.iter_tile_range(z, min(xs), max(xs), min(ys), max(ys))
+                else:
+                    tiles = ((x, y, *self._read_tile(z, x, y)) for x, y in wanted)
+                for x, y, tile_data, etag in tiles:
+                    if tile_data is None or (x, y) not in wanted:
+                        continue
+                    found[(z, x, y)] = (tile_data, etag)
+                    if self.cache is not None:
+                        self.cache.put((z, x, y), tile_data, etag)
+        except Exception as e:
+            logger.error(f"Error reading tile batch from MBTiles: {str(e)}")
+            self.close()
+        return found
+
+    def _read_metadata(self, version):
+        """Read the metadata table; returns None if it cannot be read"""
+        try:
+            conn = self._get_connection()
+            metadata = dict(conn.execute(METADATA_QUERY).fetchall())
+            deduplicated = conn.execute(DEDUPLICATION_QUERY).fetchone()[0] == 2
+        except Exception as e:
+            logger.error(f"Error reading metadata from MBTiles: {str(e)}")
+            self.close()
+            return None
+        return MetadataState(version, metadata, deduplicated)
@@ -0,0 +1,147 @@
+import gzip
+import hashlib
+import logging
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from api.models import Incident, Waypoint, Hazard_Zone
+from api.services.tile_math import bbox_tile_range, lonlat_to_mercator, mercator_to_lonlat
+
+logger = logging.getLogger(__name__)
+
+# MVT geometry extent and clipping buffer, in tile pixels
+EXTENT = 4096
+BUFFER = 64
+# Width of the Web Mercator world in metres
+WORLD_WIDTH = 40075016.68557849
+
+# One layer per operational model. ST_TileEnvelope's margin widens the
+# index lookup by the clipping buffer so features near the edge are kept.
+OPS_TILE_SQL = f"""
+WITH
+    bounds AS (
+        SELECT ST_TileEnvelope(%(z)s, %(x)s, %(y)s) AS tile,
+               ST_Transform(ST_TileEnvelope(%(z)s, %(x)s, %(y)s, margin => {BUFFER / EXTENT}), 4326) AS search
+    ),
+    incidents AS (
+        SELECT i.id, i.name, i.severity,
+               ST_AsMVTGeom(ST_Transform(i.location, 3857), bounds.tile, {EXTENT}, {BUFFER}, true) AS geom
+        FROM {Incident._meta.db_table} i, bounds
+        WHERE i.location && bounds.search
+    ),
+    waypoints AS (
+        SELECT w.id, w.name, w.type, w.is_available,
+               ST_AsMVTGeom(ST_Transform(w.location, 3857), bounds.tile, {EXTENT}, {BUFFER}, true) AS geom
+        FROM {Waypoint._meta.db_table} w, bounds
+        WHERE w.location && bounds.search
+    ),
+    hazard_zones AS (
+        SELECT h.id, h.name, h.severity,
+               ST_AsMVTGeom(
+                   ST_SimplifyPreserveTopology(ST_Transform(h.location, 3857), %(tolerance)s),
+                   bounds.tile, {EXTENT}, {BUFFER}, true
+               ) AS geom
+        FROM {Hazard_Zone._meta.db_table} h, bounds
+        WHERE h.location && bounds.search
+    )
+SELECT
+    COALESCE((SELECT ST_AsMVT(incidents, 'incidents', {EXTENT}, 'geom') FROM incidents WHERE geom IS NOT NULL), ''::bytea)
+    || COALESCE((SELECT ST_AsMVT(waypoints, 'waypoints', {EXTENT}, 'geom') FROM waypoints WHERE geom IS NOT NULL), ''::bytea)
+    || COALESCE((SELECT ST_AsMVT(hazard_zones, 'hazard_zones', {EXTENT}, 'geom') FROM hazard_zones WHERE geom IS NOT NULL), ''::bytea)
+"""
+
+
+# An edit invalidates the cached tiles it touches key by key at zooms where
+# that is at most this many tiles; at higher zooms it bumps the zoom's
+# generation instead, which every cache key of that zoom includes
+MAX_INVALIDATED_TILES = 64
+
+
+def ops_tile_generation_key(z):
+    return f"ops-tile-generation:{z}"
+
+
+def ops_tile_cache_key(z, x, y, generation=0):
+    return f"ops-tile:{z}:{generation}/{x}/{y}"
+
+
+def simplify_tolerance(z):
+    """Simplify hazard zones to about one tile pixel at zoom z (metres)"""
+    return WORLD_WIDTH / (2 ** z) / EXTENT
+
+
+def render_ops_tile(z, x, y):
+    """
+    Build the operational-data tile in PostGIS
+    Returns: gzipped MVT bytes (empty bytes when the tile has no features)
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(OPS_TILE_SQL, {'z': z, 'x': x, 'y': y, 'tolerance': simplify_tolerance(z)})
+        row = cursor.fetchone()
+    tile = bytes(row[0]) if row and row[0] else b''
+    return gzip.compress(tile, compresslevel=6, mtime=0) if tile else b''
+
+
+def get_ops_tile(z, x, y):
+    """
+    Get an operational-data tile from the short-TTL cache, rendering it on a miss
+    Returns: tuple (gzipped bytes, etag)
+    """
+    key = ops_tile_cache_key(z, x, y, cache.get(ops_tile_generation_key(z), 0))
+    entry = cache.get(key)
+    if entry is None:
+        data = render_ops_tile(z, x, y)
+        entry = (data, hashlib.md5(data).hexdigest())
+        cache.set(key, entry, settings.OPS_TILE_CACHE_TTL)
+    return entry
+
+
+def _bump_generation(z):
+    key = ops_tile_generation_key(z)
+    # Generations outlive the tiles keyed by them
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add and incr
+        cache.set(key, 1, None)
+
+
+def invalidate_ops_extent(extent):
+    """
+    Drop the cached ops tiles, at every zoom level, that can contain
+    anything inside extent (minlon, minlat, maxlon, maxlat), including the
+    neighbours reached by the clipping buffer. At most MAX_INVALIDATED_TILES
+    keys are deleted per zoom, so the cost does not grow with the extent.
+    """
+    # The clipping buffer is a fixed share of the tile in Web Mercator, so
+    # widen the extent in metres rather than degrees
+    min_mx, min_my = lonlat_to_mercator(extent[0], extent[1])
+    max_mx, max_my = lonlat_to_mercator(extent[2], extent[3])
+    zooms = range(settings.OPS_TILE_MAX_ZOOM + 1)
+    generations = cache.get_many([ops_tile_generation_key(z) for z in zooms])
+    keys = []
+    bumped = []
+    for z in zooms:
+        margin = WORLD_WIDTH / (2 ** z) * BUFFER / EXTENT
+        minlon, minlat = mercator_to_lonlat(min_mx - margin, min_my - margin)
+        maxlon, maxlat = mercator_to_lonlat(max_mx + margin, max_my + margin)
+        min_x, max_x, min_y, max_y = bbox_tile_range((minlon, minlat, maxlon, maxlat), z)
+        if (max_x - min_x + 1) * (max_y - min_y + 1) > MAX_INVALIDATED_TILES:
+            _bump_generation(z)
+            bumped.append(z)
+            continue
+        generation = generations.get(ops_tile_generation_key(z), 0)
+        for x in range(min_x, max_x + 1):
+            for y in range(min_y, max_y + 1):
+                keys.append(ops_tile_cache_key(z, x, y, generation))
+    if keys:
+        cache.delete_many(keys)
+    logger.debug(f"Invalidated {len(keys)} ops tiles, new generation at zooms {bumped}")
+
+
+def invalidate_ops_tiles(*geometries):
+    """Drop the cached ops tiles covering the given geometries"""
+    for geometry in geometries:
+        if geometry is not None and not geometry.empty:
+            invalidate_ops_extent(geometry.extent)
@@ -0,0 +1,221 @@
+from array import array
+from api.services.varint import read_varint, write_varint
+import gzip
+import struct
+
+# PMTiles v3 archive layout, see https://github.com/protomaps/PMTiles/blob/main/spec/v3/spec.md
+#   header (127 bytes) | root directory | JSON metadata | leaf directories | tile data
+MAGIC = b'PMTiles'
+SPEC_VERSION = 3
+HEADER = struct.Struct('<7sBQQQQQQQQQQQBBBBBBiiiiBii')
+HEADER_SIZE = HEADER.size  # 127
+# The header and root directory must fit in the first 16 KiB of the archive
+# so a client can fetch both with a single request
+ROOT_DIRECTORY_MAX_BYTES = 16384 - HEADER_SIZE
+
+COMPRESSION_UNKNOWN = 0
+COMPRESSION_NONE = 1
+COMPRESSION_GZIP = 2
+COMPRESSION_BROTLI = 3
+COMPRESSION_ZSTD = 4
+
+TILE_TYPE_MVT = 1
+
+# HTTP Content-Encoding for each tile compression
+CONTENT_ENCODINGS = {
+    COMPRESSION_NONE: None,
+    COMPRESSION_GZIP: 'gzip',
+    COMPRESSION_BROTLI: 'br',
+    COMPRESSION_ZSTD: 'zstd',
+}
+
+HEADER_FIELDS = (
+    'magic', 'version',
+    'root_offset', 'root_length', 'metadata_offset', 'metadata_length',
+    'leaf_directory_offset', 'leaf_directory_length', 'tile_data_offset', 'tile_data_length',
+    'addressed_tiles_count', 'tile_entries_count', 'tile_contents_count',
+    'clustered', 'internal_compression', 'tile_compression', 'tile_type', 'min_zoom', 'max_zoom',
+    'min_lon_e7', 'min_lat_e7', 'max_lon_e7', 'max_lat_e7', 'center_zoom', 'center_lon_e7', 'center_lat_e7',
+)
+
+
+def _build_hilbert_table():
+    """
+    Precompute the Hilbert curve four bits of x and y at a time. The curve
+    orientation is one of four states (optionally mirrored, optionally
+    transposed); each table entry holds the curve position inside the
+    16x16 block and the orientation for the next, lower four bits.
+    """
+    table = [None] * (4 << 8)
+    for state in range(4):
+        for xc in range(16):
+            for yc in range(16):
+                flip, swap = state >> 1, state & 1
+                x, y = (xc ^ 15, yc ^ 15) if flip else (xc, yc)
+                if swap:
+                    x, y = y, x
+                d = 0
+                s = 8
+                while s > 0:
+                    rx = 1 if x & s else 0
+                    ry = 1 if y & s else 0
+                    d += s * s * ((3 * rx) ^ ry)
+                    # Rotate the quadrant so the curve stays continuous
+                    if ry == 0:
+                        if rx == 1:
+                            x ^= 15
+                            y ^= 15
+                            flip ^= 1
+                        x, y = y, x
+                        swap ^= 1
+                    s >>= 1
+                table[(state << 8) | (xc << 4) | yc] = (d, (flip << 1) | swap)
+    return table
+
+
+_HILBERT_TABLE = _build_hilbert_table()
+
+
+def zxy_to_tileid(z, x, y):
+    """
+    Map an XYZ tile to its PMTiles tile id: tiles of lower zoom levels come
+    first, tiles within a zoom level are ordered along a Hilbert curve
+    """
+    if x >> z or y >> z:
+        raise ValueError(f"Tile {z}/{x}/{y} is outside the zoom level")
+    # Pad the zoom to whole 4-bit steps; every leading zero bit transposes
+    # the curve once, which sets the starting orientation
+    steps = (z + 3) >> 2
+    state = (4 * steps - z) & 1
+    d = 0
+    table = _HILBERT_TABLE
+    for shift in range(4 * (steps - 1), -1, -4):
+        part, state = table[(state << 8) | (((x >> shift) & 15) << 4) | ((y >> shift) & 15)]
+        d = (d << 8) | part
+    # Number of tiles in all lower zoom levels: (4^z - 1) / 3
+    return ((1 << (2 * z)) - 1) // 3 + d
+
+
+def parse_header(data):
+    """Parse the 127-byte header; returns a dict keyed by HEADER_FIELDS"""
+    if len(data) < HEADER_SIZE:
+        raise ValueError("File too small for a PMTiles header")
+    header = dict(zip(HEADER_FIELDS, HEADER.unpack_from(data, 0)))
+    if header['magic'] != MAGIC:
+        raise ValueError("Not a PMTiles archive")
+    if header['version'] != SPEC_VERSION:
+        raise ValueError(f"Unsupported PMTiles version {header['version']}")
+    return header
+
+
+def serialize_header(header):
+    return HEADER.pack(*(header[field] for field in HEADER_FIELDS))
+
+
+def decompress(data, compression):
+    if compression in (COMPRESSION_NONE, COMPRESSION_UNKNOWN):
+        return bytes(data)
+    if compression == COMPRESSION_GZIP:
+        return gzip.decompress(data)
+    raise ValueError(f"Unsupported PMTiles internal compression {compression}")
+
+
+def compress(data, compression):
+    if compression == COMPRESSION_NONE:
+        return bytes(data)
+    if compression == COMPRESSION_GZIP:
+        return gzip.compress(data, mtime=0)
+    raise ValueError(f"Unsupported PMTiles internal compression {compression}")
+
+
+class Directory:
+    """
+    Decoded directory, stored as parallel unsigned 64-bit arrays so a
+    lookup is a single bisect over tile_ids and a large directory costs
+    8 bytes per field rather than a Python int object. An entry with run_length 0 points at a leaf
+    directory instead of tile data.
+    """
+
+    __slots__ = ('tile_ids', 'run_lengths', 'lengths', 'offsets')
+
+    def __init__(self, tile_ids, run_lengths, lengths, offsets):
+        self.tile_ids = tile_ids
+        self.run_lengths = run_lengths
+        self.lengths = lengths
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.tile_ids)
+
+
+def parse_directory(data):
+    """Decode an uncompressed directory"""
+    count, pos = read_varint(data, 0)
+    tile_ids = array('Q', [0]) * count
+    run_lengths = array('Q', [0]) * count
+    lengths = array('Q', [0]) * count
+    offsets = array('Q', [0]) * count
+
+    last_id = 0
+    for i in range(count):
+        delta, pos = read_varint(data, pos)
+        last_id += delta
+        tile_ids[i] = last_id
+    for i in range(count):
+        run_lengths[i], pos = read_varint(data, pos)
+    for i in range(count):
+        lengths[i], pos = read_varint(data, pos)
+    for i in range(count):
+        value, pos = read_varint(data, pos)
+        # 0 means "directly after the previous entry"
+        if value == 0 and i > 0:
+            offsets[i] = offsets[i - 1] + lengths[i - 1]
+        else:
+            offsets[i] = value - 1
+    return Directory(tile_ids, run_lengths, lengths, offsets)
+
+
+def serialize_directory(entries):
+    """Encode a list of (tile_id, offset, length, run_length) tuples sorted by tile_id"""
+    buf = bytearray()
+    write_varint(buf, len(entries))
+    last_id = 0
+    for tile_id, _, _, _ in entries:
+        write_varint(buf, tile_id - last_id)
+        last_id = tile_id
+    for _, _, _, run_length in entries:
+        write_varint(buf, run_length)
+    for _, _, length, _ in entries:
+        write_varint(buf, length)
+    for i, (_, offset, _, _) in enumerate(entries):
+        if i > 0 and offset == entries[i - 1][1] + entries[i - 1][2]:
+            write_varint(buf, 0)
+        else:
+            write_varint(buf, offset + 1)
+    return bytes(buf)
+
+
+def build_directories(entries, compression):
+    """
+    Lay out the directory tree for a sorted list of tile entries. Everything
+    goes into the root directory when it fits; otherwise entries are split
+    into leaf directories, doubling the leaf size until the root fits.
+    Returns: tuple (root bytes, leaf directories bytes)
+    """
+    root = compress(serialize_directory(entries), compression)
+    if len(root) <= ROOT_DIRECTORY_MAX_BYTES:
+        return root, b''
+
+    leaf_size = 4096
+    while True:
+        leaves = bytearray()
+        root_entries = []
+        for start in range(0, len(entries), leaf_size):
+            chunk = entries[start:start + leaf_size]
+            leaf = compress(serialize_directory(chunk), compression)
+            root_entries.append((chunk[0][0], len(leaves), len(leaf), 0))
+            leaves += leaf
+        root = compress(serialize_directory(root_entries), compression)
+        if len(root) <= ROOT_DIRECTORY_MAX_BYTES:
+            return root, bytes(leaves)
+        leaf_size *= 2
@@ -0,0 +1,168 @@
+from bisect import bisect_right
+from collections import OrderedDict
+import json
+import logging
+import mmap
+import os
+import threading
+from api.services.tile_source import TileSource, MetadataState
+from api.services import pmtiles_format
+
+logger = logging.getLogger(__name__)
+
+
+class _Archive:
+    """One memory-mapped version of the PMTiles file with its decoded directories"""
+
+    def __init__(self, path, version, leaf_cache_size):
+        with open(path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.version = version
+        self.view = memoryview(self.mm)
+        self.header = pmtiles_format.parse_header(self.mm)
+        self.root = self._parse_directory(self.header['root_offset'], self.header['root_length'])
+        self._leaves = OrderedDict()
+        self._leaf_cache_size = leaf_cache_size
+        self._lock = threading.Lock()
+
+    def _parse_directory(self, offset, length):
+        data = pmtiles_format.decompress(
+            self.view[offset:offset + length],
+            self.header['internal_compression']
+        )
+        return pmtiles_format.parse_directory(data)
+
+    def _leaf(self, offset, length):
+        """Return a decoded leaf directory, keeping the most recently used ones"""
+        with self._lock:
+            directory = self._leaves.get(offset)
+            if directory is not None:
+                self._leaves.move_to_end(offset)
+                return directory
+        directory = self._parse_directory(self.header['leaf_directory_offset'] + offset, length)
+        with self._lock:
+            self._leaves[offset] = directory
+            if len(self._leaves) > self._leaf_cache_size:
+                self._leaves.popitem(last=False)
+        return directory
+
+    def find(self, tile_id):
+        """
+        Walk the directory tree for a tile id
+        Returns: tuple (offset, length) inside the tile data section or None
+        """
+        directory = self.root
+        # The spec allows at most three levels of leaf directories
+        for _ in range(4):
+            i = bisect_right(directory.tile_ids, tile_id) - 1
+            if i < 0:
+                return None
+            run_length = directory.run_lengths[i]
+            if run_length == 0:
+                directory = self._leaf(directory.offsets[i], directory.lengths[i])
+                continue
+            if tile_id < directory.tile_ids[i] + run_length:
+                return directory.offsets[i], directory.lengths[i]
+            return None
+        return None
+
+    def tile_data(self, offset, length):
+        start = self.header['tile_data_offset'] + offset
+        return self.view[start:start + length]
+
+
+class PMTilesService(TileSource):
+    """
+    Service for serving vector tiles from a PMTiles v3 archive.
+
+    The archive is memory-mapped and the root directory decoded once, so a
+    lookup is a bisect in memory plus a slice of the mapping; tiles are
+    returned as memoryviews into the mapped file rather than copied bytes.
+    """
+
+    # Decoded leaf directories kept per archive
+    leaf_cache_size = 64
+
+    def __init__(self, pmtiles_path, cache=None):
+        if not os.path.exists(pmtiles_path):
+            raise FileNotFoundError(f"PMTiles file not found: {pmtiles_path}")
+        super().__init__(pmtiles_path, cache=cache)
+        self._archive_lock = threading.Lock()
+        self._archive = _Archive(pmtiles_path, self._file_version, self.leaf_cache_size)
+        self.content_encoding = pmtiles_format.CONTENT_ENCODINGS.get(self._archive.header['tile_compression'])
+
+    def _get_archive(self):
+        """Return the mapped archive, remapping it if the file was swapped"""
+        version = self._current_file_version()
+        archive = self._archive
+        if archive.version == version:
+            return archive
+        with self._archive_lock:
+            archive = self._archive
+            if archive.version != version:
+                # The old mapping is not closed: responses still being written
+                # may hold views into it. It is unmapped once they are gone.
+                archive = _Archive(self.path, version, self.leaf_cache_size)
+                self._archive = archive
+                self.content_encoding = pmtiles_format.CONTENT_ENCODINGS.get(archive.header['tile_compression'])
+        return archive
+
+    def _read_tile(self, z, x, y):
+        """
+        Read a tile from the mapped archive
+        Returns: tuple (memoryview, etag) or (None, None) if not found
+        """
+        try:
+            archive = self._get_archive()
+            if not archive.header['min_zoom'] <= z <= archive.header['max_zoom']:
+                return None, None
+            found = archive.find(pmtiles_format.zxy_to_tileid(z, x, y))
+            if found is None:
+                logger.debug(f"Tile not found: {z}/{x}/{y}")
+                return None, None
+            offset, length = found
+            # Deduplicated tiles share one offset, so the offset identifies
+            # the content within this version of the file
+            etag = self._get_metadata_state().tile_id_etag(f"{offset:x}-{length:x}")
+            return archive.tile_data(offset, length), etag
+        except Exception as e:
+            logger.error(f"Error reading tile {z}/{x}/{y} from PMTiles: {str(e)}")
+            return None, None
+
+    def _read_tile_etag(self, z, x, y):
+        # The ETag comes from the directory entry; no tile bytes are touched
+        return self._read_tile(z, x, y)[1]
+
+    def _read_metadata(self, version):
+        """
+        Read the JSON metadata and the header fields, presented with the
+        MBTiles metadata conventions shared by every tile source
+        """
+        try:
+            archive = self._get_archive()
+            header = archive.header
+            start, length = header['metadata_offset'], header['metadata_length']
+            raw = pmtiles_format.decompress(archive.view[start:start + length], header['internal_compression'])
+            document = json.loads(raw) if raw else {}
+        except Exception as e:
+            logger.error(f"Error reading metadata from PMTiles: {str(e)}")
+            return None
+
+        metadata = {}
+        layer_json = {}
+        for key, value in document.items():
+            if key in ('vector_layers', 'tilestats'):
+                layer_json[key] = value
+            elif isinstance(value, str):
+                metadata[key] = value
+            else:
+                metadata[key] = json.dumps(value)
+        if layer_json:
+            metadata['json'] = json.dumps(layer_json)
+        metadata['minzoom'] = str(header['min_zoom'])
+        metadata['maxzoom'] = str(header['max_zoom'])
+        metadata['bounds'] = ','.join(
+            str(header[field] / 1e7) for field in ('min_lon_e7', 'min_lat_e7', 'max_lon_e7', 'max_lat_e7')
+        )
+        metadata['center'] = f"{header['center_lon_e7'] / 1e7},{header['center_lat_e7'] / 1e7},{header['center_zoom']}"
+        return MetadataState(version, metadata, deduplicated=True)
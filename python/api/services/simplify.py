@@ -0,0 +1,64 @@
+from django.db import connection
+from api.models import Hazard_Zone
+
+# Zoom levels with a stored simplified hazard zone polygon, each in the
+# Hazard_Zone column location_z<zoom>; above the last, the full polygon
+SIMPLIFIED_ZOOMS = (6, 9, 12)
+# Pixels of a 256px tile grid at zoom 0 (MapLibre's zoom convention)
+TILE_SIZE = 256
+
+
+def zoom_tolerance(z):
+    """Half a screen pixel at zoom z, in degrees: simplifying by it is invisible"""
+    return 180.0 / (TILE_SIZE * 2 ** z)
+
+
+def simplified_column(z):
+    return f'location_z{z}'
+
+
+def column_for_zoom(z):
+    """
+    The coarsest stored geometry still exact to half a pixel at zoom z
+    Returns: column name, or None for the full resolution location
+    """
+    for level in SIMPLIFIED_ZOOMS:
+        if level >= z:
+            return simplified_column(level)
+    return None
+
+
+def column_for_tolerance(tolerance):
+    """
+    The coarsest stored geometry simplified by at most `tolerance` degrees
+    Returns: column name, or None for the full resolution location
+    """
+    for level in SIMPLIFIED_ZOOMS:
+        if zoom_tolerance(level) <= tolerance:
+            return simplified_column(level)
+    return None
+
+
+def simplify_hazard_zone(zone):
+    """Fill the simplified columns of a zone from its location, before saving"""
+    for level in SIMPLIFIED_ZOOMS:
+        simplified = None
+        if zone.location is not None:
+            # Preserving topology keeps every ring a valid polygon
+            simplified = zone.location.simplify(zoom_tolerance(level), preserve_topology=True)
+            simplified.srid = zone.location.srid
+        setattr(zone, simplified_column(level), simplified)
+
+
+def resimplify_hazard_zones():
+    """
+    Recompute every zone's simplified columns in the database
+    Returns: number of zones
+    """
+    assignments = ', '.join(
+        f'{simplified_column(level)} = ST_SimplifyPreserveTopology(location, {zoom_tolerance(level)!r})'
+        for level in SIMPLIFIED_ZOOMS
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f"UPDATE {Hazard_Zone._meta.db_table} SET {assignments}")
+        return cursor.rowcount
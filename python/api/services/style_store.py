@@ -0,0 +1,120 @@
+from django.conf import settings
+from api.services.encodings import encode_body
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = os.path.join(settings.BASE_DIR, 'static')
+# Stands in for the public base URL in a built style until it is served
+BASE_URL_TOKEN = '__ADH_BASE_URL__'
+
+
+def build_style(style, style_id, name):
+    """
+    Point a style at this server's tile and glyph endpoints
+    Returns: the style, with BASE_URL_TOKEN where the base URL goes
+    """
+    if 'sources' in style and 'openmaptiles' in style['sources']:
+        style['sources']['openmaptiles'] = {
+            "type": "vector",
+            "tiles": [f"{BASE_URL_TOKEN}/api/tiles/{{z}}/{{x}}/{{y}}.mvt"],
+            "minzoom": 0,
+            "maxzoom": 14
+        }
+    style['glyphs'] = f"{BASE_URL_TOKEN}/api/fonts/{{fontstack}}/{{range}}.pbf"
+    # Sprites are not hosted locally
+    style.pop('sprite', None)
+    style['name'] = name
+    style['id'] = style_id
+    return style
+
+
+class StyleStore:
+    """
+    Map styles built once into ready-to-send bodies.
+
+    Each style in the MAP_STYLES registry is parsed and adapted once per
+    change of its file (re-checked at most every recheck_interval seconds),
+    then rendered per public base URL into every content encoding (see
+    api/services/encodings.py), so serving one is a dictionary lookup.
+    """
+
+    recheck_interval = 2.0
+    # (style, base URL) renderings kept; hosts are limited by ALLOWED_HOSTS
+    max_variants = 32
+
+    def __init__(self, styles, static_dir=STATIC_DIR):
+        self.styles = styles
+        self.static_dir = static_dir
+        self._lock = threading.Lock()
+        # style id -> (file version, time of last stat, template text)
+        self._templates = {}
+        # (style id, base URL) -> EncodedBody
+        self._variants = {}
+
+    def _path(self, style_id):
+        return os.path.join(self.static_dir, self.styles[style_id]['file'])
+
+    def available(self):
+        """Returns: list of {name, description, url} for styles whose file exists"""
+        return [
+            {
+                'name': style_id,
+                'description': entry.get('description', ''),
+                'url': f'/api/styles/{style_id}.json',
+            }
+            for style_id, entry in self.styles.items()
+            if os.path.exists(self._path(style_id))
+        ]
+
+    def _template(self, style_id):
+        """Returns: the adapted style text, rebuilt when its file changed"""
+        now = time.monotonic()
+        cached = self._templates.get(style_id)
+        if cached is not None and now - cached[1] < self.recheck_interval:
+            return cached[2]
+        st = os.stat(self._path(style_id))
+        version = (st.st_ino, st.st_size, st.st_mtime_ns)
+        with self._lock:
+            cached = self._templates.get(style_id)
+            if cached is not None and cached[0] == version:
+                self._templates[style_id] = (version, now, cached[2])
+                return cached[2]
+            with open(self._path(style_id), 'r', encoding='utf-8') as f:
+                style = json.load(f)
+            entry = self.styles[style_id]
+            text = json.dumps(build_style(style, style_id, entry.get('name', style_id)), separators=(',', ':'))
+            self._templates[style_id] = (version, now, text)
+            for key in [key for key in self._variants if key[0] == style_id]:
+                del self._variants[key]
+            logger.info(f"Built style {style_id} from {self._path(style_id)}")
+            return text
+
+    def get(self, style_id, base_url):
+        """
+        Get a style rendered for a public base URL (scheme://host[:port])
+        Returns: EncodedBody, or None for an unknown style; raises OSError or
+        ValueError if the style file is missing or invalid
+        """
+        if style_id not in self.styles:
+            return None
+        template = self._template(style_id)
+        key = (style_id, base_url)
+        body = self._variants.get(key)
+        if body is not None:
+            return body
+
+        body = encode_body(template.replace(BASE_URL_TOKEN, json.dumps(base_url)[1:-1]).encode('utf-8'))
+        with self._lock:
+            if len(self._variants) >= self.max_variants:
+                self._variants.clear()
+            self._variants[key] = body
+        return body
+
+
+# Process-wide store used by the style views
+style_store = StyleStore(settings.MAP_STYLES)
@@ -0,0 +1,90 @@
+from collections import OrderedDict
+import threading
+
+
+class TileCache:
+    """
+    In-process LRU cache of raw (gzipped) tile blobs keyed by (z, x, y).
+    Each blob is stored together with its ETag.
+
+    Eviction is driven by the total size of the cached blobs rather than
+    the number of entries. Tiles at or below pin_max_zoom are pinned: every
+    client fetches them, so they are never evicted once cached.
+    """
+
+    def __init__(self, max_bytes, pin_max_zoom=10):
+        self.max_bytes = max_bytes
+        self.pin_max_zoom = pin_max_zoom
+        self._entries = OrderedDict()
+        self._pinned = {}
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.pinned_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Return the cached (blob, etag) pair for key or None, refreshing its
+        LRU position
+        """
+        with self._lock:
+            entry = self._pinned.get(key)
+            if entry is None:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def put(self, key, data, etag=None):
+        """Store a blob, evicting least recently used unpinned tiles to fit the budget"""
+        size = len(data)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._pinned or key in self._entries:
+                return
+            if key[0] <= self.pin_max_zoom:
+                if self.pinned_bytes + size > self.max_bytes:
+                    return
+                self._pinned[key] = (data, etag)
+                self.pinned_bytes += size
+                self.current_bytes += size
+                self._evict()
+                return
+            self._entries[key] = (data, etag)
+            self.current_bytes += size
+            self._evict()
+
+    def _evict(self):
+        while self.current_bytes > self.max_bytes and self._entries:
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self.current_bytes -= len(evicted)
+            self.evictions += 1
+
+    def clear(self):
+        """Drop every cached tile, e.g. after the underlying file changed"""
+        with self._lock:
+            self._entries.clear()
+            self._pinned.clear()
+            self.current_bytes = 0
+            self.pinned_bytes = 0
+
+    def stats(self):
+        """Return counters suitable for a JSON response"""
+        with self._lock:
+            return {
+                "entries": len(self._entries) + len(self._pinned),
+                "pinned_entries": len(self._pinned),
+                "bytes": self.current_bytes,
+                "pinned_bytes": self.pinned_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
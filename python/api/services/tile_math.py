@@ -0,0 +1,65 @@
+import math
+
+# Latitude limit of the Web Mercator tile grid
+MAX_LATITUDE = 85.0511287798
+# Earth radius of the Web Mercator projection (EPSG:3857), in metres
+MERCATOR_RADIUS = 6378137.0
+
+
+def lonlat_to_tile(lon, lat, z):
+    """
+    Convert a WGS84 coordinate to XYZ tile coordinates at zoom z
+    Returns: tuple (x, y) clamped to the tile grid
+    """
+    n = 2 ** z
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def lonlat_to_mercator(lon, lat):
+    """Returns: tuple (x, y) in EPSG:3857 metres"""
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    return (
+        MERCATOR_RADIUS * math.radians(lon),
+        MERCATOR_RADIUS * math.asinh(math.tan(math.radians(lat))),
+    )
+
+
+def mercator_to_lonlat(x, y):
+    """Returns: tuple (lon, lat) of an EPSG:3857 coordinate"""
+    return math.degrees(x / MERCATOR_RADIUS), math.degrees(math.atan(math.sinh(y / MERCATOR_RADIUS)))
+
+
+def bbox_tile_range(bbox, z):
+    """
+    Get the XYZ tile range covering a bounding box at zoom z
+    bbox: (minlon, minlat, maxlon, maxlat)
+    Returns: tuple (min_x, max_x, min_y, max_y)
+    """
+    minlon, minlat, maxlon, maxlat = bbox
+    min_x, min_y = lonlat_to_tile(minlon, maxlat, z)
+    max_x, max_y = lonlat_to_tile(maxlon, minlat, z)
+    return min_x, max_x, min_y, max_y
+
+
+def parse_bbox(value):
+    """
+    Parse a 'minlon,minlat,maxlon,maxlat' string
+    Returns: tuple of four floats; raises ValueError if malformed, not
+    finite or outside -180..180 / -90..90
+    """
+    parts = [float(part) for part in value.split(',')]
+    if len(parts) != 4:
+        raise ValueError("bbox must have four comma-separated values")
+    if not all(math.isfinite(part) for part in parts):
+        raise ValueError("bbox values must be finite numbers")
+    minlon, minlat, maxlon, maxlat = parts
+    if not (-180.0 <= minlon <= 180.0 and -180.0 <= maxlon <= 180.0):
+        raise ValueError("bbox longitudes must be between -180 and 180")
+    if not (-90.0 <= minlat <= 90.0 and -90.0 <= maxlat <= 90.0):
+        raise ValueError("bbox latitudes must be between -90 and 90")
+    if minlon > maxlon or minlat > maxlat:
+        raise ValueError("bbox minimum is larger than its maximum")
+    return minlon, minlat, maxlon, maxlat
@@ -0,0 +1,359 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Berlin bounds, used when the tileset metadata has none
+DEFAULT_BOUNDS = (13.0882, 52.3382, 13.7606, 52.6755)
+
+# OpenMapTiles layers, used when the tileset has no vector_layers metadata
+DEFAULT_VECTOR_LAYERS = [
+    {
+        "id": "transportation",
+        "description": "Road network",
+        "minzoom": 4,
+        "maxzoom": 14,
+        "fields": {
+            "class": "Road type",
+            "name": "Road name",
+            "ref": "Road reference",
+            "oneway": "One-way indicator",
+            "brunnel": "Bridge/tunnel indicator"
+        }
+    },
+    {
+        "id": "building",
+        "description": "Building footprints",
+        "minzoom": 13,
+        "maxzoom": 14,
+        "fields": {
+            "class": "Building type",
+            "name": "Building name",
+            "height": "Building height"
+        }
+    },
+    {
+        "id": "water",
+        "description": "Water features",
+        "minzoom": 0,
+        "maxzoom": 14,
+        "fields": {
+            "class": "Water type",
+            "name": "Water feature name"
+        }
+    },
+    {
+        "id": "landuse",
+        "description": "Land use areas",
+        "minzoom": 4,
+        "maxzoom": 14,
+        "fields": {
+            "class": "Land use type",
+            "name": "Area name"
+        }
+    },
+    {
+        "id": "poi",
+        "description": "Points of interest",
+        "minzoom": 12,
+        "maxzoom": 14,
+        "fields": {
+            "class": "POI type",
+            "name": "POI name"
+        }
+    }
+]
+
+
+def open_tile_source(path, cache=None):
+    """
+    Open a tileset file with the backend matching its extension
+    (.pmtiles -> PMTilesService, anything else -> MBTilesService)
+    """
+    if str(path).endswith('.pmtiles'):
+        from api.services.pmtiles_service import PMTilesService
+        return PMTilesService(path, cache=cache)
+    from api.services.mbtiles_service import MBTilesService
+    return MBTilesService(path, cache=cache)
+
+
+class TileSource:
+    """
+    Base class for file-backed vector tile sources.
+
+    Handles what every backend shares: detecting when the file is swapped
+    on disk, the optional in-process tile cache and the metadata/TileJSON
+    derived from the tileset metadata. Subclasses implement _read_tile and
+    _read_metadata.
+    """
+
+    # How often (seconds) the file is re-stat'ed to detect a swapped tileset
+    recheck_interval = 2.0
+    # Content-Encoding of the stored tile blobs
+    content_encoding = 'gzip'
+
+    def __init__(self, path, cache=None):
+        self.path = path
+        self.cache = cache
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Tileset file not found: {path}")
+        self._file_version = self._stat_file_version()
+        self._last_check = time.monotonic()
+        self._version_lock = threading.Lock()
+        self._metadata_state = None
+
+    def _stat_file_version(self):
+        """Identify the file on disk by inode, size and mtime"""
+        st = os.stat(self.path)
+        return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _current_file_version(self):
+        """
+        Return the file version, re-checking the file on disk at most once
+        per recheck_interval so the hot path stays free of syscalls.
+        """
+        now = time.monotonic()
+        if now - self._last_check >= self.recheck_interval:
+            with self._version_lock:
+                if now - self._last_check >= self.recheck_interval:
+                    try:
+                        version = self._stat_file_version()
+                    except OSError as e:
+                        logger.error(f"Cannot stat tileset file {self.path}: {str(e)}")
+                        version = self._file_version
+                    if version != self._file_version:
+                        logger.info(f"Tileset file changed on disk, reopening: {self.path}")
+                        self._file_version = version
+                        if self.cache is not None:
+                            self.cache.clear()
+                    self._last_check = now
+        return self._file_version
+
+    def close(self):
+        """Release resources held for the calling thread"""
+
+    def _read_tile(self, z, x, y):
+        """Read a tile from the file; returns (bytes, etag) or (None, None)"""
+        raise NotImplementedError
+
+    def _read_tile_etag(self, z, x, y):
+        """Read a tile's ETag; backends that can do so without the blob override this"""
+        return self._read_tile(z, x, y)[1]
+
+    def _read_metadata(self, version):
+        """Read and parse the tileset metadata; returns a MetadataState"""
+        raise NotImplementedError
+
+    def get_tile(self, z, x, y):
+        """
+        Get a vector tile
+        Returns: bytes of the tile data or None if not found
+        """
+        return self.get_tile_with_etag(z, x, y)[0]
+
+    def get_tile_with_etag(self, z, x, y):
+        """
+        Get a vector tile together with its content hash
+        Returns: tuple (bytes, etag) or (None, None) if not found
+        """
+        entry = self.get_cached_tile(z, x, y)
+        if entry is not None:
+            return entry
+        tile_data, etag = self._read_tile(z, x, y)
+        if tile_data is not None and self.cache is not None:
+            self.cache.put((z, x, y), tile_data, etag)
+        return tile_data, etag
+
+    def get_cached_tile(self, z, x, y):
+        """
+        Get a tile from the in-process cache only, never touching the file
+        Returns: tuple (bytes, etag) or None if the tile is not cached
+        """
+        if self.cache is None:
+            return None
+        # Checking the file version first lets a swapped file flush the cache
+        self._current_file_version()
+        return self.cache.get((z, x, y))
+
+    def get_tile_etag(self, z, x, y):
+        """
+        Get the ETag of a tile, reading its blob only if the backend cannot
+        tell the content hash otherwise
+        Returns: etag string or None if not found
+        """
+        entry = self.get_cached_tile(z, x, y)
+        if entry is not None:
+            return entry[1]
+        return self._read_tile_etag(z, x, y)
+
+    def iter_tile_range(self, z, min_x, max_x, min_y, max_y):
+        """
+        Read every tile of a rectangular XYZ range
+        Yields: tuples (x, y, bytes, etag) for the tiles that exist
+        """
+        for x in range(min_x, max_x + 1):
+            for y in range(min_y, max_y + 1):
+                tile_data, etag = self._read_tile(z, x, y)
+                if tile_data is not None:
+                    yield x, y, tile_data, etag
+
+    def get_tiles(self, coords):
+        """
+        Get many tiles at once
+        Returns: dict mapping (z, x, y) to (bytes, etag) for the tiles found
+        """
+        found = {}
+        for z, x, y in coords:
+            tile_data, etag = self.get_tile_with_etag(z, x, y)
+            if tile_data is not None:
+                found[(z, x, y)] = (tile_data, etag)
+        return found
+
+    def _get_metadata_state(self):
+        """
+        Return the parsed metadata for the current file version, reading the
+        metadata only once per version of the file.
+        """
+        version = self._current_file_version()
+        state = self._metadata_state
+        if state is not None and state.version == version:
+            return state
+        state = self._read_metadata(version)
+        if state is not None:
+            self._metadata_state = state
+            return state
+        # Do not memoize a failed read
+        return MetadataState(version, {})
+
+    def get_metadata(self):
+        """
+        Get metadata from the tileset
+        Returns: dict of metadata
+        """
+        return dict(self._get_metadata_state().metadata)
+
+    def get_bounds(self):
+        """
+        Get the bounds from metadata
+        Returns: list [minlon, minlat, maxlon, maxlat] or None
+        """
+        bounds = self._get_metadata_state().bounds
+        return list(bounds) if bounds else None
+
+    def get_center(self):
+        """
+        Get the center from metadata
+        Returns: list [lon, lat, zoom] or None
+        """
+        center = self._get_metadata_state().center
+        return list(center) if center else None
+
+    def get_zoom_range(self):
+        """
+        Get min/max zoom from metadata
+        Returns: tuple (minzoom, maxzoom)
+        """
+        return self._get_metadata_state().zoom_range
+
+    def get_vector_layers(self):
+        """
+        Get the vector_layers list from the tileset json metadata
+        Returns: list of layer dicts (falls back to the OpenMapTiles defaults)
+        """
+        return self._get_metadata_state().vector_layers
+
+    def get_tilejson(self, tiles_url):
+        """
+        Get the serialized TileJSON document for a tile URL template
+        Returns: tuple (body bytes, etag)
+        """
+        state = self._get_metadata_state()
+        cached = state.tilejson.get(tiles_url)
+        if cached is None:
+            cached = state.build_tilejson(tiles_url)
+            state.tilejson[tiles_url] = cached
+        return cached
+
+
+def _parse_float_list(value):
+    if value:
+        try:
+            return tuple(float(x) for x in value.split(','))
+        except ValueError:
+            pass
+    return None
+
+
+class MetadataState:
+    """
+    Metadata parsed once for one version of a tileset file. `metadata` uses
+    the MBTiles conventions: string values, vector_layers inside `json`.
+    """
+
+    def __init__(self, version, metadata, deduplicated=False):
+        self.version = version
+        self.metadata = metadata
+        self.deduplicated = deduplicated
+        self.bounds = _parse_float_list(metadata.get('bounds'))
+        self.center = _parse_float_list(metadata.get('center'))
+        try:
+            self.zoom_range = (int(metadata.get('minzoom', 0)), int(metadata.get('maxzoom', 14)))
+        except ValueError:
+            self.zoom_range = (0, 14)
+        self.vector_layers = self._parse_vector_layers(metadata.get('json'))
+        # Serialized TileJSON bodies keyed by tile URL template
+        self.tilejson = {}
+        # Tile ids and offsets are only unique within one file, so ETags
+        # derived from them are scoped to this version of the file
+        self._etag_prefix = hashlib.md5(repr(version).encode()).hexdigest()[:8]
+
+    def tile_id_etag(self, tile_id):
+        return f"{self._etag_prefix}-{tile_id}"
+
+    @staticmethod
+    def _parse_vector_layers(json_str):
+        if json_str:
+            try:
+                layers = json.loads(json_str).get('vector_layers')
+                if isinstance(layers, list) and layers:
+                    return layers
+            except (ValueError, AttributeError) as e:
+                logger.warning(f"Invalid json metadata in tileset: {str(e)}")
+        return DEFAULT_VECTOR_LAYERS
+
+    def build_tilejson(self, tiles_url):
+        """Build and serialize the TileJSON document; returns (body, etag)"""
+        minzoom, maxzoom = self.zoom_range
+
+        # Default to Berlin bounds if no bounds available
+        bounds = list(self.bounds) if self.bounds else list(DEFAULT_BOUNDS)
+
+        if self.center:
+            center = list(self.center)
+        else:
+            center = [
+                (bounds[0] + bounds[2]) / 2,  # Center longitude
+                (bounds[1] + bounds[3]) / 2,  # Center latitude
+                10  # Default zoom
+            ]
+
+        tilejson = {
+            "tilejson": "3.0.0",
+            "name": self.metadata.get("name", "Local OSM Vector Tiles"),
+            "description": self.metadata.get("description", "Vector tiles generated from local OpenStreetMap data"),
+            "version": self.metadata.get("version", "1.0.0"),
+            "attribution": "© OpenStreetMap contributors",
+            "scheme": "xyz",
+            "tiles": [tiles_url],
+            "minzoom": minzoom,
+            "maxzoom": maxzoom,
+            "bounds": bounds,
+            "center": center,
+            "vector_layers": self.vector_layers,
+        }
+        body = json.dumps(tilejson).encode('utf-8')
+        return body, f'"{hashlib.sha1(body).hexdigest()}"'
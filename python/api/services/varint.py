@@ -0,0 +1,29 @@
+# Base 128 varints as used by protobuf (glyph PBFs, vector tiles) and PMTiles directories
+
+
+def read_varint(buf, pos):
+    """
+    Decode the varint starting at buf[pos]
+    Returns: tuple (value, position after the varint)
+    Raises ValueError when buf ends inside the varint.
+    """
+    value = 0
+    shift = 0
+    end = len(buf)
+    while True:
+        if pos >= end:
+            raise ValueError("Truncated varint")
+        byte = buf[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def write_varint(buf, value):
+    """Append the varint encoding of a non-negative int to a bytearray"""
+    while value >= 0x80:
+        buf.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buf.append(value)
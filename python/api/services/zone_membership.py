@@ -0,0 +1,93 @@
+import logging
+from django.conf import settings
+from django.db import connection
+from api.models import Incident, Hazard_Zone, ZoneMembership
+
+logger = logging.getLogger(__name__)
+
+MEMBERSHIP_TABLE = ZoneMembership._meta.db_table
+INCIDENT_TABLE = Incident._meta.db_table
+ZONE_TABLE = Hazard_Zone._meta.db_table
+
+# ST_Intersects (rather than ST_Contains) counts incidents on a zone's
+# boundary as inside; both sides are answered from the GiST indexes
+JOIN_SQL = f"""
+SELECT z.id, i.id
+FROM {ZONE_TABLE} z JOIN {INCIDENT_TABLE} i ON ST_Intersects(z.location, i.location)
+"""
+
+INSERT_SQL = f"INSERT INTO {MEMBERSHIP_TABLE} (hazard_zone_id, incident_id) {JOIN_SQL}"
+
+
+def materialized():
+    return settings.HAZARD_ZONE_MEMBERSHIP_MATERIALIZED
+
+
+def refresh_memberships(model, ids):
+    """
+    Recompute the stored memberships of the given incidents or hazard zones
+    after they were created or moved. Deletions cascade on their own.
+    """
+    if not materialized() or not ids:
+        return
+    if model is Incident:
+        column, alias = 'incident_id', 'i'
+    elif model is Hazard_Zone:
+        column, alias = 'hazard_zone_id', 'z'
+    else:
+        return
+    ids = list(ids)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {MEMBERSHIP_TABLE} WHERE {column} = ANY(%s)", [ids])
+        cursor.execute(f"{INSERT_SQL} WHERE {alias}.id = ANY(%s)", [ids])
+
+
+def rebuild_memberships():
+    """
+    Recompute the whole table
+    Returns: number of memberships
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {MEMBERSHIP_TABLE}")
+        cursor.execute(INSERT_SQL)
+        count = cursor.rowcount
+    logger.info(f"Rebuilt {count} hazard zone memberships")
+    return count
+
+
+def zone_incident_ids(zone_ids, live=False):
+    """
+    Returns: dict hazard zone id -> sorted ids of the incidents inside it,
+    from the stored memberships or, with live=True, a spatial join
+    """
+    zone_ids = list(zone_ids)
+    result = {zone_id: [] for zone_id in zone_ids}
+    if not zone_ids:
+        return result
+    if live or not materialized():
+        with connection.cursor() as cursor:
+            cursor.execute(f"{JOIN_SQL} WHERE z.id = ANY(%s) ORDER BY z.id, i.id", [zone_ids])
+            rows = cursor.fetchall()
+    else:
+        rows = (
+            ZoneMembership.objects.filter(hazard_zone_id__in=zone_ids)
+            .order_by('hazard_zone_id', 'incident_id')
+            .values_list('hazard_zone_id', 'incident_id')
+        )
+    for zone_id, incident_id in rows:
+        result[zone_id].append(incident_id)
+    return result
+
+
+def incidents_in_zone(zone, live=False):
+    """Returns: queryset of the incidents inside a hazard zone"""
+    if live or not materialized():
+        return Incident.objects.filter(location__intersects=zone.location)
+    return Incident.objects.filter(zone_memberships__hazard_zone=zone)
+
+
+def zones_covering_incident(incident, live=False):
+    """Returns: queryset of the hazard zones an incident lies in"""
+    if live or not materialized():
+        return Hazard_Zone.objects.filter(location__intersects=incident.location)
+    return Hazard_Zone.objects.filter(memberships__incident=incident)
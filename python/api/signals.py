@@ -0,0 +1,77 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from api.models import Incident, Waypoint, Hazard_Zone, Tombstone
+from api.serializers import IncidentSerializer, WaypointSerializer, HazardZoneSerializer
+from api.services.event_broker import broker
+from api.services.ops_tiles import invalidate_ops_tiles
+from api.services.simplify import simplify_hazard_zone
+from api.services.zone_membership import refresh_memberships
+
+# Models whose changes are pushed to derived data (ops tile cache, ...)
+OPERATIONAL_MODELS = (Incident, Waypoint, Hazard_Zone)
+
+# Serializer used for the payload of pushed events
+EVENT_SERIALIZERS = {
+    Incident: IncidentSerializer,
+    Waypoint: WaypointSerializer,
+    Hazard_Zone: HazardZoneSerializer,
+}
+
+
+def publish_record_event(event_type, model, instance, previous_location=None):
+    """
+    Push a created/updated/deleted event to the event stream once the
+    current transaction commits. Skipped entirely while nobody listens.
+    """
+    if not broker.subscriber_count():
+        return
+    if event_type == 'deleted':
+        data = {'id': instance.pk}
+    else:
+        data = EVENT_SERIALIZERS[model](instance).data
+    extents = [g.extent for g in (instance.location, previous_location) if g is not None and not g.empty]
+    model_name = model._meta.model_name
+    transaction.on_commit(lambda: broker.publish(event_type, model_name, data, extents))
+
+
+def remember_previous_location(sender, instance, **kwargs):
+    """Keep the stored geometry of an updated record, its old tiles are stale too"""
+    if instance._state.adding or instance.pk is None:
+        instance._previous_location = None
+        return
+    instance._previous_location = (
+        sender.objects.filter(pk=instance.pk).values_list('location', flat=True).first()
+    )
+
+
+def simplify_zone_geometry(sender, instance, **kwargs):
+    simplify_hazard_zone(instance)
+
+
+def operational_record_saved(sender, instance, created=False, **kwargs):
+    previous_location = getattr(instance, '_previous_location', None)
+    invalidate_ops_tiles(previous_location, instance.location)
+    if created or previous_location is None or not previous_location.equals_exact(instance.location):
+        refresh_memberships(sender, [instance.pk])
+    publish_record_event('created' if created else 'updated', sender, instance, previous_location)
+
+
+def operational_record_deleted(sender, instance, **kwargs):
+    # Change feed clients learn about deletes from the tombstone
+    Tombstone.objects.create(
+        model=sender._meta.model_name,
+        object_id=instance.pk,
+        location=instance.location,
+    )
+    invalidate_ops_tiles(instance.location)
+    publish_record_event('deleted', sender, instance)
+
+
+def connect_signals():
+    """Called from ApiConfig.ready()"""
+    for model in OPERATIONAL_MODELS:
+        uid = model._meta.label_lower
+        pre_save.connect(remember_previous_location, sender=model, dispatch_uid=f'{uid}-previous-location')
+        post_save.connect(operational_record_saved, sender=model, dispatch_uid=f'{uid}-saved')
+        post_delete.connect(operational_record_deleted, sender=model, dispatch_uid=f'{uid}-deleted')
+    pre_save.connect(simplify_zone_geometry, sender=Hazard_Zone, dispatch_uid='api.hazard_zone-simplify')
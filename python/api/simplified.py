@@ -0,0 +1,68 @@
+from rest_framework.exceptions import ValidationError
+from api.geojson import FeatureLayout
+from api.serializers import SimplifiedHazardZoneSerializer
+from api.services.simplify import SIMPLIFIED_ZOOMS, column_for_tolerance, column_for_zoom, simplified_column
+
+
+class SimplifiedGeometryMixin:
+    """
+    Lets the hazard zone list serve stored simplified polygons:
+
+        GET /api/hazard-zones/?zoom=8          exact to half a pixel at zoom 8
+        GET /api/hazard-zones/?tolerance=0.01  simplified by at most 0.01 degrees
+
+    The coarsest stored resolution that meets the request is returned as
+    `location`; beyond the finest one the full polygon is. Only that one
+    geometry column is read from the database. Works with ?format=geojson
+    and the exports too.
+    """
+
+    def get_geometry_column(self):
+        """Returns: the simplified column to serve, or None for location"""
+        if not hasattr(self, '_geometry_column'):
+            self._geometry_column = self._parse_geometry_column(self.request.query_params)
+        return self._geometry_column
+
+    @staticmethod
+    def _parse_geometry_column(params):
+        if params.get('zoom'):
+            try:
+                zoom = int(params['zoom'])
+            except ValueError:
+                raise ValidationError({'zoom': 'Must be an integer'})
+            if not 0 <= zoom <= 24:
+                raise ValidationError({'zoom': 'Must be between 0 and 24'})
+            return column_for_zoom(zoom)
+        if params.get('tolerance'):
+            try:
+                tolerance = float(params['tolerance'])
+            except ValueError:
+                raise ValidationError({'tolerance': 'Must be a number of degrees'})
+            if not tolerance >= 0:
+                raise ValidationError({'tolerance': 'Must not be negative'})
+            return column_for_tolerance(tolerance)
+        return None
+
+    def get_queryset(self):
+        column = self.get_geometry_column()
+        unused = [simplified_column(level) for level in SIMPLIFIED_ZOOMS if simplified_column(level) != column]
+        if column is not None:
+            unused.append('location')
+        return super().get_queryset().defer(*unused)
+
+    def get_serializer_class(self):
+        if self.get_geometry_column() is not None:
+            return SimplifiedHazardZoneSerializer
+        return super().get_serializer_class()
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['geometry_column'] = self.get_geometry_column()
+        return context
+
+    def get_feature_layout(self):
+        column = self.get_geometry_column()
+        if column is None:
+            return super().get_feature_layout()
+        fields = [name for name in self.get_serializer_class().Meta.fields if name != 'location']
+        return FeatureLayout(self.get_queryset().model, fields, column)
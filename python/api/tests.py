@@ -1,3 +1,302 @@
-from django.test import TestCase
+import io
+import os
+import socket
+import sqlite3
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock
+from django.contrib.gis.geos import Point
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from api.models import Incident, Waypoint
+from api.services.dev_server import dev_server
+from api.services.glyph_store import composite_glyphs, parse_glyphs
+from api.services.pmtiles_format import zxy_to_tileid
+from api.services.pmtiles_service import PMTilesService
+from api.services.tile_cache import TileCache
+from api.services.tile_math import parse_bbox
+from api.services.varint import write_varint
+from api.views.tile_views import TILE_FRAME_HEADER
 
-# Create your tests here.
+
+class FrontendEntryPointTests(SimpleTestCase):
+    """/ must answer without outbound network I/O (no per-request Vite probe)"""
+
+    def get_recording_connections(self, path):
+        connections = []
+
+        def record(sock, address, *args, **kwargs):
+            connections.append(address)
+            raise ConnectionRefusedError(f"Outbound connection to {address}")
+
+        with mock.patch.object(socket.socket, 'connect', record), \
+                mock.patch.object(socket.socket, 'connect_ex', record):
+            response = self.client.get(path)
+        return response, connections
+
+    @override_settings(FRONTEND_MODE='prod')
+    def test_production_mode_makes_no_outbound_connections(self):
+        with mock.patch.object(dev_server, 'start') as start:
+            response, connections = self.get_recording_connections('/')
+        self.assertEqual(connections, [])
+        start.assert_not_called()
+        self.assertIn(response.status_code, (200, 503))
+
+    @override_settings(FRONTEND_MODE='dev')
+    def test_dev_mode_uses_cached_probe_result(self):
+        with mock.patch.object(dev_server, 'start'), mock.patch.object(dev_server, 'running', True):
+            response, connections = self.get_recording_connections('/')
+        self.assertEqual(connections, [])
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], dev_server.url)
+
+
+class BboxValidationTests(SimpleTestCase):
+    """Non-finite or out of range bboxes are rejected before any tile math"""
+
+    invalid = ['nan,1,2,3', '1,2,inf,3', '-181,0,0,1', '0,-91,1,0', '0,0,1,90.5']
+
+    def test_parse_bbox_rejects_invalid_values(self):
+        for value in self.invalid:
+            with self.subTest(bbox=value):
+                with self.assertRaises(ValueError):
+                    parse_bbox(value)
+        self.assertEqual(parse_bbox('-180,-90,180,90'), (-180.0, -90.0, 180.0, 90.0))
+
+    def test_endpoints_answer_400(self):
+        for url in ('/api/tiles/export.mbtiles?bbox=nan,1,2,3', '/api/clusters/?bbox=nan,1,2,3&zoom=5'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 400)
+
+
+class MapFastPathTests(SimpleTestCase):
+    """Endpoints under MAP_FAST_PATH_PREFIXES get CORS headers and a Host check"""
+
+    def test_ops_tile_has_cors_header(self):
+        with mock.patch('api.views.ops_tile_views.get_ops_tile', return_value=(b'tile', 'abc')):
+            response = self.client.get('/api/ops-tiles/3/4/2.mvt')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Access-Control-Allow-Origin'], '*')
+
+    def test_ops_tile_answers_304_for_matching_etag(self):
+        with mock.patch('api.views.ops_tile_views.get_ops_tile', return_value=(b'tile', 'abc')):
+            response = self.client.get('/api/ops-tiles/3/4/2.mvt', HTTP_IF_NONE_MATCH='"abc"')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['Access-Control-Allow-Origin'], '*')
+
+    @override_settings(ALLOWED_HOSTS=['testserver'])
+    def test_disallowed_host_answers_400(self):
+        response = self.client.get('/api/styles/osm-bright-local.json', HTTP_HOST='evil.example')
+        self.assertEqual(response.status_code, 400)
+
+
+def encode_glyph_pbf(glyphs):
+    """A one-fontstack glyph PBF; glyphs maps glyph id -> bitmap bytes"""
+
+    def field(buf, number, data):
+        write_varint(buf, (number << 3) | 2)
+        write_varint(buf, len(data))
+        buf += data
+
+    stack = bytearray()
+    field(stack, 1, b'Test Regular')
+    field(stack, 2, b'0-255')
+    for glyph_id, bitmap in glyphs.items():
+        glyph = bytearray()
+        write_varint(glyph, 1 << 3)
+        write_varint(glyph, glyph_id)
+        field(glyph, 2, bitmap)
+        field(stack, 3, glyph)
+    out = bytearray()
+    field(out, 1, stack)
+    return bytes(out)
+
+
+class GlyphCompositeTests(SimpleTestCase):
+    """composite_glyphs merges the fonts of a stack, skipping unreadable ones"""
+
+    # What a font file checked out without git-lfs contains
+    lfs_pointer = b'version https://git-lfs.github.com/spec/v1\noid sha256:0\nsize 1\n'
+
+    def test_corrupt_font_is_skipped(self):
+        good = encode_glyph_pbf({65: b'a'})
+        with self.assertLogs('api.services.glyph_store', 'WARNING'):
+            merged = composite_glyphs([self.lfs_pointer, good], 'Broken, Test Regular', '0-255')
+        self.assertEqual(set(parse_glyphs(merged)), {65})
+
+    def test_first_font_wins(self):
+        first = encode_glyph_pbf({65: b'first', 66: b'b'})
+        second = encode_glyph_pbf({65: b'second', 67: b'c'})
+        glyphs = parse_glyphs(composite_glyphs([first, second], 'First, Second', '0-255'))
+        self.assertEqual(sorted(glyphs), [65, 66, 67])
+        self.assertEqual(glyphs[65], parse_glyphs(first)[65])
+        self.assertEqual(glyphs[67], parse_glyphs(second)[67])
+
+    def test_all_corrupt_returns_first_font(self):
+        with self.assertLogs('api.services.glyph_store', 'WARNING'):
+            merged = composite_glyphs([self.lfs_pointer, b'\xff'], 'Broken, Broken', '0-255')
+        self.assertEqual(merged, self.lfs_pointer)
+
+
+class PMTilesTests(SimpleTestCase):
+    """Tile ids and the MBTiles -> PMTiles conversion round trip"""
+
+    def test_known_tile_id(self):
+        self.assertEqual(zxy_to_tileid(0, 0, 0), 0)
+        self.assertEqual(zxy_to_tileid(1, 0, 0), 1)
+        self.assertEqual(zxy_to_tileid(12, 3423, 1763), 19078479)
+
+    def test_convert_round_trip(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        mbtiles = os.path.join(directory.name, 'test.mbtiles')
+        pmtiles = os.path.join(directory.name, 'test.pmtiles')
+        # XYZ coordinates; 1/0/0 and 1/0/1 are consecutive in tile id order
+        # and identical, so they share one run-length encoded entry
+        tiles = {(0, 0, 0): b'world', (1, 0, 0): b'same', (1, 0, 1): b'same', (1, 1, 1): b'east'}
+        with sqlite3.connect(mbtiles) as conn:
+            conn.execute('CREATE TABLE metadata (name TEXT, value TEXT)')
+            conn.execute('CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB)')
+            conn.executemany('INSERT INTO metadata VALUES (?, ?)', [('minzoom', '0'), ('maxzoom', '1'), ('name', 'test')])
+            conn.executemany(
+                'INSERT INTO tiles VALUES (?, ?, ?, ?)',
+                [(z, x, 2 ** z - 1 - y, data) for (z, x, y), data in tiles.items()]
+            )
+        conn.close()
+
+        call_command('convert_to_pmtiles', mbtiles=mbtiles, output=pmtiles, stdout=io.StringIO())
+
+        service = PMTilesService(pmtiles)
+        self.addCleanup(service.close)
+        for (z, x, y), data in tiles.items():
+            with self.subTest(tile=(z, x, y)):
+                self.assertEqual(bytes(service.get_tile(z, x, y)), data)
+        self.assertIsNone(service.get_tile(1, 1, 0))
+        self.assertEqual(service.get_zoom_range(), (0, 1))
+
+
+class TileCacheTests(SimpleTestCase):
+    """TileCache evicts least recently used tiles but never pinned zooms"""
+
+    def test_lru_eviction_keeps_pinned_tiles(self):
+        cache = TileCache(max_bytes=30, pin_max_zoom=2)
+        cache.put((1, 0, 0), b'p' * 10, 'pinned')
+        cache.put((5, 0, 0), b'a' * 10, 'a')
+        cache.put((5, 1, 0), b'b' * 10, 'b')
+        self.assertIsNotNone(cache.get((5, 0, 0)))  # b is now least recently used
+        cache.put((5, 2, 0), b'c' * 10, 'c')
+
+        self.assertIsNone(cache.get((5, 1, 0)))
+        self.assertEqual(cache.get((5, 0, 0)), (b'a' * 10, 'a'))
+        self.assertEqual(cache.get((5, 2, 0)), (b'c' * 10, 'c'))
+        self.assertEqual(cache.get((1, 0, 0)), (b'p' * 10, 'pinned'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+        # Filling the budget with unpinned tiles still never drops the pinned one
+        for x in range(10):
+            cache.put((6, x, 0), b'd' * 10)
+        self.assertEqual(cache.get((1, 0, 0)), (b'p' * 10, 'pinned'))
+        self.assertLessEqual(cache.current_bytes, 30)
+
+
+class TileBatchTests(SimpleTestCase):
+    """/api/tiles/batch/ frames every found tile as header + blob"""
+
+    def test_frames(self):
+        found = {(3, 4, 2): (b'first', 'a'), (3, 5, 2): (b'second!', 'b')}
+        with mock.patch('api.views.tile_views.tile_source.get_tiles', return_value=found):
+            response = self.client.get('/api/tiles/batch/?tiles=3/4/2,3/6/2,3/5/2,3/4/2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Tile-Count'], '2')
+
+        body = response.content
+        frames = []
+        pos = 0
+        while pos < len(body):
+            z, x, y, length = TILE_FRAME_HEADER.unpack_from(body, pos)
+            pos += TILE_FRAME_HEADER.size
+            frames.append(((z, x, y), body[pos:pos + length]))
+            pos += length
+        self.assertEqual(pos, len(body))
+        self.assertEqual(frames, [((3, 4, 2), b'first'), ((3, 5, 2), b'second!')])
+
+
+class WaypointNearestTests(TestCase):
+    """/api/waypoints/nearest/ runs its KNN and dwithin queries on PostGIS"""
+
+    origin = (13.4050, 52.5200)
+
+    @classmethod
+    def setUpTestData(cls):
+        lon, lat = cls.origin
+
+        def waypoint(name, dlon, **fields):
+            return Waypoint.objects.create(name=name, location=Point(lon + dlon, lat, srid=4326), **fields)
+
+        cls.near = waypoint('near', 0.001, type='hospital')
+        cls.mid = waypoint('mid', 0.01, type='firestation')
+        cls.far = waypoint('far', 0.1, type='hospital')
+        cls.closed = waypoint('closed', 0.0005, type='hospital', is_available=False)
+        cls.incident = Incident.objects.create(name='origin', location=Point(lon, lat, srid=4326))
+
+    def get_nearest(self, query):
+        response = self.client.get(f'/api/waypoints/nearest/?{query}')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_point_orders_by_geodesic_distance(self):
+        data = self.get_nearest(f'point={self.origin[0]},{self.origin[1]}&k=2&distance=true')
+        self.assertEqual([item['id'] for item in data], [self.near.id, self.mid.id])
+        # 0.001 degrees of longitude at 52.52N
+        self.assertAlmostEqual(data[0]['distance'], 67.8, delta=1.0)
+        self.assertLess(data[0]['distance'], data[1]['distance'])
+
+    def test_incident_origin_with_type_filter(self):
+        data = self.get_nearest(f'incident={self.incident.id}&type=hospital&k=5')
+        self.assertEqual([item['id'] for item in data], [self.near.id, self.far.id])
+
+    def test_available_any_includes_unavailable(self):
+        data = self.get_nearest(f'point={self.origin[0]},{self.origin[1]}&k=1&available=any')
+        self.assertEqual([item['id'] for item in data], [self.closed.id])
+
+
+class ChangeFeedCommitOrderTests(TransactionTestCase):
+    """The ?since= cursor follows commit order, not the rows' updated_at"""
+
+    def poll(self, since):
+        response = self.client.get(f'/api/incidents/?since={since}')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_late_commit_with_old_timestamp_is_reported(self):
+        first = self.poll('0')
+        written = threading.Event()
+        release = threading.Event()
+
+        def writer():
+            try:
+                with transaction.atomic():
+                    incident = Incident.objects.create(name='late', location=Point(13.4, 52.5, srid=4326))
+                    # Stamped long before the cursors the client is handed
+                    Incident.objects.filter(pk=incident.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+                    written.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            self.assertTrue(written.wait(10))
+            during = self.poll(first['cursor'])
+        finally:
+            release.set()
+            thread.join()
+        after = self.poll(during['cursor'])
+
+        self.assertEqual(during['changes'], [])
+        self.assertEqual([change['name'] for change in after['changes']], ['late'])
+        self.assertEqual(self.poll(after['cursor'])['changes'], [])
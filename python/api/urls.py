@@ -1,26 +1,59 @@
 from django.urls import path, include
+from django.conf import settings
 from api.views.main_views import IncidentViewSet, WaypointViewSet, HazardZoneViewSet
-from .views import vector_tile, tile_stats, tile_metadata
+from .views import vector_tile, tile_batch, tile_export, tile_stats, tile_metadata
 from .views.font_views import serve_font, list_fonts
 from .views.style_views import serve_style, list_styles
+from .views.ops_tile_views import ops_vector_tile
+from .views.event_views import event_stream
+from .views.cluster_views import clusters
+
+if settings.ASYNC_MAP_VIEWS:
+    from .views.async_views import (
+        vector_tile_async as vector_tile,
+        tile_batch_async as tile_batch,
+        tile_export_async as tile_export,
+        serve_font_async as serve_font,
+        serve_style_async as serve_style,
+    )
 
 urlpatterns = [
     # Incident endpoints
     path('incidents/', IncidentViewSet.as_view({'get': 'list', 'post': 'create'}), name='incident-list'),
+    path('incidents/bulk/', IncidentViewSet.as_view({'post': 'bulk_upsert'}), name='incident-bulk'),
+    path('incidents/export.<str:export_format>', IncidentViewSet.as_view({'get': 'export'}), name='incident-export'),
     path('incidents/<int:pk>/', IncidentViewSet.as_view({'delete': 'destroy'}), name='incident-detail'),
+    path('incidents/<int:pk>/hazard-zones/', IncidentViewSet.as_view({'get': 'covering_zones'}), name='incident-hazard-zones'),
 
     # Waypoint endpoints
     path('waypoints/', WaypointViewSet.as_view({'get': 'list', 'post': 'create'}), name='waypoint-list'),
+    path('waypoints/nearest/', WaypointViewSet.as_view({'get': 'nearest'}), name='waypoint-nearest'),
+    path('waypoints/bulk/', WaypointViewSet.as_view({'post': 'bulk_upsert'}), name='waypoint-bulk'),
+    path('waypoints/export.<str:export_format>', WaypointViewSet.as_view({'get': 'export'}), name='waypoint-export'),
     path('waypoints/<int:pk>/', WaypointViewSet.as_view({'delete': 'destroy'}), name='waypoint-detail'),
 
     # Hazard Zone endpoints
     path('hazard-zones/', HazardZoneViewSet.as_view({'get': 'list', 'post': 'create'}), name='hazardzone-list'),
+    path('hazard-zones/export.<str:export_format>', HazardZoneViewSet.as_view({'get': 'export'}), name='hazardzone-export'),
+    path('hazard-zones/containment/', HazardZoneViewSet.as_view({'get': 'containment'}), name='hazardzone-containment'),
     path('hazard-zones/<int:pk>/', HazardZoneViewSet.as_view({'delete': 'destroy'}), name='hazardzone-detail'),
+    path('hazard-zones/<int:pk>/incidents/', HazardZoneViewSet.as_view({'get': 'contained_incidents'}), name='hazardzone-incidents'),
 
     # Vector tile endpoints
     path('tiles/<int:z>/<int:x>/<int:y>.mvt', vector_tile, name='vector_tile'),
+    path('tiles/batch/', tile_batch, name='tile_batch'),
+    path('tiles/export.mbtiles', tile_export, name='tile_export'),
     path('tiles/stats/', tile_stats, name='tile_stats'),
     path('tiles/metadata.json', tile_metadata, name='tile_metadata'),
+
+    # Operational data (incidents, waypoints, hazard zones) as vector tiles
+    path('ops-tiles/<int:z>/<int:x>/<int:y>.mvt', ops_vector_tile, name='ops_vector_tile'),
+
+    # Incident and waypoint clusters per zoom level
+    path('clusters/', clusters, name='clusters'),
+
+    # Server-Sent Events push of operational data changes (ASGI only)
+    path('events/', event_stream, name='event_stream'),
     
     # Font endpoints
     path('fonts/', list_fonts, name='list_fonts'),
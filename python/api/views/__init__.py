@@ -1,10 +1,10 @@
 # Views package
-from .tile_views import vector_tile, tile_stats, tile_metadata
-from .main_views import serve_frontend, check_vite_dev_server
+from .tile_views import vector_tile, tile_batch, tile_export, tile_stats, tile_metadata
+from .main_views import serve_frontend, serve_asset, check_vite_dev_server
 from .style_views import serve_style, list_styles
 
 __all__ = [
-    'vector_tile', 'tile_stats', 'tile_metadata',
-    'serve_frontend', 'check_vite_dev_server',
+    'vector_tile', 'tile_batch', 'tile_export', 'tile_stats', 'tile_metadata',
+    'serve_frontend', 'serve_asset', 'check_vite_dev_server',
     'serve_style', 'list_styles'
 ]
@@ -0,0 +1,101 @@
+from django.http import FileResponse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from api.services.glyph_store import glyph_store
+from api.services.io_pool import run_in_io_pool
+from .tile_views import tile_source, is_valid_tile, tile_response, vector_tile, tile_batch, tile_export
+from .font_views import serve_font, font_response
+from .style_views import serve_style
+
+# Async variants of the tile, font and style endpoints, routed instead of
+# the sync views when running under config.asgi. Blocking reads run on a
+# bounded thread pool rather than one thread per request.
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+async def vector_tile_async(request, z, x, y):
+    """
+    Serve vector tiles in Mapbox Vector Tile format
+    URL pattern: /tiles/{z}/{x}/{y}.mvt
+
+    Cached tiles are answered directly on the event loop; cache misses
+    run the sync view on the I/O pool.
+    """
+    entry = tile_source.get_cached_tile(z, x, y) if is_valid_tile(z, x, y) else None
+    if entry is not None:
+        tile_data, etag = entry
+        not_modified = get_conditional_response(request, etag=f'"{etag}"')
+        if not_modified is not None:
+            not_modified['ETag'] = f'"{etag}"'
+            return not_modified
+        return tile_response(tile_data, etag, tile_source.content_encoding)
+    return await run_in_io_pool(vector_tile)(request, z, x, y)
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+async def tile_batch_async(request):
+    """
+    Serve many vector tiles in one response
+    URL pattern: /tiles/batch/
+    """
+    return await run_in_io_pool(tile_batch)(request)
+
+
+async def _aiter_file(export_file, block_size=FileResponse.block_size):
+    read = run_in_io_pool(export_file.read)
+    while True:
+        chunk = await read(block_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+async def tile_export_async(request):
+    """
+    Download an offline MBTiles extract
+    URL pattern: /tiles/export.mbtiles
+
+    The extract is sent in fixed-size blocks read on the I/O pool; Django
+    would read a sync file object into memory whole before sending it.
+    """
+    response = await run_in_io_pool(tile_export)(request)
+    if isinstance(response, FileResponse) and response.file_to_stream is not None:
+        # The response still closes the file when it is done
+        response.streaming_content = _aiter_file(response.file_to_stream)
+    return response
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+async def serve_font_async(request, fontstack, range_param):
+    """
+    Serve font glyphs in PBF format
+    URL pattern: /fonts/{fontstack}/{range}.pbf
+
+    Glyphs already in the GlyphStore are answered on the event loop;
+    first requests for a stack/range run the sync view on the I/O pool.
+    """
+    entry = glyph_store.get_cached(fontstack, range_param)
+    if entry is not None:
+        font_data, etag = entry
+        not_modified = get_conditional_response(request, etag=f'"{etag}"')
+        if not_modified is not None:
+            not_modified['ETag'] = f'"{etag}"'
+            return not_modified
+        return font_response(font_data, etag)
+    return await run_in_io_pool(serve_font)(request, fontstack, range_param)
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+async def serve_style_async(request, style_name):
+    """
+    Serve map style JSON files
+    URL pattern: /styles/{style_name}.json
+    """
+    return await run_in_io_pool(serve_style)(request, style_name)
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from api.services.clusters import CLUSTER_MODELS, cluster_points
+from api.services.tile_math import parse_bbox
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def clusters(request):
+    """
+    Cluster incidents and waypoints for the map at one zoom level
+    URL pattern: /clusters/?bbox=minlon,minlat,maxlon,maxlat&zoom=11&models=incident,waypoint
+
+    Points are grouped in PostGIS into square grid cells of CLUSTER_CELL_PX
+    screen pixels at that zoom. Each cluster carries its centroid, count and
+    a breakdown by severity (incidents) or type (waypoints); a cluster of a
+    single point also carries its id.
+    """
+    try:
+        bbox = parse_bbox(request.GET['bbox'])
+        zoom = int(request.GET['zoom'])
+    except (KeyError, ValueError):
+        return HttpResponse("Expected bbox=minlon,minlat,maxlon,maxlat and an integer zoom", status=400)
+    if not 0 <= zoom <= 22:
+        return HttpResponse("Invalid zoom level", status=400)
+    models = request.GET.get('models', ','.join(CLUSTER_MODELS)).split(',')
+    if not set(models) <= set(CLUSTER_MODELS):
+        return HttpResponse(f"Unknown models, expected any of {sorted(CLUSTER_MODELS)}", status=400)
+
+    try:
+        result = []
+        for model_name in models:
+            result.extend(cluster_points(model_name, bbox, zoom, settings.CLUSTER_CELL_PX))
+    except Exception as e:
+        logger.error(f"Error clustering {models} for bbox {bbox} at zoom {zoom}: {str(e)}")
+        return HttpResponse("Internal server error", status=500)
+
+    response = JsonResponse({'zoom': zoom, 'clusters': result})
+    response['Access-Control-Allow-Origin'] = '*'
+    return response
@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from api.services.event_broker import broker, EventBroker
+from api.services.tile_math import parse_bbox
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Models a client may subscribe to with ?models=
+EVENT_MODELS = {'incident', 'waypoint', 'hazard_zone'}
+
+
+async def _event_stream(bbox, models):
+    # Subscribing inside the generator ties the subscription to the
+    # iteration, so the finally below always releases it
+    subscription = broker.subscribe(bbox=bbox, models=models, max_queue=settings.EVENT_STREAM_MAX_QUEUE)
+    logger.debug(f"Event stream subscriber connected ({broker.subscriber_count()} total)")
+    try:
+        # Reconnect delay for EventSource clients, then an initial comment so
+        # proxies flush the headers straight away
+        yield b'retry: 3000\n: connected\n\n'
+        while True:
+            try:
+                payload = await asyncio.wait_for(
+                    subscription.queue.get(), timeout=settings.EVENT_STREAM_KEEPALIVE_SECONDS
+                )
+            except asyncio.TimeoutError:
+                yield b': keepalive\n\n'
+                continue
+            yield payload
+            if payload is EventBroker.RESYNC:
+                # The client fell behind; it reloads and reconnects
+                break
+    finally:
+        broker.unsubscribe(subscription)
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+async def event_stream(request):
+    """
+    Push incident, waypoint and hazard zone changes as Server-Sent Events
+    URL pattern: /events/?bbox=minlon,minlat,maxlon,maxlat&models=incident,waypoint
+
+    Events are `created`, `updated` and `deleted` with a JSON body
+    {"type", "model", "data", "ts"}; with bbox only changes touching the
+    viewport are sent (moves in or out included). A `resync` event means
+    the client fell behind and should reload via the ?since= change feed.
+    Only available under the ASGI entry point (config.asgi).
+    """
+    if not settings.ASYNC_MAP_VIEWS:
+        return HttpResponse("The event stream requires the ASGI server (config.asgi)", status=501)
+
+    bbox = None
+    if request.GET.get('bbox'):
+        try:
+            bbox = parse_bbox(request.GET['bbox'])
+        except ValueError as e:
+            return HttpResponse(f"Invalid bbox: {str(e)}", status=400)
+
+    models = None
+    if request.GET.get('models'):
+        models = {name.strip() for name in request.GET['models'].split(',')}
+        if not models <= EVENT_MODELS:
+            return HttpResponse(f"Unknown models, expected any of {sorted(EVENT_MODELS)}", status=400)
+
+    response = StreamingHttpResponse(_event_stream(bbox, models), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Disable nginx response buffering
+    response['Access-Control-Allow-Origin'] = '*'
+    return response
@@ -1,47 +1,76 @@
 import os
 import glob
-import requests
-from django.http import JsonResponse, HttpResponseRedirect
-from django.shortcuts import render
+from django.http import JsonResponse, HttpResponse, HttpResponseRedirect, FileResponse, Http404
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.views.decorators.http import require_http_methods
 from django.conf import settings
 from django.templatetags.static import static
 from api.models import Incident, Waypoint, Hazard_Zone
-from api.serializers import IncidentSerializer, WaypointSerializer, HazardZoneSerializer
+from api.serializers import (
+    IncidentSerializer, WaypointSerializer, HazardZoneSerializer,
+    IncidentFeatureSerializer, WaypointFeatureSerializer,
+)
+from api.bulk import BulkUpsertMixin
+from api.change_feed import ChangeFeedMixin
+from api.containment import ZoneContainmentMixin, IncidentZonesMixin
+from api.export import ExportMixin
+from api.filters import SpatialFilterBackend
+from api.geojson import GeoJSONListMixin
+from api.nearest import NearestMixin
+from api.pagination import KeysetPagination
+from api.services.asset_manifest import asset_manifest
+from api.services.dev_server import dev_server
+from api.services.encodings import choose_encoding, encoded_etag
+from api.simplified import SimplifiedGeometryMixin
 from rest_framework import viewsets
 
-class IncidentViewSet(viewsets.ModelViewSet):
+# List endpoints accept ?bbox= / ?near=&radius= (see api/filters.py),
+# ?cursor= / ?page_size= keyset pagination (see api/pagination.py) and
+# ?since= for the incremental change feed (see api/change_feed.py).
+# ?format=geojson returns a FeatureCollection built in PostGIS (see api/geojson.py).
+# /export.geojson|ndjson|csv streams the whole table (see api/export.py).
+# Incidents and waypoints also take bulk GeoJSON imports (see api/bulk.py);
+# waypoints answer k-nearest queries (see api/nearest.py) and hazard zones
+# list the incidents inside them (see api/containment.py). ?zoom= / ?tolerance=
+# serve simplified hazard zone polygons (see api/simplified.py)
+
+class IncidentViewSet(IncidentZonesMixin, BulkUpsertMixin, ChangeFeedMixin, ExportMixin, GeoJSONListMixin, viewsets.ModelViewSet):
     queryset = Incident.objects.all()
     serializer_class = IncidentSerializer
+    bulk_serializer_class = IncidentFeatureSerializer
+    filter_backends = [SpatialFilterBackend]
+    pagination_class = KeysetPagination
     
-class WaypointViewSet(viewsets.ModelViewSet):
+class WaypointViewSet(NearestMixin, BulkUpsertMixin, ChangeFeedMixin, ExportMixin, GeoJSONListMixin, viewsets.ModelViewSet):
     queryset = Waypoint.objects.all()
     serializer_class = WaypointSerializer
+    bulk_serializer_class = WaypointFeatureSerializer
+    filter_backends = [SpatialFilterBackend]
+    pagination_class = KeysetPagination
 
-class HazardZoneViewSet(viewsets.ModelViewSet):
+class HazardZoneViewSet(
+    SimplifiedGeometryMixin, ZoneContainmentMixin, ChangeFeedMixin, ExportMixin, GeoJSONListMixin,
+    viewsets.ModelViewSet
+):
     queryset = Hazard_Zone.objects.all()
     serializer_class = HazardZoneSerializer
+    filter_backends = [SpatialFilterBackend]
+    pagination_class = KeysetPagination
 
 
 def check_vite_dev_server():
-    """Check if Vite dev server is running on port 5173"""
-    try:
-        response = requests.get('http://localhost:5173', timeout=1)
-        return response.status_code == 200
-    except:
-        return False
+    """Whether the Vite dev server was up at its last background probe"""
+    return dev_server.is_running()
 
 
 def serve_frontend(request):
     """Serve frontend from Vite dev server (HMR) or built files"""
-    # Check if Vite dev server is running
-    if check_vite_dev_server():
+    if settings.FRONTEND_MODE == 'dev' and check_vite_dev_server():
         # Redirect to Vite dev server for HMR
-        return HttpResponseRedirect('http://localhost:5173')
-    
-    # Serve built files
-    dist_path = os.path.join(settings.BASE_DIR.parent, 'js', 'dist')
-    
-    if not os.path.exists(dist_path):
+        return HttpResponseRedirect(settings.VITE_DEV_SERVER_URL)
+
+    # Serve the built app shell from memory
+    if not asset_manifest.built:
         return JsonResponse({
             'error': 'Frontend not built and dev server not running',
             'message': 'Please run "pnpm run build" in the js directory or start the dev server with "pnpm run dev"',
@@ -50,32 +79,55 @@ def serve_frontend(request):
                 'build_mode': 'cd js && pnpm run build'
             }
         }, status=503)
-    
-    # Find CSS and JS files in dist directory
-    css_files = []
-    js_files = []
-    
-    # Look for assets in the dist directory
-    assets_path = os.path.join(dist_path, 'assets')
-    if os.path.exists(assets_path):
-        # Find all CSS and JS files
-        for filename in os.listdir(assets_path):
-            if filename.endswith('.css'):
-                css_files.append(f'assets/{filename}')
-            elif filename.endswith('.js'):
-                js_files.append(f'assets/{filename}')
-    
-    # Also check for files directly in dist (in case Vite config is different)
-    for filename in os.listdir(dist_path):
-        if filename.endswith('.css') and f'{filename}' not in css_files:
-            css_files.append(filename)
-        elif filename.endswith('.js') and f'{filename}' not in js_files:
-            js_files.append(filename)
-    
-    context = {
-        'vite_dev_server': False,
-        'css_files': css_files,
-        'js_files': js_files,
-    }
-    
-    return render(request, 'index.html', context)
+
+    shell = asset_manifest.shell()
+    encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), shell.bodies)
+    etag = encoded_etag(shell.etag, encoding)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(shell.bodies[encoding], content_type='text/html; charset=utf-8')
+        if encoding != 'identity':
+            response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+@require_http_methods(["GET", "HEAD"])
+def serve_asset(request, path):
+    """
+    Serve a built frontend file (SERVE_FRONTEND_ASSETS)
+    URL pattern: /static/{path}
+
+    Files are looked up in the in-memory manifest; a precompressed copy is
+    sent when the client accepts its encoding. FileResponse hands the open
+    file to the server's wsgi.file_wrapper, which uses sendfile where the
+    server supports it.
+    """
+    asset = asset_manifest.get(path)
+    if asset is None:
+        raise Http404("Asset not found")
+
+    encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), asset.variants)
+    etag = encoded_etag(asset.etag, encoding)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        file_path = asset.variants.get(encoding) or os.path.join(asset_manifest.dist_dir, asset.path)
+        try:
+            asset_file = open(file_path, 'rb')
+        except FileNotFoundError:
+            # Removed by a rebuild since the manifest was scanned
+            raise Http404("Asset not found")
+        response = FileResponse(asset_file, content_type=asset.content_type)
+        if encoding != 'identity':
+            response['Content-Encoding'] = encoding
+
+    response['ETag'] = etag
+    if asset.immutable:
+        # The name changes with the content
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        response['Cache-Control'] = 'no-cache'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods, condition
+from api.services.ops_tiles import get_ops_tile
+from .tile_views import tile_response
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _ops_tile_etag(request, z, x, y):
+    # Invalid coordinates and render errors are left to the view to answer
+    if z < 0 or z > settings.OPS_TILE_MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        return None
+    try:
+        return get_ops_tile(z, x, y)[1]
+    except Exception:
+        return None
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+@condition(etag_func=_ops_tile_etag)
+def ops_vector_tile(request, z, x, y):
+    """
+    Serve incidents, waypoints and hazard zones as a Mapbox Vector Tile
+    URL pattern: /ops-tiles/{z}/{x}/{y}.mvt
+
+    Layers: incidents (name, severity), waypoints (name, type,
+    is_available) and hazard_zones (name, severity). Tiles are built by
+    PostGIS with ST_AsMVT and cached for OPS_TILE_CACHE_TTL seconds; saving
+    or deleting a record drops the cached tiles that contain it. A
+    matching If-None-Match is answered 304 from the cached ETag.
+    """
+    if z < 0 or z > settings.OPS_TILE_MAX_ZOOM:
+        return HttpResponse("Invalid zoom level", status=400)
+    max_coord = 2 ** z - 1
+    if x < 0 or x > max_coord or y < 0 or y > max_coord:
+        return HttpResponse("Invalid tile coordinates", status=400)
+
+    try:
+        tile_data, etag = get_ops_tile(z, x, y)
+    except Exception as e:
+        logger.error(f"Error generating ops tile {z}/{x}/{y}: {str(e)}")
+        return HttpResponse("Internal server error", status=500)
+
+    if not tile_data:
+        # No features: an empty tile, which map clients render as nothing
+        return HttpResponse(status=204)
+
+    response = tile_response(tile_data, etag)
+    response['Cache-Control'] = f'public, max-age={settings.OPS_TILE_CACHE_TTL}'
+    return response
@@ -1,25 +1,66 @@
-from django.http import HttpResponse, JsonResponse
-from django.views.decorators.cache import cache_page
+from django.http import HttpResponse, JsonResponse, FileResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
-from api.services.mbtiles_service import MBTilesService
+from django.views.decorators.http import require_http_methods, condition
+from django.conf import settings
+from api.services.tile_source import open_tile_source
+from api.services.mbtiles_export import export_mbtiles, count_export_tiles
+from api.services.tile_math import parse_bbox
+from api.services.tile_cache import TileCache
 import logging
 import os
+import struct
+import tempfile
 
 logger = logging.getLogger(__name__)
 
-# Initialize MBTiles service
-MBTILES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'berlin.mbtiles')
-mbtiles_service = MBTilesService(MBTILES_PATH)
+# Frame header of the batch response: z, x, y, blob length
+TILE_FRAME_HEADER = struct.Struct('>BIII')
+
+# Initialize the tile source (MBTiles or PMTiles, see TILE_SOURCE_PATH)
+tile_source = open_tile_source(
+    settings.TILE_SOURCE_PATH,
+    cache=TileCache(settings.TILE_CACHE_MAX_BYTES, pin_max_zoom=settings.TILE_CACHE_PIN_MAX_ZOOM)
+)
+
+
+def is_valid_tile(z, x, y):
+    """Check the zoom level and tile coordinate bounds"""
+    return 0 <= z <= 18 and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def tile_response(tile_data, etag, content_encoding='gzip'):
+    """Build the HTTP response for a tile blob"""
+    response = HttpResponse(
+        tile_data,
+        content_type='application/x-protobuf'
+    )
+    response['ETag'] = f'"{etag}"'
+
+    # Set headers for vector tiles
+    # Stored tiles are usually gzipped, so we need to set the Content-Encoding header
+    if content_encoding:
+        response['Content-Encoding'] = content_encoding
+    response['Cache-Control'] = 'public, max-age=900'  # 15 minutes
+    return response
+
+
+def _tile_etag(request, z, x, y):
+    # Out of range coordinates get no ETag and are rejected by the view
+    if is_valid_tile(z, x, y):
+        return tile_source.get_tile_etag(z, x, y)
+    return None
 
 
 @csrf_exempt
 @require_http_methods(["GET"])
-@cache_page(60 * 15)  # Cache tiles for 15 minutes
+@condition(etag_func=_tile_etag)
 def vector_tile(request, z, x, y):
     """
     Serve vector tiles in Mapbox Vector Tile format
     URL pattern: /tiles/{z}/{x}/{y}.mvt
+
+    Revalidation with If-None-Match is answered with a 304 before the
+    tile blob is read.
     """
     try:
         # Validate tile coordinates
@@ -35,23 +76,12 @@ def vector_tile(request, z, x, y):
             return HttpResponse("Invalid tile coordinates", status=400)
         
         # Generate the vector tile
-        tile_data = mbtiles_service.get_tile(z, x, y)
+        tile_data, etag = tile_source.get_tile_with_etag(z, x, y)
         
         if tile_data is None:
             return HttpResponse("Tile not found", status=404)
         
-        response = HttpResponse(
-            tile_data,
-            content_type='application/x-protobuf'
-        )
-        
-        # Set headers for vector tiles
-        # MBTiles tiles are gzipped, so we need to set the Content-Encoding header
-        response['Content-Encoding'] = 'gzip'
-        response['Access-Control-Allow-Origin'] = '*'
-        response['Access-Control-Allow-Methods'] = 'GET, OPTIONS'
-        response['Access-Control-Allow-Headers'] = 'Content-Type'
-        response['Cache-Control'] = 'public, max-age=900'  # 15 minutes
+        response = tile_response(tile_data, etag, tile_source.content_encoding)
         
         return response
         
@@ -62,6 +92,124 @@ def vector_tile(request, z, x, y):
         return HttpResponse("Internal server error", status=500)
 
 
+def _parse_batch_coords(params):
+    """
+    Read the requested tiles from the query string: either an explicit list
+    (tiles=z/x/y,z/x/y,...) or a range (z, min_x, max_x, min_y, max_y).
+    Raises ValueError on malformed or out of range input.
+    """
+    if params.get('tiles'):
+        coords = []
+        for item in params['tiles'].split(','):
+            z, x, y = (int(part) for part in item.split('/'))
+            coords.append((z, x, y))
+        # A repeated tile is sent once
+        coords = list(dict.fromkeys(coords))
+    else:
+        z = int(params['z'])
+        min_x, max_x = int(params['min_x']), int(params['max_x'])
+        min_y, max_y = int(params['min_y']), int(params['max_y'])
+        if min_x > max_x or min_y > max_y:
+            raise ValueError("Empty tile range")
+        if (max_x - min_x + 1) * (max_y - min_y + 1) > settings.TILE_BATCH_MAX_TILES:
+            raise ValueError("Too many tiles requested")
+        coords = [(z, x, y) for x in range(min_x, max_x + 1) for y in range(min_y, max_y + 1)]
+
+    if len(coords) > settings.TILE_BATCH_MAX_TILES:
+        raise ValueError("Too many tiles requested")
+    for z, x, y in coords:
+        if not is_valid_tile(z, x, y):
+            raise ValueError("Invalid tile coordinates")
+    return coords
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def tile_batch(request):
+    """
+    Serve many vector tiles in one response
+    URL pattern: /tiles/batch/?tiles=z/x/y,z/x/y,...
+             or  /tiles/batch/?z=..&min_x=..&max_x=..&min_y=..&max_y=..
+
+    The body is a sequence of frames, one per tile found, each a 13 byte
+    big-endian header (uint8 z, uint32 x, uint32 y, uint32 length) followed
+    by the gzipped tile blob. Tiles that do not exist are omitted.
+    """
+    try:
+        coords = _parse_batch_coords(request.GET)
+    except (KeyError, ValueError) as e:
+        return HttpResponse(f"Invalid tile batch: {str(e)}", status=400)
+
+    try:
+        tiles = tile_source.get_tiles(coords)
+
+        frames = []
+        count = 0
+        for z, x, y in coords:
+            entry = tiles.get((z, x, y))
+            if entry is not None:
+                frames.append(TILE_FRAME_HEADER.pack(z, x, y, len(entry[0])))
+                frames.append(entry[0])
+                count += 1
+
+        response = HttpResponse(b''.join(frames), content_type='application/octet-stream')
+        response['X-Tile-Count'] = str(count)
+        response['Access-Control-Expose-Headers'] = 'X-Tile-Count'
+        response['Cache-Control'] = 'public, max-age=900'  # 15 minutes
+        return response
+
+    except Exception as e:
+        logger.error(f"Error serving tile batch: {str(e)}")
+        return HttpResponse("Internal server error", status=500)
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def tile_export(request):
+    """
+    Download an offline MBTiles extract
+    URL pattern: /tiles/export.mbtiles?bbox=minlon,minlat,maxlon,maxlat&minzoom=..&maxzoom=..
+
+    SQLite cannot be written and streamed at the same time, so the extract
+    is built in a temporary file and then streamed from disk; neither step
+    holds the tiles in memory.
+    """
+    try:
+        bbox = parse_bbox(request.GET['bbox'])
+        default_minzoom, default_maxzoom = tile_source.get_zoom_range()
+        minzoom = int(request.GET.get('minzoom', default_minzoom))
+        maxzoom = int(request.GET.get('maxzoom', default_maxzoom))
+    except (KeyError, ValueError):
+        return HttpResponse("Expected bbox=minlon,minlat,maxlon,maxlat and integer minzoom/maxzoom", status=400)
+    if not 0 <= minzoom <= maxzoom <= 18:
+        return HttpResponse("Invalid zoom range", status=400)
+    if count_export_tiles(bbox, minzoom, maxzoom) > settings.TILE_EXPORT_MAX_TILES:
+        return HttpResponse("Export area too large", status=400)
+
+    fd, export_path = tempfile.mkstemp(suffix='.mbtiles')
+    os.close(fd)
+    try:
+        result = export_mbtiles(tile_source, export_path, bbox, minzoom, maxzoom)
+        logger.info(f"Exported {result['tiles']} tiles ({result['images']} distinct) for bbox {bbox}")
+
+        export_file = open(export_path, 'rb')
+        # The open handle keeps the data readable until the response is closed
+        os.remove(export_path)
+        response = FileResponse(
+            export_file,
+            as_attachment=True,
+            filename=f"tiles-z{minzoom}-{maxzoom}.mbtiles",
+            content_type='application/vnd.sqlite3'
+        )
+        return response
+
+    except Exception as e:
+        logger.error(f"Error exporting tiles for bbox {bbox}: {str(e)}")
+        if os.path.exists(export_path):
+            os.remove(export_path)
+        return HttpResponse("Internal server error", status=500)
+
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def tile_stats(request):
@@ -70,15 +218,16 @@ def tile_stats(request):
     URL pattern: /tiles/stats
     """
     try:
-        metadata = mbtiles_service.get_metadata()
-        bounds = mbtiles_service.get_bounds()
-        minzoom, maxzoom = mbtiles_service.get_zoom_range()
+        metadata = tile_source.get_metadata()
+        bounds = tile_source.get_bounds()
+        minzoom, maxzoom = tile_source.get_zoom_range()
         
         stats = {
             "metadata": metadata,
             "bounds": bounds,
             "minzoom": minzoom,
-            "maxzoom": maxzoom
+            "maxzoom": maxzoom,
+            "cache": tile_source.cache.stats()
         }
         return JsonResponse(stats)
     except Exception as e:
@@ -86,103 +235,31 @@ def tile_stats(request):
         return JsonResponse({"error": "Internal server error"}, status=500)
 
 
+def _tilejson_tiles_url(request):
+    return f"{request.build_absolute_uri('/api/tiles/')}" + "{z}/{x}/{y}.mvt"
+
+
+def _tilejson_etag(request):
+    return tile_source.get_tilejson(_tilejson_tiles_url(request))[1]
+
+
 @csrf_exempt
 @require_http_methods(["GET"])
+@condition(etag_func=_tilejson_etag)
 def tile_metadata(request):
     """
     Get TileJSON metadata for the vector tile service
     URL pattern: /tiles/metadata.json
+
+    The document is built and serialized once per MBTiles file version;
+    clients revalidating with If-None-Match get a 304.
     """
     try:
-        metadata = mbtiles_service.get_metadata()
-        bounds = mbtiles_service.get_bounds()
-        center = mbtiles_service.get_center()
-        minzoom, maxzoom = mbtiles_service.get_zoom_range()
-        
-        # Default to Berlin bounds if no bounds available
-        if not bounds:
-            bounds = [13.0882, 52.3382, 13.7606, 52.6755]  # Berlin bounds
-        
-        if not center:
-            center = [
-                (bounds[0] + bounds[2]) / 2,  # Center longitude
-                (bounds[1] + bounds[3]) / 2,  # Center latitude
-                10  # Default zoom
-            ]
-        
-        tilejson = {
-            "tilejson": "3.0.0",
-            "name": metadata.get("name", "Local OSM Vector Tiles"),
-            "description": metadata.get("description", "Vector tiles generated from local OpenStreetMap data"),
-            "version": metadata.get("version", "1.0.0"),
-            "attribution": "© OpenStreetMap contributors",
-            "scheme": "xyz",
-            "tiles": [
-                f"{request.build_absolute_uri('/api/tiles/')}" + "{z}/{x}/{y}.mvt"
-            ],
-            "minzoom": minzoom,
-            "maxzoom": maxzoom,
-            "bounds": bounds,
-            "center": center,
-            "vector_layers": [
-                {
-                    "id": "transportation",
-                    "description": "Road network",
-                    "minzoom": 4,
-                    "maxzoom": 14,
-                    "fields": {
-                        "class": "Road type",
-                        "name": "Road name",
-                        "ref": "Road reference",
-                        "oneway": "One-way indicator",
-                        "brunnel": "Bridge/tunnel indicator"
-                    }
-                },
-                {
-                    "id": "building",
-                    "description": "Building footprints",
-                    "minzoom": 13,
-                    "maxzoom": 14,
-                    "fields": {
-                        "class": "Building type",
-                        "name": "Building name",
-                        "height": "Building height"
-                    }
-                },
-                {
-                    "id": "water",
-                    "description": "Water features",
-                    "minzoom": 0,
-                    "maxzoom": 14,
-                    "fields": {
-                        "class": "Water type",
-                        "name": "Water feature name"
-                    }
-                },
-                {
-                    "id": "landuse",
-                    "description": "Land use areas",
-                    "minzoom": 4,
-                    "maxzoom": 14,
-                    "fields": {
-                        "class": "Land use type",
-                        "name": "Area name"
-                    }
-                },
-                {
-                    "id": "poi",
-                    "description": "Points of interest",
-                    "minzoom": 12,
-                    "maxzoom": 14,
-                    "fields": {
-                        "class": "POI type",
-                        "name": "POI name"
-                    }
-                }
-            ]
-        }
-        
-        return JsonResponse(tilejson)
+        body, etag = tile_source.get_tilejson(_tilejson_tiles_url(request))
+        response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'public, no-cache'  # Always revalidate
+        return response
         
     except Exception as e:
         logger.error(f"Error getting tile metadata: {str(e)}")
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Route tile, font and style requests to the async views (see ASYNC_MAP_VIEWS)
+os.environ.setdefault('ADH_ASYNC_MAP_VIEWS', '1')
 
 application = get_asgi_application()
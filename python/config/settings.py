@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -44,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Tiles, ops tiles, glyphs and styles skip the rest of the stack (see api/middleware.py)
+    'api.middleware.MapFastPathMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -58,6 +61,10 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",
 ]
 
+# Anonymous, stateless endpoints dispatched by MapFastPathMiddleware without
+# sessions, CSRF or authentication, with `Access-Control-Allow-Origin: *`
+MAP_FAST_PATH_PREFIXES = ('/api/tiles/', '/api/ops-tiles/', '/api/fonts/', '/api/styles/')
+
 ROOT_URLCONF = 'config.urls'
 
 
@@ -132,10 +139,94 @@ STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR.parent / 'static'
 
 # Frontend build files
+FRONTEND_DIST_DIR = BASE_DIR.parent / 'js' / 'dist'
 STATICFILES_DIRS = [
-    BASE_DIR.parent / 'js' / 'dist',
+    FRONTEND_DIST_DIR,
 ]
 
+# Serve /static/ from an in-memory manifest of FRONTEND_DIST_DIR: hashed
+# bundles are cached as immutable and precompressed .br/.gz copies (see
+# `manage.py compress_assets`) are sent when the client accepts them.
+# Defaults to on without DEBUG, where Django's static() handler is not routed.
+SERVE_FRONTEND_ASSETS = os.environ.get('ADH_SERVE_FRONTEND_ASSETS', '0' if DEBUG else '1') == '1'
+
+# How / serves the frontend: 'dev' redirects to the Vite dev server (HMR)
+# while it is up, 'prod' always serves the built app shell. The dev server
+# is probed on a background thread every VITE_DEV_SERVER_PROBE_SECONDS,
+# never while answering a request.
+FRONTEND_MODE = os.environ.get('ADH_FRONTEND_MODE', 'dev' if DEBUG else 'prod')
+VITE_DEV_SERVER_URL = os.environ.get('ADH_VITE_DEV_SERVER_URL', 'http://localhost:5173')
+VITE_DEV_SERVER_PROBE_SECONDS = 5
+
+# Vector tileset served under /api/tiles/. The backend is picked by file
+# extension: .mbtiles (SQLite) or .pmtiles (memory-mapped PMTiles v3 archive,
+# see `manage.py convert_to_pmtiles`)
+TILE_SOURCE_PATH = os.environ.get('ADH_TILE_SOURCE', str(BASE_DIR / 'berlin.mbtiles'))
+
+# Vector tile cache
+# Raw tile blobs are cached in-process in front of the tileset file.
+# Tiles at or below TILE_CACHE_PIN_MAX_ZOOM are never evicted.
+TILE_CACHE_MAX_BYTES = 128 * 1024 * 1024
+TILE_CACHE_PIN_MAX_ZOOM = 10
+
+# Maximum number of tiles one /api/tiles/batch/ request may ask for
+TILE_BATCH_MAX_TILES = 256
+
+# Maximum number of tiles (bbox x zoom range) one offline export may cover
+TILE_EXPORT_MAX_TILES = 500000
+
+# Serve tiles, fonts and styles through async views; config/asgi.py turns
+# this on so the ASGI entry point never blocks its event loop on I/O
+ASYNC_MAP_VIEWS = os.environ.get('ADH_ASYNC_MAP_VIEWS') == '1'
+
+# Size of the thread pool the async views use for blocking file/SQLite reads
+TILE_IO_MAX_WORKERS = 16
+
+# Operational-data vector tiles (/api/ops-tiles/) built with ST_AsMVT.
+# Tiles are cached in the default cache for OPS_TILE_CACHE_TTL seconds and
+# dropped when a record inside them changes; with several worker processes
+# point CACHES at a shared backend so every worker sees the invalidation.
+OPS_TILE_CACHE_TTL = 30
+OPS_TILE_MAX_ZOOM = 16  # clients overzoom beyond this
+
+# Side of the square grid cells /api/clusters/ groups points into, in
+# screen pixels at the requested zoom
+CLUSTER_CELL_PX = 64
+
+# ?since= change feed: at most CHANGE_FEED_MAX_ROWS rows per response.
+# Tombstones of deleted records are kept TOMBSTONE_RETENTION_DAYS (see
+# `manage.py prune_tombstones`).
+CHANGE_FEED_MAX_ROWS = 1000
+TOMBSTONE_RETENTION_DAYS = 7
+
+# Server-Sent Events push channel (/api/events/, ASGI only). Events queue
+# per client up to EVENT_STREAM_MAX_QUEUE; a client that falls further
+# behind is sent `resync` and disconnected.
+EVENT_STREAM_MAX_QUEUE = 256
+EVENT_STREAM_KEEPALIVE_SECONDS = 15
+
+# Largest GeoJSON FeatureCollection accepted by /api/incidents/bulk/ and
+# /api/waypoints/bulk/
+BULK_UPSERT_MAX_FEATURES = 50000
+
+# Incident-in-hazard-zone containment is stored in api_zonemembership and
+# kept current on every save; set ADH_ZONE_MEMBERSHIP=0 to always run the
+# spatial join instead (run `manage.py rebuild_zone_memberships` when
+# turning it back on).
+HAZARD_ZONE_MEMBERSHIP_MATERIALIZED = os.environ.get('ADH_ZONE_MEMBERSHIP', '1') == '1'
+
+# Map styles served under /api/styles/<id>.json, built from files in static/.
+# Their tile and glyph URLs point at PUBLIC_BASE_URL (e.g.
+# https://maps.example.org) or, when it is empty, at the requesting host.
+MAP_STYLES = {
+    'osm-bright-local': {
+        'file': 'style-cdn.json',
+        'name': 'OSM Bright Local',
+        'description': 'OSM Bright style with local tile and font endpoints',
+    },
+}
+PUBLIC_BASE_URL = os.environ.get('ADH_PUBLIC_BASE_URL', '').rstrip('/')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -18,7 +18,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from api.views import serve_frontend
+from api.views import serve_frontend, serve_asset
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -26,6 +26,10 @@ urlpatterns = [
     path('', serve_frontend, name='frontend'),
 ]
 
-# Serve static files in development
-if settings.DEBUG:
+# Serve the built frontend from its manifest, or static files in development
+if settings.SERVE_FRONTEND_ASSETS:
+    urlpatterns += [
+        path(f"{settings.STATIC_URL.lstrip('/')}<path:path>", serve_asset, name='frontend_asset'),
+    ]
+elif settings.DEBUG:
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)